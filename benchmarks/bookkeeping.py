@@ -0,0 +1,170 @@
+"""Memory used by scraper bookkeeping, current structures vs former ones
+
+Usage: python benchmarks/bookkeeping.py [NB_ITEMS]
+
+Builds, for NB_ITEMS items (1M by default), the structures scrapers keep for the
+whole run: expected items with their queue entries, titles of users, resolved
+redirects, handled images and images digests. Each structure is measured with
+tracemalloc, strings of keys, titles and paths included. Structures which can be
+spilled to disk are also measured once spilled (SQLite page cache, which is
+bounded, is not traced).
+"""
+
+import hashlib
+import pathlib
+import sys
+import tempfile
+import tracemalloc
+from collections.abc import Callable
+from queue import Queue
+
+import ifixit2zim.scraper  # noqa: F401 # must be imported first (circular imports)
+from ifixit2zim.bookkeeping import CompactSet, SpillableDict, intern_key
+from ifixit2zim.constants import IMAGE_DIGEST_SIZE
+from ifixit2zim.scraper_guide import GuideRecord
+
+# number of links to each user, hence of title records
+USER_REFERENCES = 4
+# entries kept in memory by spilled structures
+SPILL_AFTER = 10_000
+COLUMNS = ("legacy", "compact", "spilled")
+
+
+def legacy_items(nb_items: int):
+    expected_items_keys, items_queue = {}, Queue()
+    for guideid in range(nb_items):
+        item_key = str(guideid)
+        item_data = {"guideid": guideid, "guidetitle": "unknown", "locale": "en"}
+        expected_items_keys[item_key] = item_data
+        items_queue.put({"key": item_key, "data": item_data})
+    return expected_items_keys, items_queue
+
+
+def compact_items(nb_items: int):
+    expected_items_keys, items_queue = {}, Queue()
+    for guideid in range(nb_items):
+        item_key = intern_key(guideid)
+        item_data = GuideRecord(guideid=guideid, guidetitle="unknown", locale="en")
+        expected_items_keys[item_key] = item_data
+        items_queue.put((item_key, item_data))
+    return expected_items_keys, items_queue
+
+
+def legacy_user_titles(nb_items: int):
+    user_id_to_titles = {}
+    for _ in range(USER_REFERENCES):
+        for userid in range(nb_items):
+            user_id_to_titles.setdefault(userid, []).append(f"User {userid}")
+    return user_id_to_titles
+
+
+def compact_user_titles(nb_items: int):
+    user_id_to_titles = {}
+    for _ in range(USER_REFERENCES):
+        for userid in range(nb_items):
+            usertitle = f"User {userid}"
+            titles = user_id_to_titles.get(userid, ())
+            if usertitle not in titles:
+                user_id_to_titles[userid] = (*titles, usertitle)
+    return user_id_to_titles
+
+
+def legacy_redirects(nb_items: int):
+    return {
+        f"https://www.ifixit.com/Guide/-/{n}": f"/Guide/Some+Title/{n}"
+        for n in range(nb_items)
+    }
+
+
+def compact_redirects(
+    nb_items: int, spill_after: int = 0, spill_dir: pathlib.Path | None = None
+):
+    # kept in memory unless spilled, same as legacy then
+    final_hrefs = SpillableDict(spill_after=spill_after, spill_dir=spill_dir)
+    for n in range(nb_items):
+        final_hrefs[f"https://www.ifixit.com/Guide/-/{n}"] = f"/Guide/Some+Title/{n}"
+    return final_hrefs
+
+
+def spilled_redirects(nb_items: int):
+    with tempfile.TemporaryDirectory() as spill_dir:
+        return compact_redirects(nb_items, SPILL_AFTER, pathlib.Path(spill_dir))
+
+
+def image_path(n: int) -> str:
+    return f"images/https/guide-images.cdn.ifixit.com/igi/{n:016x}.medium"
+
+
+def legacy_handled_images(nb_items: int):
+    # set of handled paths and memo of single flight
+    handled, deferred = set(), {}
+    for n in range(nb_items):
+        path = image_path(n)
+        handled.add(path)
+        deferred[path] = path
+    return handled, deferred
+
+
+def compact_handled_images(nb_items: int):
+    handled = CompactSet()
+    for n in range(nb_items):
+        handled[image_path(n)] = image_path(n)
+    return handled
+
+
+def legacy_images_digests(nb_items: int):
+    return {
+        hashlib.sha256(str(n).encode()).digest(): image_path(n) for n in range(nb_items)
+    }
+
+
+def compact_images_digests(
+    nb_items: int, spill_after: int = 0, spill_dir: pathlib.Path | None = None
+):
+    dedup_items = SpillableDict(spill_after=spill_after, spill_dir=spill_dir)
+    for n in range(nb_items):
+        digest = hashlib.sha256(str(n).encode()).digest()[:IMAGE_DIGEST_SIZE]
+        dedup_items[digest] = image_path(n)
+    return dedup_items
+
+
+def spilled_images_digests(nb_items: int):
+    with tempfile.TemporaryDirectory() as spill_dir:
+        return compact_images_digests(nb_items, SPILL_AFTER, pathlib.Path(spill_dir))
+
+
+def measure(build: Callable, nb_items: int) -> float:
+    """MiB allocated by structures built for nb_items, once built"""
+    tracemalloc.start()
+    structures = build(nb_items)
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del structures
+    return current / 2**20
+
+
+def main():
+    nb_items = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print(f"Bookkeeping of {nb_items} items, MiB")  # noqa: T201
+    print(f"{'structure':<20}" + "".join(f"{col:>10}" for col in COLUMNS))  # noqa: T201
+    for name, legacy, compact, spilled in (
+        ("items", legacy_items, compact_items, None),
+        ("user titles", legacy_user_titles, compact_user_titles, None),
+        ("redirects", legacy_redirects, compact_redirects, spilled_redirects),
+        ("handled images", legacy_handled_images, compact_handled_images, None),
+        (
+            "images digests",
+            legacy_images_digests,
+            compact_images_digests,
+            spilled_images_digests,
+        ),
+    ):
+        spilled_size = f"{measure(spilled, nb_items):>10.1f}" if spilled else ""
+        print(  # noqa: T201
+            f"{name:<20}{measure(legacy, nb_items):>10.1f}"
+            f"{measure(compact, nb_items):>10.1f}{spilled_size}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Cost of full-text indexing of pages, per indexing policy
+
+Usage: python benchmarks/indexing.py [NB_PAGES]
+
+Builds ZIMs of NB_PAGES HTML pages (2000 by default) of random words, a tenth of
+them large, with each page indexed as the scraper would with the policy of the
+run: whole pages, title and summary only for large pages (SUMMARY_ABOVE), or no
+page at all. Reports time spent in finish(), overall time and ZIM size.
+"""
+
+import base64
+import pathlib
+import random
+import string
+import sys
+import tempfile
+import time
+
+from libzim.writer import Hint  # pyright: ignore
+from zimscraperlib.zim.creator import Creator
+
+import ifixit2zim.scraper  # noqa: F401 # must be imported first (circular imports)
+from ifixit2zim.indexing import (
+    FULL,
+    SUMMARY,
+    IndexingPolicy,
+    NotIndexedItem,
+    SummaryIndexedItem,
+)
+
+# pages above this size, in bytes, have title and summary only indexed
+SUMMARY_ABOVE = 32 * 2**10
+# a 48x48 transparent PNG
+ILLUSTRATION = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAADAAAAAwCAYAAABXAvmHAAAAGklEQVR42u3BAQ0AAADCoPdPbQ8HFAAA"
+    "AAAA8GYVMAABsbwcBQAAAABJRU5ErkJggg=="
+)
+
+
+def build_words(rng: random.Random, nb_words: int) -> list[str]:
+    return [
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10)))
+        for _ in range(nb_words)
+    ]
+
+
+def build_page(rng: random.Random, words: list[str], n: int) -> str:
+    # a tenth of pages are large ones (long guides, users with many contributions)
+    nb_steps = 200 if n % 10 == 0 else 10
+    steps = "".join(
+        f"<li><p>{' '.join(rng.choices(words, k=40))}</p></li>" for _ in range(nb_steps)
+    )
+    return f"<html><body><h1>Guide {n}</h1><ol>{steps}</ol></body></html>"
+
+
+def build_zim(
+    path: pathlib.Path, nb_pages: int, policy: IndexingPolicy
+) -> tuple[float, float]:
+    """seconds spent in finish() and overall to create a ZIM of nb_pages pages"""
+    rng = random.Random(nb_pages)
+    words = build_words(rng, 50_000)
+    started = time.monotonic()
+    creator = Creator(
+        filename=path,
+        main_path="guides/0",
+        workaround_nocancel=False,
+        disable_metadata_checks=True,
+    ).config_metadata(
+        Illustration_48x48_at_1=ILLUSTRATION,
+        Name="benchmark",
+        Title="Benchmark",
+        Creator="openZIM",
+        Publisher="openZIM",
+        Date="2024-01-01",
+        Description="Benchmark",
+        Language="eng",
+    )
+    creator.start()
+    for n in range(nb_pages):
+        content = build_page(rng, words, n)
+        summary = " ".join(rng.choices(words, k=20))
+        mode = policy.record("guide", len(content.encode("utf-8")), summary)
+        if mode == FULL:
+            creator.add_item_for(
+                path=f"guides/{n}",
+                title=f"Guide {n}",
+                content=content,
+                mimetype="text/html",
+                should_compress=True,
+            )
+            continue
+        item_class = SummaryIndexedItem if mode == SUMMARY else NotIndexedItem
+        creator.add_item(
+            item_class(
+                path=f"guides/{n}",
+                title=f"Guide {n}",
+                content=content,
+                mimetype="text/html",
+                hints={Hint.FRONT_ARTICLE: True, Hint.COMPRESS: True},
+                summary=summary,
+            )
+        )
+    finish_started = time.monotonic()
+    creator.finish()
+    return time.monotonic() - finish_started, time.monotonic() - started
+
+
+def main():
+    nb_pages = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    print(f"ZIM of {nb_pages} pages")  # noqa: T201
+    print(  # noqa: T201
+        f"{'policy':<24}{'finish (s)':>12}{'total (s)':>12}{'size (MiB)':>12}"
+    )
+    runs = (
+        ("whole pages", IndexingPolicy({"guide"})),
+        ("summary of large pages", IndexingPolicy({"guide"}, SUMMARY_ABOVE)),
+        ("no page", IndexingPolicy(set())),
+    )
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for index, (name, policy) in enumerate(runs):
+            path = pathlib.Path(tmp_dir) / f"run{index}.zim"
+            finish_duration, duration = build_zim(path, nb_pages, policy)
+            size = path.stat().st_size / 2**20
+            path.unlink()
+            print(  # noqa: T201
+                f"{name:<24}{finish_duration:>12.2f}{duration:>12.2f}{size:>12.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
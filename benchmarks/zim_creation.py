@@ -0,0 +1,121 @@
+"""Duration of ZIM finish() and ZIM size, former Creator settings vs tuned ones
+
+Usage: python benchmarks/zim_creation.py [NB_PAGES]
+
+Builds a ZIM of NB_PAGES HTML pages (2000 by default), with an image each, the way
+the scraper adds them. Images are random bytes, as incompressible as WebP. Former
+settings are libzim defaults (4 workers, 2 MiB clusters) without compression
+hints; tuned ones use as many compression workers as CPUs and flag images as not
+to be compressed, with each cluster size of CLUSTER_SIZES. Most compression runs
+while items are added, finish() waits for the remaining clusters.
+"""
+
+import base64
+import pathlib
+import random
+import sys
+import tempfile
+import time
+
+from zimscraperlib.zim.creator import Creator
+
+import ifixit2zim.scraper  # noqa: F401 # must be imported first (circular imports)
+from ifixit2zim.shared import get_cpu_count
+
+# size of each image, in bytes
+IMAGE_SIZE = 30_000
+# cluster sizes tried with tuned settings, in MiB (0: libzim default)
+CLUSTER_SIZES = (0, 8)
+# a 48x48 transparent PNG
+ILLUSTRATION = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAADAAAAAwCAYAAABXAvmHAAAAGklEQVR42u3BAQ0AAADCoPdPbQ8HFAAA"
+    "AAAA8GYVMAABsbwcBQAAAABJRU5ErkJggg=="
+)
+WORDS = (
+    "remove the screws holding battery connector with a spudger then lift "
+    "carefully the logic board out of its case before replacing"
+).split()
+
+
+def build_page(rng: random.Random, n: int) -> str:
+    steps = "".join(
+        f"<li><p>{' '.join(rng.choices(WORDS, k=40))}</p>"
+        f'<img src="../images/{n}.webp"></li>'
+        for _ in range(10)
+    )
+    return f"<html><body><h1>Guide {n}</h1><ol>{steps}</ol></body></html>"
+
+
+def build_zim(
+    path: pathlib.Path,
+    nb_pages: int,
+    *,
+    tuned: bool,
+    cluster_size: int = 0,
+) -> tuple[float, float]:
+    """seconds spent in finish() and overall to create a ZIM of nb_pages pages"""
+    rng = random.Random(nb_pages)
+    started = time.monotonic()
+    creator = Creator(
+        filename=path,
+        main_path="guides/0",
+        workaround_nocancel=False,
+        disable_metadata_checks=True,
+    ).config_metadata(
+        Illustration_48x48_at_1=ILLUSTRATION,
+        Name="benchmark",
+        Title="Benchmark",
+        Creator="openZIM",
+        Publisher="openZIM",
+        Date="2024-01-01",
+        Description="Benchmark",
+        Language="eng",
+    )
+    if tuned:
+        creator.config_nbworkers(get_cpu_count())
+        if cluster_size:
+            creator.config_clustersize(cluster_size * 2**20)
+    creator.start()
+    for n in range(nb_pages):
+        creator.add_item_for(
+            path=f"guides/{n}",
+            title=f"Guide {n}",
+            content=build_page(rng, n),
+            mimetype="text/html",
+            should_compress=True if tuned else None,
+        )
+        creator.add_item_for(
+            path=f"images/{n}.webp",
+            content=rng.randbytes(IMAGE_SIZE),
+            mimetype="image/webp",
+            should_compress=False if tuned else None,
+        )
+    finish_started = time.monotonic()
+    creator.finish()
+    return time.monotonic() - finish_started, time.monotonic() - started
+
+
+def main():
+    nb_pages = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    print(f"ZIM of {nb_pages} pages and images, {get_cpu_count()} CPUs")  # noqa: T201
+    print(  # noqa: T201
+        f"{'settings':<24}{'finish (s)':>12}{'total (s)':>12}{'size (MiB)':>12}"
+    )
+    runs = [("former", False, 0)] + [
+        (f"tuned, cluster {size or 'default'}", True, size) for size in CLUSTER_SIZES
+    ]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for index, (name, tuned, cluster_size) in enumerate(runs):
+            path = pathlib.Path(tmp_dir) / f"run{index}.zim"
+            finish_duration, duration = build_zim(
+                path, nb_pages, tuned=tuned, cluster_size=cluster_size
+            )
+            size = path.stat().st_size / 2**20
+            path.unlink()
+            print(  # noqa: T201
+                f"{name:<24}{finish_duration:>12.2f}{duration:>12.2f}{size:>12.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
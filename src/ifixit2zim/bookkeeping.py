@@ -0,0 +1,167 @@
+import hashlib
+import pathlib
+import sqlite3
+import sys
+import tempfile
+import threading
+from collections.abc import Iterator, MutableMapping
+
+
+def intern_key(key) -> str:
+    """item key as a string shared by all its references"""
+    return sys.intern(str(key))
+
+
+class ItemRecord:
+    """Base of slotted records holding data of an item to scrape
+
+    Subclasses declare their fields in `__slots__`, saving the per-instance dict.
+    Fields are accessible as attributes and by subscription, like the dicts
+    records replace"""
+
+    __slots__ = ()
+
+    def __init__(self, **kwargs):
+        for name, value in kwargs.items():
+            setattr(self, name, value)
+
+    def __getitem__(self, name):
+        return getattr(self, name)
+
+    def __setitem__(self, name, value):
+        setattr(self, name, value)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and all(
+            self[name] == other[name] for name in self.__slots__
+        )
+
+    def __hash__(self):
+        return hash(tuple(self[name] for name in self.__slots__))
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={self[name]!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class CompactSet:
+    """Set of strings storing only a 64 bits digest of each one
+
+    Much smaller than the strings themselves (URLs, paths) but members can't be
+    listed. Collisions are very unlikely for a few millions members.
+
+    Members are also their own value, so that it can memoize a SingleFlight whose
+    results are the keys themselves"""
+
+    def __init__(self):
+        self.digests = set()
+
+    @staticmethod
+    def get_digest(value: str) -> int:
+        return int.from_bytes(
+            hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest()
+        )
+
+    def add(self, value: str):
+        self.digests.add(self.get_digest(value))
+
+    def __contains__(self, value: str) -> bool:
+        return self.get_digest(value) in self.digests
+
+    def __len__(self) -> int:
+        return len(self.digests)
+
+    def __getitem__(self, value: str) -> str:
+        if value not in self:
+            raise KeyError(value)
+        return value
+
+    def __setitem__(self, value: str, result: str):
+        if result != value:
+            raise ValueError(f"{self.__class__.__name__} can only memoize keys")
+        self.add(value)
+
+
+class SpillableDict(MutableMapping):
+    """Dict of str/bytes keys and str values moved to an SQLite file once large
+
+    Entries are kept in memory until there are more than `spill_after` of them
+    (0 never spills). All entries are then moved to a database in `spill_dir` and
+    further accesses go to disk. Thread-safe"""
+
+    def __init__(self, spill_after: int = 0, spill_dir: pathlib.Path | None = None):
+        self.spill_after = spill_after
+        self.spill_dir = spill_dir
+        self.lock = threading.Lock()
+        self.memory = {}
+        self.db = None
+
+    @property
+    def spilled(self) -> bool:
+        return self.db is not None
+
+    def _spill(self):
+        with tempfile.NamedTemporaryFile(
+            prefix="spill_", suffix=".sqlite", dir=self.spill_dir, delete=False
+        ) as fh:
+            path = fh.name
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        # scratch database, discarded with build folder: no need for durability
+        self.db.execute("PRAGMA journal_mode = OFF")
+        self.db.execute("PRAGMA synchronous = OFF")
+        self.db.execute("CREATE TABLE entries (key PRIMARY KEY, value)")
+        self.db.executemany("INSERT INTO entries VALUES (?, ?)", self.memory.items())
+        self.memory = {}
+
+    def __getitem__(self, key):
+        with self.lock:
+            if self.db is None:
+                return self.memory[key]
+            row = self.db.execute(
+                "SELECT value FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return row[0]
+
+    def __setitem__(self, key, value):
+        with self.lock:
+            if self.db is None:
+                self.memory[key] = value
+                if self.spill_after and len(self.memory) > self.spill_after:
+                    self._spill()
+                return
+            self.db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?)", (key, value)
+            )
+
+    def __delitem__(self, key):
+        with self.lock:
+            if self.db is None:
+                del self.memory[key]
+                return
+            if not self.db.execute(
+                "DELETE FROM entries WHERE key = ?", (key,)
+            ).rowcount:
+                raise KeyError(key)
+
+    def __contains__(self, key) -> bool:
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self) -> Iterator:
+        with self.lock:
+            if self.db is None:
+                keys = list(self.memory)
+            else:
+                keys = [row[0] for row in self.db.execute("SELECT key FROM entries")]
+        return iter(keys)
+
+    def __len__(self) -> int:
+        with self.lock:
+            if self.db is None:
+                return len(self.memory)
+            return self.db.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
@@ -0,0 +1,80 @@
+import hashlib
+import pathlib
+
+from ifixit2zim.minifier import minify_css, minify_js
+from ifixit2zim.shared import logger
+
+MINIFIERS = {
+    ".css": minify_css,
+    ".js": minify_js,
+}
+
+MIMETYPES = {
+    ".css": "text/css",
+    ".js": "application/javascript",
+}
+
+
+class AssetsBundler:
+    """Concatenates, minifies and fingerprints static CSS/JS assets
+
+    Each bundle is made of an ordered list of source files from the assets folder.
+    Bundles are added to the ZIM as a single file whose name contains a digest of its
+    content so that readers can cache them safely. Bundles are stored in the assets
+    folder as well so that relative `url()` references keep working"""
+
+    def __init__(
+        self,
+        assets_root: pathlib.Path,
+        bundles: dict[str, list[str]],
+        *,
+        enabled: bool = True,
+    ):
+        self.assets_root = assets_root
+        self.bundles = bundles
+        self.enabled = enabled
+        # bundle name => (path in ZIM, content)
+        self.built = {}
+
+    def build(self):
+        """concatenate and minify all bundles, computing their final path"""
+        if not self.enabled:
+            return
+        for name, sources in self.bundles.items():
+            suffix = pathlib.Path(name).suffix
+            raw_size = 0
+            parts = []
+            for source in sources:
+                text = self.assets_root.joinpath(source).read_text(encoding="utf-8")
+                raw_size += len(text.encode("utf-8"))
+                parts.append(MINIFIERS[suffix](text))
+            content = "\n".join(parts).encode("utf-8")
+            digest = hashlib.sha256(content).hexdigest()[:16]
+            path = f"assets/{pathlib.Path(name).stem}-{digest}{suffix}"
+            self.built[name] = (path, content)
+            logger.debug(
+                f"Bundled {len(sources)} files into {path} "
+                f"({raw_size} bytes => {len(content)} bytes)"
+            )
+
+    @property
+    def bundled_sources(self) -> set[str]:
+        """paths in ZIM of source files which are included in a bundle"""
+        if not self.enabled:
+            return set()
+        return {
+            f"assets/{source}"
+            for sources in self.bundles.values()
+            for source in sources
+        }
+
+    def get_bundle_paths(self, name: str) -> list[str]:
+        """paths in ZIM (relative to root) to reference for a bundle"""
+        if not self.enabled:
+            return [f"assets/{source}" for source in self.bundles[name]]
+        return [self.built[name][0]]
+
+    def get_items(self):
+        """(path, content, mimetype) of each built bundle"""
+        for name, (path, content) in self.built.items():
+            yield path, content, MIMETYPES[pathlib.Path(name).suffix]
@@ -63,6 +63,71 @@ DEFAULT_USER_IMAGE_URLS = [
     "avatar-12.standard",
 ]
 
+# Sizes of the 4:3 variants of guide images (`https://guide-images.cdn.ifixit.com/igi/
+# <guid>.<variant>`), used to reserve space for images before they are loaded
+GUIDE_IMAGE_VARIANT_SIZES = {
+    "mini": (56, 42),
+    "thumbnail": (96, 72),
+    "140x105": (140, 105),
+    "200x150": (200, 150),
+    "standard": (300, 225),
+    "440x330": (440, 330),
+    "medium": (592, 444),
+    "large": (800, 600),
+    "huge": (1600, 1200),
+}
+
+IMAGE_PLACEHOLDER_COLOR = "#f1f1f1"
+
+# Priority (lower first) of images in processing queue, by kind of item referencing
+# them. Large variants are pushed back so that they don't hold back small ones.
+IMAGE_KIND_PRIORITIES = {
+    "home": 0,
+    "category": 1,
+    "guide": 2,
+    "info": 3,
+    "user": 4,
+}
+IMAGE_DEFAULT_PRIORITY = 2
+IMAGE_LARGE_VARIANTS = {"large", "huge", "original"}
+IMAGE_LARGE_PRIORITY_PENALTY = 2
+IMAGE_PRIORITY_AGING = 5.0  # seconds of waiting worth one priority level
+# bytes of SHA-256 of images content kept to find duplicates
+IMAGE_DIGEST_SIZE = 16
+
+# seconds between two reports of progress to stats file
+PROGRESS_INTERVAL = 10
+
+# kinds of pages in full-text index by default, all but placeholder pages (home/*)
+DEFAULT_INDEXED_KINDS = ("home", "category", "guide", "info", "user")
+
+# adaptive (AIMD) limits of concurrent requests per origin (API, CDN, S3...)
+ORIGIN_INITIAL_CONCURRENCY = 4
+ORIGIN_MIN_CONCURRENCY = 1
+ORIGIN_MAX_CONCURRENCY = 50
+# recent latency above baseline one by this ratio is considered congestion
+ORIGIN_CONGESTION_LATENCY_RATIO = 3.0
+# circuit opens after this many congested requests in a row
+ORIGIN_BREAKER_THRESHOLD = 5
+# seconds before probing an origin whose circuit opened, doubled on each failure
+ORIGIN_BREAKER_COOLDOWN = 5.0
+ORIGIN_BREAKER_MAX_COOLDOWN = 120.0
+# seconds after which an origin still down makes the scraper give up
+ORIGIN_BREAKER_MAX_OUTAGE = 1800.0
+# times an item or image failing during an outage is retried instead of failing
+MAX_OUTAGE_RETRIES = 3
+
+# items failing with a transient error are retried later, after an exponential
+# delay, instead of being retried immediately (which blocks scraping thread)
+ITEM_MAX_RETRIES = 3
+ITEM_RETRY_BASE_DELAY = 5.0  # seconds, doubled on every attempt
+# max seconds spent retrying a single request immediately
+REQUEST_BACKOFF_MAX_TIME = 4
+# bytes read at once from HTTP responses, deadlines are checked in between
+REQUEST_BLOCK_SIZE = 64 * 1024
+# upper bounds (seconds) of buckets of HTTP latency histograms, +inf is implied
+HTTP_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
 # Open this URL in the various languages to retrieve labels below
 # https://www.ifixit.com/api/2.0/guides?guideids=219,220,202,206,46465
 DIFFICULTY_VERY_EASY = [
@@ -814,6 +879,44 @@ UNAVAILABLE_OFFLINE = [
 
 API_PREFIX = "/api/2.0"
 
+# CSS / JS files served together to readers, per kind of page, in inclusion order
+_BASE_CSS = [
+    "css2.css",
+    "guide-all-evkgScrziDY3Uq33ElIkNA.css",
+    "font-awesome-HTdabjFBu1PkVsVncBZulw.css",
+    "module-all-a4ubLUywxaL0H1WJD5LLgQ.css",
+    "core-ETWCjfemWxBbJHaoXafxFg.css",
+    "core-primitives-F5WnAWhrwpl7oCtqtgogQQ.css",
+]
+ASSETS_BUNDLES = {
+    "guide.css": [
+        *_BASE_CSS,
+        "Shared-i18n_formatting-7XRaMqur0Z-hJvP-W8sS2A.css",
+        "new-guide-view-all-Zs-aI_CApaXZ_ssFDlTZ9g.css",
+        "release-version-orbcTfqm6_JKsoz-PPnHGA.css",
+        "prosemirror-all-_OBJ3KkZRD0uygPKzpMb8Q.css",
+        "Shared-cart_banner-33Ctp6kCy0R-IiTsFeV6cw.css",
+        "Shared-attachment_link-AoWbgS-g65jo1DYOaHV5XA.css",
+    ],
+    "wiki.css": [
+        *_BASE_CSS,
+        "Wiki-topic-r_spN9srKqcGQAC8emdeTA.css",
+        "Wiki-common-Zf5O-KLmFhhZ0w9cRZYZoQ.css",
+    ],
+    "home.css": [
+        *_BASE_CSS,
+        "Shared-i18n_formatting-7XRaMqur0Z-hJvP-W8sS2A.css",
+        "area_index-BDTBciD-Y7NVVjoPQBUyhA.css",
+    ],
+    "user.css": [
+        *_BASE_CSS,
+        "Wiki-common-Zf5O-KLmFhhZ0w9cRZYZoQ.css",
+        "view_profile-LAZ9O7S0EMQ9_BZEO-F8OQ.css",
+    ],
+    "guide.js": ["customZimHelpers-1.js"],
+    "not_here.js": ["not_here.js"],
+}
+
 UNAVAILABLE_OFFLINE_INFOS = ["toolkits"]
 
 
@@ -848,6 +951,7 @@ class Configuration:
     # customization
     icon: str
     categories: set[str]
+    category_subtrees: set[str]
     no_category: bool
     guides: set[str]
     no_guide: bool
@@ -860,6 +964,31 @@ class Configuration:
     # performances
     s3_url_with_credentials: str | None
     request_timeout: float
+    listing_page_size: int
+    listing_concurrency: int
+    prefetch_items: int
+    speculative_items: int
+    scraping_workers: int
+    _kind_weights: list[tuple[str, int]]
+    kind_weights: dict[str, int]
+    _kind_concurrency: list[tuple[str, int]]
+    kind_concurrency: dict[str, int]
+    request_deadline: float
+    stall_timeout: float
+    cancel_stalled_requests: bool
+    minify_html: bool
+    image_placeholder: bool
+    fragment_cache_size: int
+    templates_cache_dir: str
+    negative_cache_path: str
+    negative_cache_ttl: int
+    bookkeeping_spill_after: int
+    zim_workers: int
+    zim_cluster_size: int
+    zim_compression: str
+    _index_kinds: list[str]
+    index_kinds: set[str]
+    index_summary_above: int
 
     # error handling
     max_missing_items_percent: int
@@ -874,7 +1003,10 @@ class Configuration:
     api_delay: float
     cdn_delay: float
     stats_filename: str | None
+    report_filename: str | None
+    report_slowest_items: int
     skip_checks: bool
+    no_assets_bundling: bool
 
     def __init__(self, **kwargs):
         for key, value in kwargs.items():
@@ -893,11 +1025,20 @@ class Configuration:
                 tempfile.mkdtemp(prefix=f"ifixit_{self.lang_code}_", dir=self.tmp_path)
             )
 
+        self.kind_weights = dict(self._kind_weights)
+        self.kind_concurrency = dict(self._kind_concurrency)
+        self.index_kinds = set(self._index_kinds or DEFAULT_INDEXED_KINDS)
+
         self.stats_path = None
         if self.stats_filename:
             self.stats_path = pathlib.Path(self.stats_filename).expanduser()
             self.stats_path.parent.mkdir(parents=True, exist_ok=True)
 
+        self.report_path = None
+        if self.report_filename:
+            self.report_path = pathlib.Path(self.report_filename).expanduser()
+            self.report_path.parent.mkdir(parents=True, exist_ok=True)
+
         # support semi-colon separated tags as well
         if self.tag:
             for tag in self.tag.copy():
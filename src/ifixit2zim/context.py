@@ -5,6 +5,7 @@ from typing import Any
 from jinja2 import Environment
 from zimscraperlib.zim.creator import Creator
 
+from ifixit2zim.executor import Executor
 from ifixit2zim.processor import Processor
 from ifixit2zim.scraper import Configuration
 from ifixit2zim.utils import Utils
@@ -19,3 +20,4 @@ class Context:
     metadata: dict[str, Any]
     env: Environment
     processor: Processor
+    prefetch_executor: Executor
@@ -2,11 +2,32 @@
 
 import argparse
 import os
+import pathlib
 import sys
 
 from ifixit2zim.constants import NAME, SCRAPER, URLS
 from ifixit2zim.shared import logger, set_debug
 
+KINDS = ("home", "category", "guide", "info", "user")
+
+
+def kind_value(value: str) -> tuple[str, int]:
+    """(kind, number) from a KIND=NUMBER argument"""
+    kind, _, number = value.partition("=")
+    if kind not in KINDS or not number.isdigit() or not int(number):
+        raise argparse.ArgumentTypeError(
+            f"{value!r} is not KIND=NUMBER with KIND in {', '.join(KINDS)} and "
+            "NUMBER a positive integer"
+        )
+    return kind, int(number)
+
+
+def positive_int(value: str) -> int:
+    """number from an argument which must be a positive integer"""
+    if not value.isdigit() or not int(value):
+        raise argparse.ArgumentTypeError(f"{value!r} is not a positive integer")
+    return int(value)
+
 
 def main():
     parser = argparse.ArgumentParser(
@@ -123,6 +144,48 @@ def main():
         dest="build_dir_is_tmp_dir",
     )
 
+    parser.add_argument(
+        "--zim-workers",
+        help="Number of threads compressing ZIM clusters. Defaults to 0: as many "
+        "as CPUs",
+        type=int,
+        default=0,
+    )
+
+    parser.add_argument(
+        "--zim-cluster-size",
+        help="Maximum size of ZIM clusters, in MiB. Larger clusters compress better "
+        "but are slower to read. Defaults to 0: libzim default (2 MiB)",
+        type=int,
+        default=0,
+    )
+
+    parser.add_argument(
+        "--zim-compression",
+        help="Compression of ZIM clusters. Defaults to zstd",
+        choices=["zstd", "none"],
+        default="zstd",
+    )
+
+    parser.add_argument(
+        "--index-kind",
+        help="Kind of pages to include in full-text index (home, category, guide, "
+        "info, user, placeholder). Can be specified multiple times. Defaults to all "
+        "kinds but placeholder pages",
+        choices=(*KINDS, "placeholder"),
+        action="append",
+        default=[],
+        dest="_index_kinds",
+    )
+
+    parser.add_argument(
+        "--index-summary-above",
+        help="Size of pages (KiB) above which only their title and summary are "
+        "included in full-text index. Defaults to 0: whole pages are indexed",
+        type=int,
+        default=0,
+    )
+
     parser.add_argument(
         "--delay",
         help="Add this delay (seconds) before each request to please "
@@ -151,6 +214,91 @@ def main():
         default=10,
     )
 
+    parser.add_argument(
+        "--listing-page-size",
+        help="Number of guides / infos requested at once when listing them "
+        "(default: 200)",
+        type=int,
+        default=200,
+    )
+
+    parser.add_argument(
+        "--listing-concurrency",
+        help="Number of pages of guides / infos listing fetched concurrently "
+        "(default: 4)",
+        type=int,
+        default=4,
+    )
+
+    parser.add_argument(
+        "--prefetch-items",
+        help="Number of items whose API content is fetched ahead of their "
+        "processing (default: 8)",
+        type=positive_int,
+        default=8,
+    )
+
+    parser.add_argument(
+        "--speculative-items",
+        help="Number of items found through links whose API content is fetched as "
+        "soon as they are found, 0 to disable (default: 32)",
+        type=int,
+        default=32,
+    )
+
+    parser.add_argument(
+        "--scraping-workers",
+        help="Number of items scraped concurrently, all kinds together (default: 4)",
+        type=int,
+        default=4,
+    )
+
+    parser.add_argument(
+        "--kind-weight",
+        help="Share of items of a kind (home, category, guide, info, user) when "
+        "several kinds can be scraped, as KIND=WEIGHT. Can be specified multiple "
+        "times, kinds weigh 1 by default",
+        type=kind_value,
+        action="append",
+        default=[],
+        dest="_kind_weights",
+    )
+
+    parser.add_argument(
+        "--kind-concurrency",
+        help="Maximum number of items of a kind (home, category, guide, info, user) "
+        "scraped concurrently, as KIND=NUMBER. Can be specified multiple times, "
+        "defaults to --scraping-workers",
+        type=kind_value,
+        action="append",
+        default=[],
+        dest="_kind_concurrency",
+    )
+
+    parser.add_argument(
+        "--request-deadline",
+        help="Maximum time in seconds to receive a whole HTTP response, including "
+        "its body (default: 120)",
+        type=float,
+        default=120,
+    )
+
+    parser.add_argument(
+        "--stall-timeout",
+        help="Log URL and stack of threads busy with a same request or item for "
+        "more than this number of seconds. 0 to disable (default: 300)",
+        type=float,
+        default=300,
+    )
+
+    parser.add_argument(
+        "--cancel-stalled-requests",
+        help="Close connection of requests found stalled (see --stall-timeout) "
+        "so that they fail and get retried",
+        default=False,
+        action="store_true",
+    )
+
     parser.add_argument(
         "--skip-checks",
         help="[dev] Don't perform Integrity Checks on start",
@@ -159,12 +307,36 @@ def main():
         dest="skip_checks",
     )
 
+    parser.add_argument(
+        "--no-assets-bundling",
+        help="[dev] Serve CSS/JS assets as individual files instead of minified "
+        "bundles",
+        default=False,
+        action="store_true",
+        dest="no_assets_bundling",
+    )
+
     parser.add_argument(
         "--stats-filename",
         help="Path to store the progress JSON file to.",
         dest="stats_filename",
     )
 
+    parser.add_argument(
+        "--report-filename",
+        help="Path to store the JSON report of the run to: duration of its phases "
+        "and of items. Report is logged in any case",
+        dest="report_filename",
+    )
+
+    parser.add_argument(
+        "--report-slowest-items",
+        help="Number of slowest items of each kind listed in run report "
+        "(default: 10)",
+        type=int,
+        default=10,
+    )
+
     parser.add_argument(
         "--version",
         help="Display scraper version and exit",
@@ -200,6 +372,15 @@ def main():
         action="append",
     )
 
+    parser.add_argument(
+        "--category-subtree",
+        help="Only scrape this category, all its sub-categories and their guides "
+        "(can be specified multiple times). Specify the category name. With "
+        "--guide, guides are those of --guide only",
+        dest="category_subtrees",
+        action="append",
+    )
+
     parser.add_argument(
         "--no-category",
         help="Do not scrape any category.",
@@ -272,6 +453,76 @@ def main():
         default=False,
     )
 
+    parser.add_argument(
+        "--minify-html",
+        help="Remove comments and collapse whitespaces of HTML pages before adding "
+        "them to the ZIM. <pre> and inline scripts are kept as is.",
+        dest="minify_html",
+        action="store_true",
+        default=False,
+    )
+
+    parser.add_argument(
+        "--image-placeholder",
+        help="Display a light background in place of guide images while they load",
+        dest="image_placeholder",
+        action="store_true",
+        default=False,
+    )
+
+    parser.add_argument(
+        "--fragment-cache-size",
+        help="Number of rendered page fragments (author cards, category and guide "
+        "cards) to keep in memory for reuse across pages. 0 to disable. "
+        "Defaults to 10000",
+        default=10000,
+        type=int,
+        dest="fragment_cache_size",
+    )
+
+    parser.add_argument(
+        "--templates-cache-dir",
+        help="Folder to persist compiled templates in, reused across runs. Set to "
+        "empty value to disable. Defaults to ~/.cache/ifixit2zim/templates",
+        default=str(
+            pathlib.Path(os.getenv("XDG_CACHE_HOME", "~/.cache")) / NAME / "templates"
+        ),
+        dest="templates_cache_dir",
+    )
+
+    parser.add_argument(
+        "--negative-cache-path",
+        help="File to persist categories known to be empty in a language, shared "
+        "across runs of all languages. Set to empty value to disable. Defaults to "
+        "~/.cache/ifixit2zim/empty_categories.json",
+        default=str(
+            pathlib.Path(os.getenv("XDG_CACHE_HOME", "~/.cache"))
+            / NAME
+            / "empty_categories.json"
+        ),
+        dest="negative_cache_path",
+    )
+
+    parser.add_argument(
+        "--negative-cache-ttl",
+        help="Number of days after which a category found empty in a language is "
+        "queried again. Keep it below the interval between runs so that content "
+        "added meanwhile is found. 0 to disable the cache. Defaults to 7",
+        default=7,
+        type=int,
+        dest="negative_cache_ttl",
+    )
+
+    parser.add_argument(
+        "--bookkeeping-spill-after",
+        help="Number of entries after which resolved redirects and digests of "
+        "images are moved from memory to a database in build folder. 0 to keep "
+        "them in memory. Defaults to 0",
+        default=0,
+        type=int,
+        dest="bookkeeping_spill_after",
+    )
+
     args = parser.parse_args()
     set_debug(args.debug)
 
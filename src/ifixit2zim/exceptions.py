@@ -1,3 +1,6 @@
+import requests
+
+
 class FinalScrapingFailureError(Exception):
     pass
 
@@ -12,3 +15,11 @@ class CategoryHomePageContentError(Exception):
 
 class ImageUrlNotFoundError(Exception):
     pass
+
+
+class OriginUnavailableError(Exception):
+    pass
+
+
+class RequestDeadlineExceededError(requests.exceptions.Timeout):
+    pass
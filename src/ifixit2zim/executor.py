@@ -1,9 +1,14 @@
 #!/usr/bin/env python
 # vim: ai ts=4 sts=4 et sw=4 nu
 
+import heapq
+import itertools
+import math
 import queue
 import threading
+import time
 from collections.abc import Callable
+from concurrent.futures import Future
 
 from ifixit2zim.shared import logger
 
@@ -12,6 +17,9 @@ _shutdown = False
 # shutting down. Must be held while mutating _threads_queues and _shutdown.
 _global_shutdown_lock = threading.Lock()
 
+# queued in place of a task to wake up a worker and request it to exit
+_STOP = object()
+
 
 def excepthook(args):
     logger.error(
@@ -24,22 +32,61 @@ threading.excepthook = excepthook
 
 
 class Executor(queue.Queue):
-    """Custom FIFO queue based Executor that's less generic than ThreadPoolExec one
+    """Custom priority queue based Executor, less generic than ThreadPoolExec one
 
     Providing more flexibility for the use cases we're interested about:
     - halt immediately (sort of) upon exception (if requested)
     - able to join() then restart later to accomodate successive steps
+    - serve tasks by priority (lower first), FIFO within a same priority
+
+    To prevent starvation, priorities age: a task is ordered as if it had been
+    submitted `priority * priority_aging` seconds later than it was. A low priority
+    task thus gets served before higher priority ones submitted long enough after.
+
+    `submit()` returns a Future which can be awaited or cancelled while queued.
+    Idle workers block on the queue and are woken up by a stop signal queued once
+    per worker on `join()` / `shutdown()`, so no polling is involved.
 
     See: https://github.com/python/cpython/blob/3.8/Lib/concurrent/futures/thread.py
     """
 
-    def __init__(self, queue_size: int = 10, nb_workers: int = 1, prefix: str = "T-"):
+    def __init__(
+        self,
+        queue_size: int = 10,
+        nb_workers: int = 1,
+        prefix: str = "T-",
+        priority_aging: float = 10.0,
+    ):
         super().__init__(queue_size)
         self.prefix = prefix
+        self.priority_aging = priority_aging
         self._shutdown_lock = threading.Lock()
+        self._shutdown = False
+        self._workers = set()
         self.nb_workers = nb_workers
+        self.no_more = False
+        # whether workers have been sent their stop signal, see _wake_workers()
+        self._stopping = False
         self.exceptions = []
 
+    # queue storage: heap of (sort key, sequence, item)
+    def _init(self, maxsize):  # noqa: ARG002
+        self.queue = []
+        self._sequence = itertools.count()
+
+    def _qsize(self):
+        return len(self.queue)
+
+    def _put(self, item, priority: int = 0):
+        if item is _STOP:
+            key = math.inf
+        else:
+            key = time.monotonic() + priority * self.priority_aging
+        heapq.heappush(self.queue, (key, next(self._sequence), item))
+
+    def _get(self):
+        return heapq.heappop(self.queue)[2]
+
     @property
     def exception(self):
         """Exception raises in any thread, if any"""
@@ -53,23 +100,35 @@ class Executor(queue.Queue):
         """whether it should continue running"""
         return not self._shutdown
 
-    def submit(self, task: Callable, **kwargs):
-        """Submit a callable and its kwargs for execution in one of the workers"""
+    def submit(
+        self, task: Callable, priority: int = 0, *, block: bool = True, **kwargs
+    ) -> Future:
+        """Submit a callable and its kwargs for execution in one of the workers
+
+        Blocks while the queue is full, unless block is False. Returned future is
+        cancelled if the task is rejected because executor is `join`ing or shutting
+        down, or because queue is full and block is False"""
         with self._shutdown_lock, _global_shutdown_lock:
             if not self.alive:
                 raise RuntimeError("cannot submit task to dead executor")
             if _shutdown:
                 raise RuntimeError("cannot submit task after interpreter shutdown")
 
-        while True:
-            try:
-                self.put((task, kwargs), block=True, timeout=3.0)
-            except queue.Full:
-                if self.no_more:
+        future = Future()
+        with self.not_full:
+            while 0 < self.maxsize <= self._qsize():
+                if not block:
+                    future.cancel()
+                    return future
+                if self.no_more or not self.alive:
                     logger.debug("rejecting task: queue full and currently `join`ing")
-                    break
-            else:
-                break
+                    future.cancel()
+                    return future
+                self.not_full.wait()
+            self._put((future, task, kwargs), priority)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+        return future
 
     def start(self):
         """Enable executor, starting requested amount of workers
@@ -79,6 +138,7 @@ class Executor(queue.Queue):
         self.release_halt()
         self._workers = set()
         self._shutdown = False
+        self._stopping = False
         self.exceptions[:] = []
 
         for n in range(self.nb_workers):
@@ -88,28 +148,33 @@ class Executor(queue.Queue):
             self._workers.add(t)
 
     def worker(self):
-        while self.alive or self.no_more:
-            try:
-                func, kwargs = self.get(block=True, timeout=2.0)
-            except queue.Empty:
-                if self.no_more:
-                    break
-                continue
-            except TypeError:
-                # received None from the queue. most likely shuting down
+        while True:
+            item = self.get(block=True)
+            if item is _STOP:
+                self.task_done()
                 return
 
+            future, func, kwargs = item
             raises = kwargs.pop("raises") if "raises" in kwargs.keys() else False
             callback = kwargs.pop("callback") if "callback" in kwargs.keys() else None
             dont_release = kwargs.pop("dont_release", False)
 
+            # halted: tasks queued meanwhile are cancelled until stop signal comes
+            if not self.alive and not self.no_more:
+                future.cancel()
+            if not future.set_running_or_notify_cancel():
+                # cancelled while in queue
+                self.task_done()
+                continue
+
             try:
-                func(**kwargs)
+                future.set_result(func(**kwargs))
             except Exception as exc:
                 logger.error(f"Error processing {func} with {kwargs=}", exc_info=exc)
+                future.set_exception(exc)
                 if raises:
                     self.exceptions.append(exc)
-                    self.shutdown()
+                    self.shutdown(wait=False)
             finally:
                 # user will manually release the queue for this task.
                 # most likely in a libzim-written callback
@@ -119,22 +184,46 @@ class Executor(queue.Queue):
                     callback.__call__()
 
     def drain(self):
-        """Empty the queue without processing the tasks (tasks will be lost)"""
-        while True:
-            try:
-                self.get_nowait()
-            except queue.Empty:
-                break
+        """Empty the queue without processing the tasks (tasks will be lost)
+
+        Stop signals are kept, each worker consumes its own"""
+        with self.mutex:
+            tasks = [item for _, _, item in self.queue if item is not _STOP]
+            self.queue = [entry for entry in self.queue if entry[2] is _STOP]
+            heapq.heapify(self.queue)
+            self.unfinished_tasks -= len(tasks)
+            if not self.unfinished_tasks:
+                self.all_tasks_done.notify_all()
+            self.not_full.notify_all()
+        for future, _, _ in tasks:
+            future.cancel()
+
+    def _wake_workers(self):
+        """queue a stop signal per worker, after already queued tasks
+
+        Signals are queued even if queue is full and unblock submitters so that
+        they reconsider whether to reject their task. Signals are queued once only
+        until next `start()`"""
+        with self.mutex:
+            if self._stopping:
+                return
+            self._stopping = True
+            for _ in self._workers:
+                self._put(_STOP)
+                self.unfinished_tasks += 1
+            self.not_empty.notify_all()
+            self.not_full.notify_all()
 
     def join(self):
         """Await completion of workers, requesting them to stop taking new task"""
         logger.debug(f"joining all threads for {self.prefix}")
         self.no_more = True
+        self._wake_workers()
         for t in self._workers:
-            e = threading.Event()
-            while t.is_alive():
-                t.join(1)
-                e.wait(timeout=2)
+            if t is not threading.current_thread():
+                t.join()
+        # submitted once all workers were gone, would never be processed
+        self.drain()
         logger.debug(f"all threads joined for {self.prefix}")
 
     def release_halt(self):
@@ -145,10 +234,14 @@ class Executor(queue.Queue):
         """stop the executor, either somewhat immediately or awaiting completion"""
         logger.debug(f"shutting down executor {self.prefix} with {wait=}")
         with self._shutdown_lock:
+            if wait:
+                # set first, so that workers keep processing queued tasks
+                self.no_more = True
             self._shutdown = True
 
             # Drain all work items from the queue
             if not wait:
                 self.drain()
+                self._wake_workers()
         if wait:
             self.join()
@@ -10,14 +10,23 @@ import urllib.parse
 
 from kiwixstorage import KiwixStorage, NotFoundError
 from PIL import Image
-from zimscraperlib.download import stream_file
 from zimscraperlib.image.optimization import optimize_webp
 from zimscraperlib.zim.creator import Creator
 
-from ifixit2zim.constants import IMAGES_ENCODER_VERSION
+from ifixit2zim.bookkeeping import CompactSet, SpillableDict
+from ifixit2zim.constants import (
+    IMAGE_DEFAULT_PRIORITY,
+    IMAGE_DIGEST_SIZE,
+    IMAGE_KIND_PRIORITIES,
+    IMAGE_LARGE_PRIORITY_PENALTY,
+    IMAGE_LARGE_VARIANTS,
+    IMAGES_ENCODER_VERSION,
+    MAX_OUTAGE_RETRIES,
+)
 from ifixit2zim.executor import Executor
 from ifixit2zim.scraper import Configuration
 from ifixit2zim.shared import logger
+from ifixit2zim.singleflight import SingleFlight
 from ifixit2zim.utils import Utils
 
 
@@ -31,9 +40,18 @@ class Imager:
         configuration: Configuration,
     ):
         self.aborted = False
-        # list of source URLs that we've processed and added to ZIM
-        self.handled = set()
-        self.dedup_items = {}
+        # digests of in-zim paths of images submitted for processing, memoizing
+        # `deferred` which ensures each image is submitted only once
+        self.handled = CompactSet()
+        self.deferred = SingleFlight("images", memoize=True, results=self.handled)
+        # truncated digest of image content => in-zim path of first such image
+        self.dedup_items = SpillableDict(
+            spill_after=configuration.bookkeeping_spill_after,
+            spill_dir=configuration.build_path,
+        )
+        # images added to ZIM (incl. missing ones) and lookups in S3 cache
+        self.stats = {"processed": 0, "cache_hits": 0, "cache_misses": 0}
+        self.stats_lock = threading.Lock()
         self.img_executor = img_executor
         self.lock = lock
         self.creator = creator
@@ -42,17 +60,38 @@ class Imager:
 
         self.img_executor.start()
 
+    def count(self, name: str):
+        with self.stats_lock:
+            self.stats[name] += 1
+
     def abort(self):
         """request imager to cancel processing of futures"""
         self.aborted = True
 
+    def download_image(self, url: str) -> io.BytesIO:
+        """Bytes stream of source image, retried if its origin went down meanwhile"""
+        attempt = 0
+        while True:
+            outages = self.utils.origins.outages
+            src = io.BytesIO()
+            try:
+                with self.utils.origins.slot(url):
+                    self.utils.request(url, byte_stream=src, family="images")
+                return src
+            except Exception:
+                attempt += 1
+                if attempt > MAX_OUTAGE_RETRIES or not (
+                    self.utils.origins.had_outage_since(outages)
+                ):
+                    raise
+                logger.debug(f"Failed to download {url} during an outage, retrying")
+
     def get_image_data(self, url: str) -> io.BytesIO:
         """Bytes stream of an optimized version of source image
 
         Bitmap images are converted to WebP and optimized
         SVG images are kept as is"""
-        src, webp = io.BytesIO(), io.BytesIO()
-        stream_file(url=url, byte_stream=src)
+        src, webp = self.download_image(url), io.BytesIO()
 
         if pathlib.Path(url).suffix == ".svg" or "/math/render/svg/" in url:
             return src
@@ -80,8 +119,17 @@ class Imager:
         unquoted_url = urllib.parse.unquote(url_with_only_path.geturl())
         return "images/{}".format(re.sub(r"^(https?)://", r"\1/", unquoted_url))
 
-    def defer(self, url: str) -> str | None:
-        """request full processing of url, returning in-zim path immediately"""
+    def get_priority_for(self, path: str, kind: str | None) -> int:
+        """processing priority of an image, based on referencing item kind and size"""
+        priority = IMAGE_KIND_PRIORITIES.get(kind or "", IMAGE_DEFAULT_PRIORITY)
+        if pathlib.Path(path).suffix.lstrip(".") in IMAGE_LARGE_VARIANTS:
+            priority += IMAGE_LARGE_PRIORITY_PENALTY
+        return priority
+
+    def defer(self, url: str, kind: str | None = None) -> str | None:
+        """request full processing of url, returning in-zim path immediately
+
+        kind of item referencing the image is used to prioritize processing"""
 
         # find actual URL should it be from a provider
         try:
@@ -97,16 +145,18 @@ class Imager:
             return
 
         path = self.get_path_for(parsed_url)
+        return self.deferred.do(
+            path, self.submit_image, url=parsed_url, path=path, kind=kind
+        )
 
-        if path in self.handled:
-            return path
-
-        # record that we are processing this one
-        self.handled.add(path)
-
+    def submit_image(
+        self, url: urllib.parse.ParseResult, path: str, kind: str | None
+    ) -> str:
+        """submit processing of an image to the executor, returning in-zim path"""
         self.img_executor.submit(
             self.process_image,
-            url=parsed_url,
+            priority=self.get_priority_for(path, kind),
+            url=url,
             path=path,
             mimetype="image/svg+xml" if path.endswith(".svg") else "image/webp",
             dont_release=True,
@@ -115,13 +165,14 @@ class Imager:
         return path
 
     def check_for_duplicate(self, path, content):
-        digest = hashlib.sha256(content).digest()
+        digest = hashlib.sha256(content).digest()[:IMAGE_DIGEST_SIZE]
         if digest in self.dedup_items:
             return self.dedup_items[digest]
         self.dedup_items[digest] = path
         return None
 
     def add_image_to_zim(self, path, content, mimetype):
+        self.count("processed")
         duplicate_path = self.check_for_duplicate(path, content)
         with self.lock:
             if duplicate_path:
@@ -134,9 +185,12 @@ class Imager:
                     path=path,
                     content=content,
                     mimetype=mimetype,
+                    # WebP is already compressed, SVG is text
+                    should_compress=mimetype == "image/svg+xml",
                 )
 
     def add_missing_image_to_zim(self, path):
+        self.count("processed")
         with self.lock:
             self.creator.add_redirect(
                 path=path,
@@ -189,15 +243,23 @@ class Imager:
         download_failed = False  # useful to trigger reupload or not
         try:
             fileobj = io.BytesIO()
-            s3_storage.download_matching_fileobj(path, fileobj, meta=meta)
+            with (
+                self.utils.origins.slot(s3_storage.url.geturl()),
+                self.utils.metrics.measure("S3 downloads") as measure,
+            ):
+                s3_storage.download_matching_fileobj(path, fileobj, meta=meta)
+                measure.status = "found"
+                measure.bytes = fileobj.tell()
+            self.utils.origins.count_bytes(s3_storage.url.geturl(), fileobj.tell())
             logger.debug(f"'{path}' found in S3")
         except NotFoundError:
             # don't have it, not a donwload error. we'll upload after processing
-            pass
+            self.count("cache_misses")
         except Exception as exc:
             logger.error(f"Failed to download '{path}' from cache", exc_info=exc)
             download_failed = True
         else:
+            self.count("cache_hits")
             self.add_image_to_zim(
                 path=path,
                 content=fileobj.getvalue(),
@@ -229,7 +291,12 @@ class Imager:
         if not download_failed:
             logger.debug(f"Uploading {url.geturl()} to S3::{path} with {meta}")
             try:
-                s3_storage.upload_fileobj(fileobj=fileobj, key=path, meta=meta)
+                with (
+                    self.utils.origins.slot(s3_storage.url.geturl()),
+                    self.utils.metrics.measure("S3 uploads") as measure,
+                ):
+                    s3_storage.upload_fileobj(fileobj=fileobj, key=path, meta=meta)
+                    measure.status = "uploaded"
             except Exception as exc:
                 logger.error(f"{path} failed to upload to cache", exc_info=exc)
 
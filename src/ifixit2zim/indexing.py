@@ -0,0 +1,82 @@
+import threading
+
+import libzim.writer  # pyright: ignore
+from zimscraperlib.zim.items import StaticItem
+
+# how a page is indexed in full-text index
+FULL, SUMMARY, NONE = "full", "summary", "none"
+
+
+class SummaryIndexData(libzim.writer.IndexData):
+    """title and summary of a page, indexed in place of its whole content"""
+
+    def __init__(self, title: str, summary: str):
+        super().__init__()
+        self.title = title
+        self.summary = summary
+
+    def has_indexdata(self) -> bool:
+        return True
+
+    def get_title(self) -> str:
+        return self.title
+
+    def get_content(self) -> str:
+        return self.summary
+
+    def get_keywords(self) -> str:
+        return ""
+
+    def get_wordcount(self) -> int:
+        return len(self.summary.split())
+
+    def get_geoposition(self):
+        return None
+
+
+class NotIndexedItem(StaticItem):
+    """StaticItem kept out of full-text index"""
+
+    def get_indexdata(self):
+        return None
+
+
+class SummaryIndexedItem(StaticItem):
+    """StaticItem whose title and `summary` only are in full-text index"""
+
+    def get_indexdata(self):
+        return SummaryIndexData(self.get_title(), getattr(self, "summary", ""))
+
+
+class IndexingPolicy:
+    """Decides how pages are full-text indexed, and counts them
+
+    Pages of `kinds` are indexed by libzim from their whole content, except those
+    larger than `summary_above` bytes (if set) of which only title and summary are
+    indexed. Pages of other kinds are not indexed"""
+
+    def __init__(self, kinds: set[str], summary_above: int = 0):
+        self.kinds = kinds
+        self.summary_above = summary_above
+        self.lock = threading.Lock()
+        # kind => mode => {"items": number of pages, "bytes": bytes indexed}
+        self.stats: dict[str, dict[str, dict[str, int]]] = {}
+
+    def get_mode(self, kind: str, size: int) -> str:
+        if kind not in self.kinds:
+            return NONE
+        if self.summary_above and size > self.summary_above:
+            return SUMMARY
+        return FULL
+
+    def record(self, kind: str, size: int, summary: str | None) -> str:
+        """indexing mode of a page of `size` bytes, counted in stats"""
+        mode = self.get_mode(kind, size)
+        indexed = {FULL: size, SUMMARY: len((summary or "").encode("utf-8"))}
+        with self.lock:
+            stats = self.stats.setdefault(kind, {}).setdefault(
+                mode, {"items": 0, "bytes": 0}
+            )
+            stats["items"] += 1
+            stats["bytes"] += indexed.get(mode, 0)
+        return mode
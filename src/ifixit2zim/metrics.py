@@ -0,0 +1,156 @@
+import bisect
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from ifixit2zim.constants import HTTP_LATENCY_BUCKETS
+from ifixit2zim.shared import logger
+
+# API endpoints whose second segment is a kind (/wikis/CATEGORY), not an identifier
+API_KINDS_WITH_SUBKIND = ("wikis",)
+
+
+def get_api_family(path: str) -> str:
+    """endpoint family of an API path, identifiers replaced: /wikis/CATEGORY/{id}"""
+    segments = [segment for segment in path.split("?")[0].split("/") if segment]
+    if not segments:
+        return "API /"
+    kept = segments[:2] if segments[0] in API_KINDS_WITH_SUBKIND else segments[:1]
+    if len(segments) > len(kept):
+        kept.append("{id}")
+    return "API /" + "/".join(kept)
+
+
+class Measure:
+    """A request being measured, see HttpMetrics.measure()"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.status = None
+        self.bytes = 0
+
+
+class EndpointStats:
+    """Requests of an endpoint family: latency histogram, statuses, retries, bytes"""
+
+    def __init__(self):
+        self.requests = 0
+        # number of requests per latency bucket (see HTTP_LATENCY_BUCKETS), +inf last
+        self.histogram = [0] * (len(HTTP_LATENCY_BUCKETS) + 1)
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        # HTTP status code, or name of exception if none was received => count
+        self.statuses = Counter()
+        self.retries = 0
+        self.bytes = 0
+
+    def record(self, latency: float, status: int | str, size: int):
+        self.requests += 1
+        self.histogram[bisect.bisect_left(HTTP_LATENCY_BUCKETS, latency)] += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        self.statuses[str(status)] += 1
+        self.bytes += size
+
+    def get_percentile(self, ratio: float) -> float:
+        """upper bound of latency of `ratio` of requests, max latency if unbounded"""
+        threshold = ratio * self.requests
+        seen = 0
+        for bound, count in zip(HTTP_LATENCY_BUCKETS, self.histogram, strict=False):
+            seen += count
+            if seen >= threshold:
+                return min(bound, self.max_latency)
+        return self.max_latency
+
+    def get_summary(self) -> dict:
+        return {
+            "requests": self.requests,
+            "mean_latency": self.total_latency / self.requests if self.requests else 0,
+            "p50_latency": self.get_percentile(0.5),
+            "p90_latency": self.get_percentile(0.9),
+            "p99_latency": self.get_percentile(0.99),
+            "max_latency": self.max_latency,
+            "histogram": dict(
+                zip(
+                    [*map(str, HTTP_LATENCY_BUCKETS), "+inf"],
+                    self.histogram,
+                    strict=True,
+                )
+            ),
+            "statuses": dict(self.statuses),
+            "retries": self.retries,
+            "bytes": self.bytes,
+        }
+
+
+class HttpMetrics:
+    """Latency, statuses, retries and bytes of HTTP requests, per endpoint family
+
+    Families are what is worth comparing: an API endpoint with identifiers removed
+    (`API /guides/{id}`), redirects probes, images, S3..."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints: dict[str, EndpointStats] = {}
+        # family of last request measured by each thread, see count_retry()
+        self.last_family = threading.local()
+
+    def get_endpoint(self, family: str) -> EndpointStats:
+        # under lock
+        if family not in self.endpoints:
+            self.endpoints[family] = EndpointStats()
+        return self.endpoints[family]
+
+    @contextmanager
+    def measure(self, family: str):
+        """measure a request sent within the block
+
+        Block sets `status` and `bytes` of yielded Measure. Requests failing
+        before a status is set are counted under the name of their exception"""
+        measure = Measure()
+        self.last_family.family = family
+        try:
+            yield measure
+        except BaseException as exc:
+            if measure.status is None:
+                measure.status = type(exc).__name__
+            raise
+        finally:
+            with self.lock:
+                self.get_endpoint(family).record(
+                    latency=time.monotonic() - measure.started,
+                    status=measure.status or "unknown",
+                    size=measure.bytes,
+                )
+
+    def count_retry(self):
+        """count a retry of last request measured by current thread"""
+        family = getattr(self.last_family, "family", "unknown")
+        with self.lock:
+            self.get_endpoint(family).retries += 1
+
+    def get_summary(self) -> dict[str, dict]:
+        with self.lock:
+            return {
+                family: stats.get_summary()
+                for family, stats in sorted(self.endpoints.items())
+            }
+
+    def log_summary(self):
+        logger.info("HTTP requests per endpoint:")
+        for family, summary in self.get_summary().items():
+            statuses = ", ".join(
+                f"{status}: {count}"
+                for status, count in sorted(summary["statuses"].items())
+            )
+            logger.info(
+                f"\t{family}: {summary['requests']} requests, latency "
+                f"mean {summary['mean_latency']:.2f}s "
+                f"p50 {summary['p50_latency']:.2f}s "
+                f"p90 {summary['p90_latency']:.2f}s "
+                f"p99 {summary['p99_latency']:.2f}s "
+                f"max {summary['max_latency']:.2f}s, "
+                f"{summary['retries']} retries, "
+                f"{summary['bytes'] / 2**20:.1f} MiB, statuses {statuses}"
+            )
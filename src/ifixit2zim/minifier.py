@@ -0,0 +1,106 @@
+import re
+
+# blocks which are kept untouched: whitespace is meaningful inside <pre> and
+# <textarea>, we do not parse inline <script> / <style> and IE conditional comments
+# are not real comments
+_preserved_block_regex = re.compile(
+    r"<!--\[if.*?<!\[endif\]-->"
+    r"|<!--<!\[endif\]-->"
+    r"|<(?P<tag>pre|textarea|script|style)\b.*?</(?P=tag)\s*>",
+    flags=re.IGNORECASE | re.DOTALL,
+)
+_comment_regex = re.compile(r"<!--.*?-->", flags=re.DOTALL)
+_tag_regex = re.compile(r"<(?:[^>\"']|\"[^\"]*\"|'[^']*')*>")
+_tag_whitespace_regex = re.compile(r"(\"[^\"]*\"|'[^']*')|\s+")
+_whitespace_regex = re.compile(r"\s+")
+
+
+def _collapse_whitespace(match: re.Match) -> str:
+    """single newline if whitespace run spans multiple lines, single space otherwise"""
+    return "\n" if "\n" in match.group(0) else " "
+
+
+def _minify_tag(tag: str) -> str:
+    """tag with whitespace between attributes collapsed, values left untouched"""
+    return _tag_whitespace_regex.sub(lambda match: match.group(1) or " ", tag)
+
+
+def _minify_fragment(fragment: str) -> str:
+    fragment = _comment_regex.sub("", fragment)
+    parts = []
+    position = 0
+    for match in _tag_regex.finditer(fragment):
+        parts.append(
+            _whitespace_regex.sub(
+                _collapse_whitespace, fragment[position : match.start()]
+            )
+        )
+        parts.append(_minify_tag(match.group(0)))
+        position = match.end()
+    parts.append(_whitespace_regex.sub(_collapse_whitespace, fragment[position:]))
+    return "".join(parts)
+
+
+def minify_html(content: str) -> str:
+    """Conservative minification of an HTML document
+
+    - HTML comments are removed (IE conditional comments are kept)
+    - runs of whitespace are collapsed into a single space (or newline)
+    - <pre>, <textarea>, <script> and <style> blocks are kept as is
+
+    Collapsing (instead of removing) whitespace keeps rendering identical since
+    browsers treat any whitespace run outside those blocks as a single space"""
+    parts = []
+    position = 0
+    for match in _preserved_block_regex.finditer(content):
+        parts.append(_minify_fragment(content[position : match.start()]))
+        parts.append(match.group(0))
+        position = match.end()
+    parts.append(_minify_fragment(content[position:]))
+    return "".join(parts)
+
+
+_css_token_regex = re.compile(
+    r"(?P<string>\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*')"
+    r"|(?P<comment>/\*.*?\*/)"
+    r"|(?P<whitespace>\s+)",
+    flags=re.DOTALL,
+)
+_css_punctuation_regex = re.compile(r"\s*([{};,>])\s*")
+_css_colon_regex = re.compile(r":\s+")
+
+
+def _minify_css_code(code: str) -> str:
+    code = _css_punctuation_regex.sub(r"\1", code)
+    # whitespace before a colon is significant in selectors (`a :hover`)
+    return _css_colon_regex.sub(":", code).replace(";}", "}")
+
+
+def minify_css(content: str) -> str:
+    """Conservative minification of a CSS stylesheet
+
+    Comments are removed and whitespace is collapsed or removed around punctuation
+    where it is not significant. Strings (including data URIs) are kept as is"""
+    parts = []
+    code = []
+    position = 0
+    for match in _css_token_regex.finditer(content):
+        code.append(content[position : match.start()])
+        position = match.end()
+        if match.group("string"):
+            parts.append(_minify_css_code("".join(code)))
+            parts.append(match.group("string"))
+            code = []
+        elif match.group("whitespace"):
+            code.append(" ")
+    code.append(content[position:])
+    parts.append(_minify_css_code("".join(code)))
+    return "".join(parts).strip()
+
+
+def minify_js(content: str) -> str:
+    """Whitespace-only minification of a JavaScript source
+
+    Indentation, trailing spaces and blank lines are removed but line breaks are kept
+    so that automatic semicolon insertion still applies"""
+    return "\n".join(line.strip() for line in content.splitlines() if line.strip())
@@ -0,0 +1,80 @@
+import json
+import os
+import pathlib
+import tempfile
+import threading
+import time
+
+from ifixit2zim.shared import logger
+
+
+class NegativeCache:
+    """Persistent set of (key, language) pairs known to have no content
+
+    Stored as a JSON file shared by successive runs, including runs for other
+    languages: `{language: {key: timestamp}}`. Entries expire after `ttl` seconds
+    so that content added since then is eventually found. Saving merges entries
+    with those saved meanwhile by other runs."""
+
+    def __init__(self, path: pathlib.Path | None, ttl: float):
+        self.path = path
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = self._load()
+        self.hits = 0
+
+    def _load(self) -> dict[str, dict[str, float]]:
+        if not self.path or not self.path.exists():
+            return {}
+        try:
+            entries = json.loads(self.path.read_text(encoding="utf-8"))
+        except Exception as exc:
+            logger.warning(f"Ignoring unreadable cache {self.path}", exc_info=exc)
+            return {}
+        expired_before = time.time() - self.ttl
+        return {
+            language: {
+                key: timestamp
+                for key, timestamp in keys.items()
+                if timestamp > expired_before
+            }
+            for language, keys in entries.items()
+        }
+
+    def __contains__(self, pair: tuple[str, str]) -> bool:
+        """whether pair is known to have no content, entry not expired"""
+        key, language = pair
+        with self.lock:
+            timestamp = self.entries.get(language, {}).get(key)
+            if timestamp is not None and timestamp > time.time() - self.ttl:
+                self.hits += 1
+                return True
+            return False
+
+    def add(self, key: str, language: str):
+        with self.lock:
+            self.entries.setdefault(language, {})[key] = time.time()
+
+    def save(self):
+        """write entries to disk, atomically, merged with those saved meanwhile"""
+        if not self.path:
+            return
+        with self.lock:
+            entries = self._load()
+            for language, keys in self.entries.items():
+                entries.setdefault(language, {}).update(keys)
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with tempfile.NamedTemporaryFile(
+                    "w", dir=self.path.parent, delete=False, encoding="utf-8"
+                ) as fh:
+                    json.dump(entries, fh)
+                os.replace(fh.name, self.path)
+            except OSError as exc:
+                # e.g. read-only or missing HOME in containers, cache is optional
+                logger.warning(f"Unable to save {self.path}: {exc}")
+                return
+        logger.debug(
+            f"Saved {sum(len(keys) for keys in entries.values())} entries to "
+            f"{self.path}"
+        )
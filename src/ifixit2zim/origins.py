@@ -0,0 +1,365 @@
+import threading
+import time
+import urllib.parse
+from contextlib import contextmanager
+from http import HTTPStatus
+
+import requests
+
+from ifixit2zim.constants import (
+    ORIGIN_BREAKER_COOLDOWN,
+    ORIGIN_BREAKER_MAX_COOLDOWN,
+    ORIGIN_BREAKER_MAX_OUTAGE,
+    ORIGIN_BREAKER_THRESHOLD,
+    ORIGIN_CONGESTION_LATENCY_RATIO,
+    ORIGIN_INITIAL_CONCURRENCY,
+    ORIGIN_MAX_CONCURRENCY,
+    ORIGIN_MIN_CONCURRENCY,
+)
+from ifixit2zim.exceptions import OriginUnavailableError
+from ifixit2zim.shared import logger
+
+
+def is_congestion_status(status_code: int) -> bool:
+    """whether an HTTP status means the origin is overloaded"""
+    return (
+        status_code == HTTPStatus.TOO_MANY_REQUESTS
+        or status_code >= HTTPStatus.INTERNAL_SERVER_ERROR
+    )
+
+
+def is_congestion_error(exc: BaseException) -> bool:
+    """whether an exception raised while querying means the origin is overloaded"""
+    if isinstance(exc, requests.exceptions.HTTPError) and exc.response is not None:
+        return is_congestion_status(exc.response.status_code)
+    return isinstance(
+        exc, requests.exceptions.ConnectionError | requests.exceptions.Timeout
+    )
+
+
+class OriginSlot:
+    """A request in flight to an origin, see `AdaptiveLimiter.slot()`
+
+    Callers not raising on HTTP errors must `record()` the response status"""
+
+    def __init__(self):
+        self.congested = False
+
+    def record(self, status_code: int):
+        self.congested = is_congestion_status(status_code)
+
+
+class AdaptiveLimiter:
+    """AIMD limit of the number of concurrent requests to a single origin
+
+    Limit grows additively (by one every `limit` successful requests) and is halved
+    on congestion, i.e. on 429 / 5xx responses, connection errors and timeouts, or
+    when recent latency gets much higher than the long term one. A single decrease
+    is applied per window of `limit` requests since concurrent requests usually
+    fail together."""
+
+    def __init__(
+        self,
+        name: str,
+        initial: int = ORIGIN_INITIAL_CONCURRENCY,
+        minimum: int = ORIGIN_MIN_CONCURRENCY,
+        maximum: int = ORIGIN_MAX_CONCURRENCY,
+        latency_ratio: float = ORIGIN_CONGESTION_LATENCY_RATIO,
+    ):
+        self.name = name
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_ratio = latency_ratio
+        self.limit = float(initial)
+        self.in_flight = 0
+        self.condition = threading.Condition()
+        # exponential moving averages of latency (seconds), short and long term
+        self.recent_latency = None
+        self.baseline_latency = None
+        # number of completed requests before another decrease is allowed
+        self.decrease_cooldown = 0
+        self.stats = {
+            "requests": 0,
+            "congestions": 0,
+            "increases": 0,
+            "decreases": 0,
+            "max_in_flight": 0,
+            "max_limit": initial,
+            "min_limit": initial,
+            "bytes": 0,
+        }
+
+    @property
+    def current_limit(self) -> int:
+        return int(self.limit)
+
+    def count_bytes(self, size: int):
+        with self.condition:
+            self.stats["bytes"] += size
+
+    def acquire(self):
+        """block until a request can be sent to this origin"""
+        with self.condition:
+            while self.in_flight >= self.current_limit:
+                self.condition.wait()
+            self.in_flight += 1
+            self.stats["max_in_flight"] = max(
+                self.stats["max_in_flight"], self.in_flight
+            )
+
+    def release(self, latency: float, *, congested: bool):
+        """complete a request, adapting limit to its outcome"""
+        with self.condition:
+            self.in_flight -= 1
+            self.stats["requests"] += 1
+            congested = self._record_latency(latency) or congested
+            if congested:
+                self.stats["congestions"] += 1
+            previous = self.current_limit
+
+            self.decrease_cooldown = max(self.decrease_cooldown - 1, 0)
+            if congested and not self.decrease_cooldown:
+                self.limit = max(self.limit / 2, self.minimum)
+                self.decrease_cooldown = previous
+            elif not congested:
+                self.limit = min(self.limit + 1 / self.limit, self.maximum)
+
+            if self.current_limit > previous:
+                self.stats["increases"] += 1
+                self.stats["max_limit"] = max(
+                    self.stats["max_limit"], self.current_limit
+                )
+                logger.debug(
+                    f"Raising concurrency for {self.name} to {self.current_limit}"
+                )
+            elif self.current_limit < previous:
+                self.stats["decreases"] += 1
+                self.stats["min_limit"] = min(
+                    self.stats["min_limit"], self.current_limit
+                )
+                logger.info(
+                    f"Lowering concurrency for {self.name} to {self.current_limit} "
+                    f"(recent latency {self.recent_latency:.3f}s, "
+                    f"baseline {self.baseline_latency:.3f}s)"
+                )
+            self.condition.notify_all()
+
+    def _record_latency(self, latency: float) -> bool:
+        """update latency averages, returning whether latency reveals congestion"""
+        if self.recent_latency is None or self.baseline_latency is None:
+            self.recent_latency = self.baseline_latency = latency
+            return False
+        self.recent_latency += (latency - self.recent_latency) * 0.3
+        self.baseline_latency += (latency - self.baseline_latency) * 0.02
+        return self.recent_latency > self.baseline_latency * self.latency_ratio
+
+    @contextmanager
+    def slot(self):
+        """hold a request slot for the duration of the block
+
+        Exceptions raised in the block are inspected to detect congestion"""
+        self.acquire()
+        slot = OriginSlot()
+        started = time.monotonic()
+        try:
+            yield slot
+        except BaseException as exc:
+            slot.congested = slot.congested or is_congestion_error(exc)
+            raise
+        finally:
+            self.release(time.monotonic() - started, congested=slot.congested)
+
+    def get_stats(self) -> dict:
+        with self.condition:
+            return {
+                **self.stats,
+                "limit": self.current_limit,
+                "in_flight": self.in_flight,
+                "recent_latency": self.recent_latency,
+                "baseline_latency": self.baseline_latency,
+            }
+
+
+class CircuitBreaker:
+    """Stops all traffic to an origin which looks down, until it recovers
+
+    Circuit opens after `threshold` consecutive congested requests. Callers then
+    block in `wait()` until `cooldown` has elapsed, at which point a single one is
+    let through as a probe (half-open state). Circuit closes if probe succeeds and
+    reopens with a doubled cooldown otherwise. `OriginUnavailableError` is raised
+    once the outage lasted more than `max_outage` seconds."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(
+        self,
+        name: str,
+        threshold: int = ORIGIN_BREAKER_THRESHOLD,
+        cooldown: float = ORIGIN_BREAKER_COOLDOWN,
+        max_cooldown: float = ORIGIN_BREAKER_MAX_COOLDOWN,
+        max_outage: float = ORIGIN_BREAKER_MAX_OUTAGE,
+    ):
+        self.name = name
+        self.threshold = threshold
+        self.initial_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.max_outage = max_outage
+        self.condition = threading.Condition()
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.cooldown = cooldown
+        self.opened_at = 0.0
+        self.outage_started_at = 0.0
+        self.probing = False
+        # number of times circuit opened, from closed state
+        self.outages = 0
+
+    def wait(self):
+        """block while circuit is open, returning when a request can be sent"""
+        with self.condition:
+            while True:
+                if self.state == self.CLOSED:
+                    return
+                now = time.monotonic()
+                give_up_in = self.outage_started_at + self.max_outage - now
+                if give_up_in < 0:
+                    raise OriginUnavailableError(
+                        f"{self.name} unavailable for more than {self.max_outage}s"
+                    )
+                if self.state == self.OPEN:
+                    remaining = self.opened_at + self.cooldown - now
+                    if remaining <= 0:
+                        logger.info(f"Probing {self.name} health")
+                        self.state = self.HALF_OPEN
+                        self.probing = True
+                        return
+                    self.condition.wait(min(remaining, give_up_in))
+                else:
+                    # a probe is in flight, wait for its outcome
+                    self.condition.wait(give_up_in)
+
+    def record(self, *, congested: bool):
+        """update circuit state with outcome of a request"""
+        with self.condition:
+            if not congested:
+                self.consecutive_failures = 0
+                if self.state != self.CLOSED:
+                    logger.info(f"{self.name} recovered, resuming traffic")
+                    self.state = self.CLOSED
+                    self.cooldown = self.initial_cooldown
+                    self.probing = False
+                    self.condition.notify_all()
+                return
+
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN and self.probing:
+                self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+                self._open()
+            elif (
+                self.state == self.CLOSED
+                and self.consecutive_failures >= self.threshold
+            ):
+                self.outages += 1
+                self.outage_started_at = time.monotonic()
+                self._open()
+
+    def _open(self):
+        logger.warning(
+            f"{self.name} looks down ({self.consecutive_failures} failures in a "
+            f"row), pausing traffic for {self.cooldown:.0f}s"
+        )
+        self.state = self.OPEN
+        self.probing = False
+        self.opened_at = time.monotonic()
+        self.condition.notify_all()
+
+    @property
+    def is_closed(self) -> bool:
+        with self.condition:
+            return self.state == self.CLOSED
+
+
+class Origins:
+    """Registry of adaptive limiters and circuit breakers, one per origin (host)"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.limiters = {}
+        self.breakers = {}
+
+    def get_origin(self, url: str) -> str:
+        netloc = urllib.parse.urlparse(url).netloc
+        # do not leak credentials (S3 URLs) in logs and stats
+        return netloc.rsplit("@", 1)[-1]
+
+    def get_limiter(self, url: str) -> AdaptiveLimiter:
+        origin = self.get_origin(url)
+        with self.lock:
+            if origin not in self.limiters:
+                self.limiters[origin] = AdaptiveLimiter(name=origin)
+            return self.limiters[origin]
+
+    def get_breaker(self, url: str) -> CircuitBreaker:
+        origin = self.get_origin(url)
+        with self.lock:
+            if origin not in self.breakers:
+                self.breakers[origin] = CircuitBreaker(name=origin)
+            return self.breakers[origin]
+
+    @contextmanager
+    def slot(self, url: str):
+        """hold a request slot for the origin of url for the duration of the block
+
+        Blocks while origin's circuit is open"""
+        breaker = self.get_breaker(url)
+        breaker.wait()
+        slot = OriginSlot()
+        try:
+            with self.get_limiter(url).slot() as slot:
+                yield slot
+        finally:
+            breaker.record(congested=slot.congested)
+
+    def count_bytes(self, url: str, size: int):
+        """record bytes received from origin of url"""
+        self.get_limiter(url).count_bytes(size)
+
+    @property
+    def downloaded_bytes(self) -> int:
+        """bytes received so far, across all origins"""
+        with self.lock:
+            limiters = list(self.limiters.values())
+        return sum(limiter.stats["bytes"] for limiter in limiters)
+
+    @property
+    def outages(self) -> int:
+        """number of outages detected so far, across all origins"""
+        with self.lock:
+            breakers = list(self.breakers.values())
+        return sum(breaker.outages for breaker in breakers)
+
+    @property
+    def all_closed(self) -> bool:
+        """whether no origin is currently considered down"""
+        with self.lock:
+            breakers = list(self.breakers.values())
+        return all(breaker.is_closed for breaker in breakers)
+
+    def had_outage_since(self, outages: int) -> bool:
+        """whether an origin went down since `outages` was read, or still is"""
+        return self.outages != outages or not self.all_closed
+
+    def get_stats(self) -> dict[str, dict]:
+        with self.lock:
+            limiters = dict(self.limiters)
+            breakers = dict(self.breakers)
+        return {
+            origin: {
+                **limiter.get_stats(),
+                "circuit": breakers[origin].state if origin in breakers else None,
+                "outages": breakers[origin].outages if origin in breakers else 0,
+            }
+            for origin, limiter in limiters.items()
+        }
@@ -2,22 +2,37 @@ import datetime
 import re
 import threading
 import urllib.parse
+from contextlib import contextmanager
 
-import requests
+from libzim.writer import Hint  # pyright: ignore
 from zimscraperlib.zim.creator import Creator
 
+from ifixit2zim.bookkeeping import SpillableDict
 from ifixit2zim.constants import (
     DEFAULT_DEVICE_IMAGE_URL,
     DEFAULT_GUIDE_IMAGE_URL,
     DEFAULT_USER_IMAGE_URLS,
     DEFAULT_WIKI_IMAGE_URL,
+    GUIDE_IMAGE_VARIANT_SIZES,
+    IMAGE_PLACEHOLDER_COLOR,
     NOT_YET_AVAILABLE,
     UNAVAILABLE_OFFLINE,
 )
-from ifixit2zim.exceptions import ImageUrlNotFoundError
+from ifixit2zim.exceptions import ImageUrlNotFoundError, OriginUnavailableError
 from ifixit2zim.imager import Imager
+from ifixit2zim.indexing import (
+    FULL,
+    SUMMARY,
+    IndexingPolicy,
+    NotIndexedItem,
+    SummaryIndexedItem,
+)
+from ifixit2zim.minifier import minify_html
+from ifixit2zim.origins import is_congestion_error, is_congestion_status
 from ifixit2zim.scraper import Configuration
 from ifixit2zim.shared import logger, setlocale
+from ifixit2zim.singleflight import SingleFlight
+from ifixit2zim.utils import Utils
 
 
 class Processor:
@@ -27,14 +42,31 @@ class Processor:
         configuration: Configuration,
         creator: Creator,
         imager: Imager,
+        utils: Utils,
     ) -> None:
         self.null_categories = set()
         self.ifixit_external_content = set()
-        self.final_hrefs = {}
+        # href => final href, once redirects are followed
+        self.final_hrefs = SingleFlight(
+            "redirects",
+            memoize=True,
+            results=SpillableDict(
+                spill_after=configuration.bookkeeping_spill_after,
+                spill_dir=configuration.build_path,
+            ),
+        )
+        self.minify_stats = {}
+        self.indexing = IndexingPolicy(
+            kinds=configuration.index_kinds,
+            summary_above=configuration.index_summary_above * 2**10,
+        )
+        # kind of item being rendered by current thread
+        self.rendering = threading.local()
         self.lock = lock
         self.configuration = configuration
         self.creator = creator
         self.imager = imager
+        self.utils = utils
 
     @property
     def get_guide_link_from_props(self):
@@ -60,6 +92,14 @@ class Processor:
     def get_info_link_from_props(self, get_info_link_from_props):
         self._get_info_link_from_props = get_info_link_from_props
 
+    @property
+    def is_category_selected(self):
+        return self._is_category_selected
+
+    @is_category_selected.setter
+    def is_category_selected(self, is_category_selected):
+        self._is_category_selected = is_category_selected
+
     @property
     def get_user_link_from_props(self):
         return self._get_user_link_from_props
@@ -87,8 +127,19 @@ class Processor:
             return 0
         return len(category["tools"])
 
+    @contextmanager
+    def rendering_kind(self, kind):
+        """mark items rendered by current thread as being of a given kind"""
+        self.rendering.kind = kind
+        try:
+            yield
+        finally:
+            self.rendering.kind = None
+
     def get_image_path(self, image_url):
-        return self.imager.defer(url=image_url)
+        return self.imager.defer(
+            url=image_url, kind=getattr(self.rendering, "kind", None)
+        )
 
     def _get_image_url_search(
         self, obj, *, for_guide: bool, for_device: bool, for_wiki: bool, for_user: bool
@@ -246,14 +297,21 @@ class Processor:
         )
 
     def normalize_href(self, href):
-        if href in self.final_hrefs:
-            return self.final_hrefs[href]
+        return self.final_hrefs.do(href, self._resolve_href, href=href)
+
+    def _resolve_href(self, href):
         try:
             logger.debug(f"Normalizing href {href}")
             # final_href = requests.head(href).headers.get("Location")
             # if final_href is None:
             #     logger.debug(f"Failed to HEAD {href}, falling back to GET")
-            final_href = requests.get(href, stream=True, timeout=10).url
+            with self.utils.origins.slot(href) as slot:
+                # body is not needed, only URL once redirects are followed
+                with self.utils.open_stream(href, family="redirects") as (resp, _):
+                    slot.record(resp.status_code)
+            if is_congestion_status(resp.status_code):
+                resp.raise_for_status()
+            final_href = resp.url
             # parse final href and remove scheme + netloc + slash
             parsed_final_href = urllib.parse.urlparse(final_href)
             parsed_href = urllib.parse.urlparse(href)
@@ -265,11 +323,13 @@ class Processor:
 
             final_href = final_href[chars_to_remove:]
             final_href = urllib.parse.unquote(final_href)
-        except Exception:
+        except Exception as exc:
+            # transient failures are not memoized, item is retried (see ScraperGeneric)
+            if isinstance(exc, OriginUnavailableError) or is_congestion_error(exc):
+                raise
             # this is quite expected for some missing items ; this will be taken care
             # of at retrieval, no way to do something better
             final_href = href
-        self.final_hrefs[href] = final_href
         logger.debug(f"Result is {final_href}")
         return final_href
 
@@ -357,18 +417,99 @@ class Processor:
             content,
         )
 
+    img_tag_regex = re.compile(r"<img\b(?P<attributes>[^>]*?)(?P<end>/?>)", re.I)
+    img_attribute_regex = r"\s{}\s*="
+    guide_image_variant_regex = re.compile(
+        r"\ssrc\s*=\s*\"[^\"]*/guide-images\.cdn\.ifixit\.com/igi/[^\"/]+"
+        r"\.(?P<variant>[\w]+)\"",
+        re.I,
+    )
+
+    def _has_img_attribute(self, attributes, name):
+        return re.search(self.img_attribute_regex.format(name), attributes, re.I)
+
+    def _process_img_tag(self, match, *, eager):
+        attributes = match.group("attributes")
+        added = []
+        if not eager and not self._has_img_attribute(attributes, "loading"):
+            added.append('loading="lazy"')
+        if not self._has_img_attribute(attributes, "decoding"):
+            added.append('decoding="async"')
+        # reserve space for guide images of known size, unless the tag already
+        # carries sizing information
+        variant_match = self.guide_image_variant_regex.search(attributes)
+        if (
+            variant_match
+            and variant_match.group("variant") in GUIDE_IMAGE_VARIANT_SIZES
+            and not self._has_img_attribute(attributes, "width")
+            and not self._has_img_attribute(attributes, "height")
+            and not self._has_img_attribute(attributes, "style")
+        ):
+            width, height = GUIDE_IMAGE_VARIANT_SIZES[variant_match.group("variant")]
+            style = "height:auto"
+            if self.configuration.image_placeholder:
+                style += f";background-color:{IMAGE_PLACEHOLDER_COLOR}"
+            added.append(f'width="{width}" height="{height}" style="{style}"')
+        if not added:
+            return match.group(0)
+        return f"<img {' '.join(added)}{attributes}{match.group('end')}"
+
+    def add_images_lazy_loading(self, content):
+        """HTML content with lazy-loading and size hints added to <img> tags
+
+        First image of the page is left eagerly loaded since it is most probably
+        above the fold"""
+        index = 0
+
+        def process(match):
+            nonlocal index
+            index += 1
+            return self._process_img_tag(match, eager=index == 1)
+
+        return self.img_tag_regex.sub(process, content)
+
     def convert_title_to_filename(self, title):
         return re.sub(r"\s", "_", title)
 
-    def add_html_item(self, path, title, content, *, is_front=True):
+    def add_html_item(self, path, title, content, kind, *, is_front=True, summary=None):
+        """add an HTML page, indexed according to its kind and size
+
+        `summary` is indexed along title in place of the whole page when it is
+        larger than --index-summary-above"""
+        content = self.add_images_lazy_loading(content)
+        if self.configuration.minify_html:
+            minified = minify_html(content)
+            with self.lock:
+                stats = self.minify_stats.setdefault(
+                    kind, {"items": 0, "raw_bytes": 0, "minified_bytes": 0}
+                )
+                stats["items"] += 1
+                stats["raw_bytes"] += len(content.encode("utf-8"))
+                stats["minified_bytes"] += len(minified.encode("utf-8"))
+            content = minified
+        mode = self.indexing.record(kind, len(content.encode("utf-8")), summary)
         with self.lock:
-            logger.debug(f"Adding item in ZIM at path '{path}'")
-            self.creator.add_item_for(
-                path=path,
-                title=title,
-                content=content,
-                mimetype="text/html",
-                is_front=is_front,
+            logger.debug(f"Adding item in ZIM at path '{path}' ({mode} index)")
+            if mode == FULL:
+                self.creator.add_item_for(
+                    path=path,
+                    title=title,
+                    content=content,
+                    mimetype="text/html",
+                    is_front=is_front,
+                    should_compress=True,
+                )
+                return
+            item_class = SummaryIndexedItem if mode == SUMMARY else NotIndexedItem
+            self.creator.add_item(
+                item_class(
+                    path=path,
+                    title=title,
+                    content=content,
+                    mimetype="text/html",
+                    hints={Hint.FRONT_ARTICLE: is_front, Hint.COMPRESS: True},
+                    summary=summary or "",
+                )
             )
 
     def add_redirect(self, path, target_path):
@@ -0,0 +1,95 @@
+import json
+import os
+import pathlib
+import tempfile
+import threading
+import time
+from collections.abc import Callable
+
+from ifixit2zim.shared import logger
+
+
+class Throughput:
+    """Rates of counters, per second, between successive samples"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # counter name => (time, value) of last sample
+        self.samples = {}
+
+    def rate(self, name: str, value: int) -> float | None:
+        """rate of counter since its previous sample, None on first sample"""
+        now = time.monotonic()
+        with self.lock:
+            previous = self.samples.get(name)
+            self.samples[name] = (now, value)
+        if previous is None or now <= previous[0]:
+            return None
+        return (value - previous[1]) / (now - previous[0])
+
+
+class ProgressReporter:
+    """Background thread writing progress of the run to a JSON file
+
+    Progress is what `collect()` returns, written every `interval` seconds from
+    `start()` to `stop()`, whatever the main thread is busy with (listing, images
+    drain, ZIM finish...). File is replaced atomically so that readers never see a
+    partially written one. A failing report is logged and the next one attempted"""
+
+    def __init__(
+        self, path: pathlib.Path | None, collect: Callable[[], dict], interval: float
+    ):
+        self.path = path
+        self.collect = collect
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+        # mode of files created by the process, temporary files are private ones
+        umask = os.umask(0)
+        os.umask(umask)
+        self.mode = 0o666 & ~umask
+
+    def start(self):
+        if not self.path:
+            return
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, name="progress", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """stop reporting, after a last report"""
+        self.stopped.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+        self.report()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.report()
+
+    def report(self):
+        """write progress now"""
+        if not self.path:
+            return
+        try:
+            progress = self.collect()
+            with self.lock:
+                self.write(progress)
+        except Exception as exc:
+            logger.warning(f"Failed to report progress to {self.path}", exc_info=exc)
+
+    def write(self, progress: dict):
+        """replace file with progress, atomically"""
+        with tempfile.NamedTemporaryFile(
+            "w", dir=self.path.parent, delete=False, encoding="utf-8"
+        ) as fh:
+            try:
+                json.dump(progress, fh, indent=2)
+            except BaseException:
+                fh.close()
+                os.unlink(fh.name)
+                raise
+        os.chmod(fh.name, self.mode)
+        os.replace(fh.name, self.path)  # pyright: ignore[reportArgumentType]
@@ -0,0 +1,116 @@
+import heapq
+import json
+import pathlib
+import threading
+import time
+from contextlib import contextmanager
+
+from ifixit2zim.shared import Stopwatch, logger
+
+
+class ItemTimings:
+    """Wall and CPU time spent on items of a kind, with the `size` slowest items
+
+    CPU time is the one of the thread scraping the item"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.lock = threading.Lock()
+        self.items = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        # min-heap of (wall, cpu, key) of slowest items
+        self.slowest = []
+
+    @contextmanager
+    def measure(self, key: str):
+        """record duration of the block as one of item `key`"""
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            self.record(key, time.perf_counter() - wall, time.thread_time() - cpu)
+
+    def record(self, key: str, wall: float, cpu: float):
+        with self.lock:
+            self.items += 1
+            self.wall += wall
+            self.cpu += cpu
+            if not self.size:
+                return
+            if len(self.slowest) < self.size:
+                heapq.heappush(self.slowest, (wall, cpu, key))
+            elif wall > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, (wall, cpu, key))
+
+    def get_summary(self) -> dict:
+        with self.lock:
+            return {
+                "items": self.items,
+                "wall": self.wall,
+                "cpu": self.cpu,
+                "slowest": [
+                    {"key": key, "wall": wall, "cpu": cpu}
+                    for wall, cpu, key in sorted(self.slowest, reverse=True)
+                ],
+            }
+
+
+class RunReport:
+    """Wall and CPU time of phases of a run, timings of items, written at its end
+
+    A phase ends when `lap(name)` is called, and started at previous one (or at
+    creation). Report is a JSON file (if `path` is set) and a table in logs"""
+
+    def __init__(self, path: pathlib.Path | None):
+        self.path = path
+        self.stopwatch = Stopwatch()
+
+    def lap(self, name: str):
+        self.stopwatch.lap(name)
+
+    def build(self, status: str, items: dict[str, ItemTimings], **extras) -> dict:
+        return {
+            "status": status,
+            "wall": self.stopwatch.total,
+            "cpu": sum(cpu for _, _, cpu in self.stopwatch.steps),
+            "phases": [
+                {"name": name, "wall": wall, "cpu": cpu}
+                for name, wall, cpu in self.stopwatch.steps
+            ],
+            "items": {kind: timings.get_summary() for kind, timings in items.items()},
+            **extras,
+        }
+
+    def write(self, report: dict):
+        if not self.path:
+            return
+        self.path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+        logger.info(f"Run report written to {self.path}")
+
+    def log(self, report: dict):
+        logger.info(
+            f"Run report ({report['status']}) {report['wall']:.1f}s "
+            f"(CPU {report['cpu']:.1f}s):"
+        )
+        logger.info(f"\t{'phase':<24}{'wall (s)':>12}{'CPU (s)':>12}")
+        for phase in report["phases"]:
+            logger.info(
+                f"\t{phase['name']:<24}{phase['wall']:>12.1f}{phase['cpu']:>12.1f}"
+            )
+        logger.info(f"\t{'items':<24}{'count':>12}{'wall (s)':>12}{'CPU (s)':>12}")
+        for kind, summary in report["items"].items():
+            logger.info(
+                f"\t{kind:<24}{summary['items']:>12}{summary['wall']:>12.1f}"
+                f"{summary['cpu']:>12.1f}"
+            )
+        for kind, summary in report["items"].items():
+            if not summary["slowest"]:
+                continue
+            logger.info(
+                f"\tslowest {kind} items: "
+                + ", ".join(
+                    f"{item['key']} ({item['wall']:.1f}s)"
+                    for item in summary["slowest"]
+                )
+            )
@@ -0,0 +1,159 @@
+import threading
+import time
+
+from ifixit2zim.executor import Executor
+from ifixit2zim.scraper_generic import ScraperGeneric
+from ifixit2zim.shared import logger
+
+# longest wait before checking state of scrapers again
+MAX_WAIT = 1.0
+
+
+class Scheduler:
+    """Scrapes items of all scrapers concurrently, until there is none left
+
+    Items are taken from scrapers in proportion to the weight of their kind (smooth
+    weighted round-robin) and scraped by `nb_workers` threads, at most
+    `concurrency[kind]` of them on a same kind. Scheduler is woken up as soon as an
+    item is added or scraped, and when a retry is due. It ends once all queues are
+    empty, all listings complete and no item is being scraped.
+
+    With `max_items`, at most this number of items of each kind are scraped"""
+
+    def __init__(
+        self,
+        scrapers: list[ScraperGeneric],
+        nb_workers: int,
+        weights: dict[str, int] | None = None,
+        concurrency: dict[str, int] | None = None,
+        max_items: int | None = None,
+    ):
+        self.scrapers = scrapers
+        self.nb_workers = nb_workers
+        self.max_items = max_items
+        kinds = [scraper.get_items_name() for scraper in scrapers]
+        self.weights = {kind: (weights or {}).get(kind, 1) for kind in kinds}
+        self.concurrency = {
+            kind: (concurrency or {}).get(kind, nb_workers) for kind in kinds
+        }
+        self.executor = Executor(
+            queue_size=nb_workers, nb_workers=nb_workers, prefix="SCRAPE-T-"
+        )
+        self.wakeup = threading.Condition()
+        # kind => number of its items being scraped
+        self.in_flight = dict.fromkeys(kinds, 0)
+        # kind => number of its items taken so far
+        self.dispatched = dict.fromkeys(kinds, 0)
+        # kind => current weight in smooth weighted round-robin
+        self.credits = dict.fromkeys(kinds, 0)
+        self.failure = None
+        for scraper in scrapers:
+            scraper.on_items_added = self.wake
+
+    def wake(self):
+        with self.wakeup:
+            self.wakeup.notify_all()
+
+    def is_exhausted(self, scraper: ScraperGeneric) -> bool:
+        """whether scraper has no item left to scrape, now or later"""
+        if (
+            self.max_items is not None
+            and self.dispatched[scraper.get_items_name()] >= self.max_items
+        ):
+            return True
+        return not scraper.has_pending_items
+
+    @property
+    def is_done(self) -> bool:
+        return not any(self.in_flight.values()) and all(
+            self.is_exhausted(scraper) for scraper in self.scrapers
+        )
+
+    def pick_scraper(self) -> ScraperGeneric | None:
+        """next scraper to take an item from, None if no item can be taken now"""
+        if sum(self.in_flight.values()) >= self.nb_workers:
+            return None
+        candidates = [
+            scraper
+            for scraper in self.scrapers
+            if scraper.needs_scraping
+            and not self.is_exhausted(scraper)
+            and self.in_flight[scraper.get_items_name()]
+            < self.concurrency[scraper.get_items_name()]
+        ]
+        if not candidates:
+            return None
+        total = 0
+        for scraper in candidates:
+            self.credits[scraper.get_items_name()] += self.weights[
+                scraper.get_items_name()
+            ]
+            total += self.weights[scraper.get_items_name()]
+        chosen = max(
+            candidates, key=lambda scraper: self.credits[scraper.get_items_name()]
+        )
+        self.credits[chosen.get_items_name()] -= total
+        return chosen
+
+    def get_timeout(self) -> float:
+        """how long to wait for a wake up: until first retry is due, at most"""
+        retries_due = [
+            scraper.next_retry_due
+            for scraper in self.scrapers
+            if scraper.next_retry_due is not None
+        ]
+        if not retries_due:
+            return MAX_WAIT
+        return min(max(min(retries_due) - time.monotonic(), 0), MAX_WAIT)
+
+    def run(self):
+        logger.info(f"Scraping items with {self.nb_workers} workers")
+        self.executor.start()
+        try:
+            while True:
+                for scraper in self.scrapers:
+                    if scraper.listing_error:
+                        raise scraper.listing_error
+                with self.wakeup:
+                    if self.failure:
+                        raise self.failure
+                    scraper = self.pick_scraper()
+                    if scraper is None:
+                        if self.is_done:
+                            break
+                        self.wakeup.wait(self.get_timeout())
+                        continue
+                next_item = scraper.get_next_item()
+                if next_item is None:
+                    # not to spin while scraper can't hand an item out yet
+                    with self.wakeup:
+                        self.wakeup.wait(self.get_timeout())
+                    continue
+                with self.wakeup:
+                    self.in_flight[scraper.get_items_name()] += 1
+                    self.dispatched[scraper.get_items_name()] += 1
+                self.executor.submit(
+                    self.scrape_item,
+                    scraper=scraper,
+                    item=next_item[0],
+                    prefetched_content=next_item[1],
+                )
+        except BaseException:
+            self.executor.shutdown(wait=False)
+            raise
+        self.executor.shutdown()
+        logger.info(
+            "Scraped items: "
+            + ", ".join(f"{count} {kind}" for kind, count in self.dispatched.items())
+        )
+
+    def scrape_item(self, scraper: ScraperGeneric, item, prefetched_content):
+        try:
+            scraper.scrape_item(item, prefetched_content)
+        except Exception as exc:
+            with self.wakeup:
+                self.failure = self.failure or exc
+        finally:
+            with self.wakeup:
+                self.in_flight[scraper.get_items_name()] -= 1
+                self.wakeup.notify_all()
@@ -4,15 +4,23 @@ import json
 import pathlib
 import shutil
 import threading
+import time
 
-from jinja2 import Environment, FileSystemLoader, select_autoescape
-from schedule import every
+from jinja2 import (
+    Environment,
+    FileSystemLoader,
+    select_autoescape,
+)
 from zimscraperlib.image.transformation import resize_image
 from zimscraperlib.inputs import compute_descriptions
 from zimscraperlib.zim.creator import Creator
 
+from ifixit2zim.bundler import AssetsBundler
 from ifixit2zim.constants import (
+    ASSETS_BUNDLES,
     DEFAULT_HOMEPAGE,
+    IMAGE_PRIORITY_AGING,
+    PROGRESS_INTERVAL,
     ROOT_DIR,
     TITLE,
     Configuration,
@@ -22,16 +30,29 @@ from ifixit2zim.exceptions import CategoryHomePageContentError
 from ifixit2zim.executor import Executor
 from ifixit2zim.imager import Imager
 from ifixit2zim.processor import Processor
+from ifixit2zim.progress import ProgressReporter, Throughput
+from ifixit2zim.report import RunReport
+from ifixit2zim.scheduler import Scheduler
 from ifixit2zim.scraper_category import ScraperCategory
+from ifixit2zim.scraper_generic import FIRST_ITEMS_COUNT
 from ifixit2zim.scraper_guide import ScraperGuide
 from ifixit2zim.scraper_homepage import ScraperHomepage
 from ifixit2zim.scraper_info import ScraperInfo
 from ifixit2zim.scraper_user import ScraperUser
-from ifixit2zim.shared import logger
+from ifixit2zim.shared import (
+    Stopwatch,
+    get_cpu_count,
+    get_memory_usage,
+    get_peak_memory,
+    logger,
+)
+from ifixit2zim.templating import (
+    FragmentCache,
+    FragmentCacheExtension,
+    get_bytecode_cache,
+)
 from ifixit2zim.utils import Utils
 
-LOCALE_LOCK = threading.Lock()
-
 
 class IFixit2Zim:
     def __init__(self, **kwargs):
@@ -46,6 +67,17 @@ class IFixit2Zim:
 
         self.scrapers = []
 
+        # what the run is busy with, for progress reports
+        self.stage = "starting"
+        self.started = time.monotonic()
+        self.throughput = Throughput()
+        self.report = RunReport(path=self.configuration.report_path)
+        self.progress = ProgressReporter(
+            path=self.configuration.stats_path,
+            collect=self.get_progress,
+            interval=PROGRESS_INTERVAL,
+        )
+
     @property
     def build_path(self):
         return self.configuration.build_path
@@ -63,6 +95,7 @@ class IFixit2Zim:
         if not self.configuration.name:
             is_selection = (
                 self.configuration.categories
+                or self.configuration.category_subtrees
                 or self.configuration.guides
                 or self.configuration.infos
                 or self.configuration.no_category
@@ -144,18 +177,28 @@ class IFixit2Zim:
         logger.info("Adding assets")
 
         # recursively add our assets, at a path identical to position in repo
+        # files which are part of a bundle are only served through their bundle
+        bundled_sources = self.bundler.bundled_sources
         assets_root = pathlib.Path(ROOT_DIR.joinpath("assets"))
         for fpath in assets_root.glob("**/*"):
             if not fpath.is_file():
                 continue
             path = str(fpath.relative_to(ROOT_DIR))
+            if path in bundled_sources:
+                continue
 
             logger.debug(f"> {path}")
             with self.lock:
                 self.creator.add_item_for(path=path, fpath=fpath)
 
+        for path, content, mimetype in self.bundler.get_items():
+            logger.debug(f"> {path}")
+            with self.lock:
+                self.creator.add_item_for(path=path, content=content, mimetype=mimetype)
+
     def setup(self):
         # order matters are there are references between them
+        stopwatch = Stopwatch()
 
         # images handled on a different queue.
         # mostly network I/O to retrieve and/or upload image.
@@ -166,7 +209,19 @@ class IFixit2Zim:
             queue_size=100,
             nb_workers=50,
             prefix="IMG-T-",
+            priority_aging=IMAGE_PRIORITY_AGING,
         )
+        stopwatch.lap("images executor")
+
+        # API content of items to scrape is fetched ahead of their processing, or
+        # as soon as they are found (speculative items, which never wait for room)
+        self.prefetch_executor = Executor(
+            queue_size=self.configuration.prefetch_items
+            + self.configuration.speculative_items,
+            nb_workers=self.configuration.prefetch_items,
+            prefix="PREFETCH-T-",
+        )
+        self.prefetch_executor.start()
 
         src_illus_fpath = pathlib.Path(ROOT_DIR.joinpath("assets", "illustration.png"))
         dst = io.BytesIO()
@@ -177,10 +232,12 @@ class IFixit2Zim:
             height=48,
             method="thumbnail",
         )
+        stopwatch.lap("illustration")
 
         self.creator = Creator(
             filename=self.configuration.output_path / self.configuration.fpath,
             main_path=DEFAULT_HOMEPAGE,
+            compression=self.configuration.zim_compression,
             workaround_nocancel=False,
         ).config_metadata(
             Illustration_48x48_at_1=dst.getvalue(),
@@ -193,6 +250,11 @@ class IFixit2Zim:
             Tags=";".join(self.configuration.tag),
             Date=datetime.datetime.now(tz=datetime.UTC).date(),
         )
+        # libzim compresses clusters with 4 workers by default, whatever the CPUs
+        self.creator.config_nbworkers(self.configuration.zim_workers or get_cpu_count())
+        if self.configuration.zim_cluster_size:
+            self.creator.config_clustersize(self.configuration.zim_cluster_size * 2**20)
+        stopwatch.lap("creator")
 
         self.imager = Imager(
             lock=self.lock,
@@ -201,12 +263,28 @@ class IFixit2Zim:
             utils=self.utils,
             configuration=self.configuration,
         )
+        stopwatch.lap("imager")
+
+        # CSS/JS bundles must be known before rendering any page
+        self.bundler = AssetsBundler(
+            assets_root=ROOT_DIR.joinpath("assets"),
+            bundles=ASSETS_BUNDLES,
+            enabled=not self.configuration.no_assets_bundling,
+        )
+        self.bundler.build()
+        stopwatch.lap("assets bundles")
 
-        # jinja2 environment setup
+        # jinja2 environment setup, compiled templates are cached across runs
         self.env = Environment(
             loader=FileSystemLoader(ROOT_DIR.joinpath("templates")),
             autoescape=select_autoescape(),
+            extensions=[FragmentCacheExtension],
+            bytecode_cache=get_bytecode_cache(self.configuration.templates_cache_dir),
         )
+        if self.configuration.fragment_cache_size:
+            self.env.fragment_cache = (  # pyright: ignore[reportAttributeAccessIssue]
+                FragmentCache(max_size=self.configuration.fragment_cache_size)
+            )
 
         def _raise_helper(msg):
             raise Exception(msg)
@@ -216,6 +294,7 @@ class IFixit2Zim:
             configuration=self.configuration,
             creator=self.creator,
             imager=self.imager,
+            utils=self.utils,
         )
 
         context = Context(
@@ -226,6 +305,7 @@ class IFixit2Zim:
             metadata=self.metadata,
             env=self.env,
             processor=self.processor,
+            prefetch_executor=self.prefetch_executor,
         )
 
         self.scraper_homepage = ScraperHomepage(context=context)
@@ -249,6 +329,7 @@ class IFixit2Zim:
         self.processor.get_category_link_from_props = (
             self.scraper_category.get_category_link_from_props
         )
+        self.processor.is_category_selected = self.scraper_category.is_category_selected
         self.processor.get_info_link_from_props = (
             self.scraper_info.get_info_link_from_props
         )
@@ -298,16 +379,29 @@ class IFixit2Zim:
             self.processor.get_guide_total_comments_count
         )
         self.env.filters["get_user_display_name"] = self.processor.get_user_display_name
+        self.env.filters["get_assets_bundle_paths"] = self.bundler.get_bundle_paths
         self.env.globals["raise"] = _raise_helper
         self.env.globals["str"] = lambda x: str(x)
+        stopwatch.lap("jinja environment and processor")
 
+        # loads (and compiles if not cached) all templates
         for scraper in self.scrapers:
             scraper.setup()
+        stopwatch.lap("templates")
+
+        stopwatch.log_breakdown("Setup")
 
     def run(self):
         # first report => creates a file with appropriate structure
-        self.report_progress()
+        self.progress.report()
+        self.progress.start()
+        try:
+            return self._run()
+        finally:
+            self.progress.stop()
+            self.report_run()
 
+    def _run(self):
         s3_storage = (
             self.utils.setup_s3_and_check_credentials(
                 self.configuration.s3_url_with_credentials
@@ -323,6 +417,7 @@ class IFixit2Zim:
             else ""
         )
         del s3_storage
+        self.report.lap("S3 check")
 
         logger.info(
             f"Starting scraper with:\n"
@@ -341,37 +436,46 @@ class IFixit2Zim:
             f"stats: {self.metadata['stats']}\n"
         )
         self.sanitize_inputs()
+        self.report.lap("metadata")
 
         logger.debug("Starting Zim creation")
         self.setup()
         self.creator.start()
+        self.utils.watchdog.start()
+        self.report.lap("setup")
 
         try:
             self.add_assets()
+            self.report.lap("assets")
 
+            self.stage = "listing"
             for scraper in self.scrapers:
                 scraper.build_expected_items()
-                self.report_progress()
-
-            # set a timer to report progress only every 10 seconds, not need to do it
-            # after every item scrapped
-            every(10).seconds.do(self.report_progress)
-
-            while True:
-                for scraper in self.scrapers:
-                    scraper.scrape_items()
-                needs_rerun = False
-                if not self.configuration.scrape_only_first_items:
-                    for scraper in self.scrapers:
-                        if not scraper.items_queue.empty():
-                            needs_rerun = True
-                if not needs_rerun:
-                    break
+                self.report.lap(f"listing {scraper.get_items_name()}")
+
+            self.stage = "scraping"
+            Scheduler(
+                self.scrapers,
+                nb_workers=self.configuration.scraping_workers,
+                weights=self.configuration.kind_weights,
+                concurrency=self.configuration.kind_concurrency,
+                max_items=(
+                    FIRST_ITEMS_COUNT
+                    if self.configuration.scrape_only_first_items
+                    else None
+                ),
+            ).run()
+            self.report.lap("scraping")
+
+            self.prefetch_executor.shutdown()
+            for scraper in self.scrapers:
+                scraper.teardown()
+            self.report.lap("scrapers teardown")
 
             logger.info("Awaiting images")
+            self.stage = "images"
             self.img_executor.shutdown()
-
-            self.report_progress()
+            self.report.lap("images drain")
 
             stats = "Stats: "
             for scraper in self.scrapers:
@@ -392,6 +496,68 @@ class IFixit2Zim:
 
             logger.info(stats)
 
+            if self.configuration.minify_html:
+                logger.info("HTML minification:")
+                for kind, kind_stats in sorted(self.processor.minify_stats.items()):
+                    saved = kind_stats["raw_bytes"] - kind_stats["minified_bytes"]
+                    logger.info(
+                        f"\t{kind}: {saved} bytes saved on {kind_stats['items']} items"
+                        f" ({saved * 100 / (kind_stats['raw_bytes'] or 1):.1f}%)"
+                    )
+
+            logger.info("Full-text indexing (pages, bytes indexed):")
+            for kind, kind_stats in sorted(self.processor.indexing.stats.items()):
+                logger.info(
+                    f"\t{kind}: "
+                    + ", ".join(
+                        f"{mode} {mode_stats['items']} ({mode_stats['bytes']})"
+                        for mode, mode_stats in sorted(kind_stats.items())
+                    )
+                )
+
+            if self.configuration.fragment_cache_size:
+                logger.info("Fragment cache hit rates:")
+                for name, hit_rate in sorted(
+                    self.env.fragment_cache.get_hit_rates().items()  # pyright: ignore
+                ):
+                    logger.info(f"\t{name}: {hit_rate * 100:.1f}%")
+
+            logger.info("Concurrency per origin:")
+            for origin, origin_stats in sorted(self.utils.origins.get_stats().items()):
+                logger.info(
+                    f"\t{origin}: {origin_stats['requests']} requests, "
+                    f"{origin_stats['congestions']} congested, limit "
+                    f"{origin_stats['limit']} (min {origin_stats['min_limit']}, "
+                    f"max {origin_stats['max_limit']}), "
+                    f"max in flight {origin_stats['max_in_flight']}"
+                )
+
+            if self.utils.watchdog.enabled:
+                logger.info(
+                    f"Stalled activities: {self.utils.watchdog.stats['stalled']} "
+                    f"({self.utils.watchdog.stats['cancelled']} cancelled)"
+                )
+
+            logger.info("Items fetched as soon as found:")
+            for scraper in self.scrapers:
+                logger.info(
+                    f"\t{scraper.get_items_name()}: "
+                    f"{scraper.speculation_stats['used']} used of "
+                    f"{scraper.speculation_stats['fetched']} fetched"
+                )
+
+            logger.info("Coalesced requests:")
+            for flight in (
+                self.utils.api_queries,
+                self.processor.final_hrefs,
+                self.imager.deferred,
+            ):
+                logger.info(
+                    f"\t{flight.name}: {flight.stats['executions']} executed, "
+                    f"{flight.stats['coalesced']} coalesced while in flight, "
+                    f"{flight.stats['memoized']} already done"
+                )
+
             logger.info("Null categories:")
             for key in self.processor.null_categories:
                 logger.info(f"\t{key}")
@@ -401,50 +567,151 @@ class IFixit2Zim:
                 logger.info(f"\t{exturl}")
 
         except Exception as exc:
+            self.report.lap(f"{self.stage} (interrupted)")
             # request Creator not to create a ZIM file on finish
             self.creator.can_finish = False
+            self.stage = "failed"
             if isinstance(exc, KeyboardInterrupt):
                 logger.error("KeyboardInterrupt, exiting.")
             else:
                 logger.error("Interrupting process due to error", exc_info=exc)
             self.imager.abort()
+            self.prefetch_executor.shutdown(wait=False)
             self.img_executor.shutdown(wait=False)
             return 1
         else:
             if self.creator.can_finish:
+                self.report.lap("run summary")
                 logger.info("Finishing ZIM file")
+                self.stage = "finishing"
+                started = time.monotonic()
                 with self.lock:
                     self.creator.finish()
                 logger.info(
                     f"Finished Zim {self.creator.filename.name} "
-                    f"in {self.creator.filename.parent}"
+                    f"in {self.creator.filename.parent} "
+                    f"({time.monotonic() - started:.0f}s, "
+                    f"{self.creator.filename.stat().st_size / 2**20:.0f} MiB)"
                 )
+                self.report.lap("ZIM finish")
         finally:
+            # whether run succeeded or not, not to block interpreter exit
+            self.scraper_category.fallback_executor.shutdown(wait=False)
+            self.utils.watchdog.stop()
+            self.utils.metrics.log_summary()
             logger.info("Cleaning up")
             with self.lock:
                 self.cleanup()
 
+        self.stage = "done"
         logger.info("Scraper has finished normally")
 
-    def report_progress(self):
-        if not self.configuration.stats_path:
-            return
+    def report_run(self):
+        """log (and write) run report, with phases since last one as cleanup"""
+        self.report.lap("cleanup")
+        zim = None
+        if hasattr(self, "creator") and self.creator.filename.exists():
+            zim = {
+                "path": str(self.creator.filename),
+                "size": self.creator.filename.stat().st_size,
+            }
+        try:
+            report = self.report.build(
+                status="done" if self.stage == "done" else "failed",
+                items={
+                    scraper.get_items_name(): scraper.timings
+                    for scraper in self.scrapers
+                },
+                zim=zim,
+                peak_memory=get_peak_memory(),
+                http=self.utils.metrics.get_summary(),
+            )
+            self.report.log(report)
+            self.report.write(report)
+        except Exception as exc:
+            logger.warning("Failed to report run", exc_info=exc)
+
+    def get_progress(self) -> dict:
+        """progress of the run, see ProgressReporter"""
         done = 0
         total = 0
+        scrapers = {}
         for scraper in self.scrapers:
             scraper_total = len(scraper.expected_items_keys) + len(
                 scraper.unexpected_items_keys
             )
-            scraper_remains = scraper.items_queue.qsize()
+            scraper_remains = (
+                scraper.items_queue.qsize()
+                + len(scraper.prefetched)
+                + len(scraper.retry_lane)
+            )
             scraper_done = scraper_total - scraper_remains
             total += scraper_total
             done += scraper_done
-        progress = {
+            scrapers[scraper.get_items_name()] = {
+                "done": scraper_done,
+                "total": scraper_total,
+                "missing": len(scraper.missing_items_keys),
+                "errors": len(scraper.error_items_keys),
+                "items_per_second": self.throughput.rate(
+                    scraper.get_items_name(), scraper_done
+                ),
+            }
+        items_rate = self.throughput.rate("items", done)
+
+        images = {}
+        images_rate = None
+        if hasattr(self, "imager"):
+            images_rate = self.throughput.rate("images", self.imager.stats["processed"])
+            images = {
+                "handled": len(self.imager.handled),
+                "processed": self.imager.stats["processed"],
+                "queued": self.img_executor.qsize(),
+                "items_per_second": images_rate,
+            }
+
+        eta = None
+        if self.stage in ("listing", "scraping") and items_rate:
+            eta = (total - done) / items_rate
+        elif self.stage == "images" and images_rate:
+            eta = images["queued"] / images_rate
+
+        return {
             "done": done,
             "total": total,
+            "stage": self.stage,
+            "elapsed": time.monotonic() - self.started,
+            "eta": eta,
+            "memory": {"rss": get_memory_usage(), "peak_rss": get_peak_memory()},
+            "items_per_second": items_rate,
+            "scrapers": scrapers,
+            "images": images,
+            "downloaded_bytes": self.utils.origins.downloaded_bytes,
+            "cache_hit_rates": self.get_cache_hit_rates(),
+            "origins": self.utils.origins.get_stats(),
+            "http": self.utils.metrics.get_summary(),
         }
-        with open(self.configuration.stats_path, "w") as outfile:
-            json.dump(progress, outfile, indent=2)
+
+    def get_cache_hit_rates(self) -> dict[str, float | None]:
+        """ratio of lookups served from a cache, per cache (None if no lookup)"""
+        rates = {}
+        flights = [self.utils.api_queries]
+        if hasattr(self, "processor"):
+            flights += [self.processor.final_hrefs, self.imager.deferred]
+        for flight in flights:
+            calls = flight.stats["calls"]
+            reused = flight.stats["coalesced"] + flight.stats["memoized"]
+            rates[flight.name] = reused / calls if calls else None
+        if hasattr(self, "imager"):
+            lookups = (
+                self.imager.stats["cache_hits"] + self.imager.stats["cache_misses"]
+            )
+            rates["S3"] = self.imager.stats["cache_hits"] / lookups if lookups else None
+        if self.configuration.fragment_cache_size and hasattr(self, "env"):
+            fragment_cache = self.env.fragment_cache  # pyright: ignore
+            for name, hit_rate in fragment_cache.get_hit_rates().items():
+                rates[f"fragment {name}"] = hit_rate
+        return rates
 
     def get_online_metadata(self):
         """metadata from online website, looking at homepage source code"""
@@ -1,10 +1,19 @@
+import pathlib
+import time
 import urllib.parse
 
+from ifixit2zim.bookkeeping import ItemRecord
 from ifixit2zim.constants import CATEGORY_LABELS, URLS
 from ifixit2zim.context import Context
 from ifixit2zim.exceptions import UnexpectedDataKindExceptionError
+from ifixit2zim.executor import Executor
+from ifixit2zim.negative_cache import NegativeCache
 from ifixit2zim.scraper_generic import ScraperGeneric
-from ifixit2zim.shared import logger
+from ifixit2zim.shared import get_peak_memory, logger
+
+
+class CategoryRecord(ItemRecord):
+    __slots__ = ("category_title",)
 
 
 class ScraperCategory(ScraperGeneric):
@@ -13,6 +22,37 @@ class ScraperCategory(ScraperGeneric):
 
     def setup(self):
         self.category_template = self.env.get_template("category.html")
+        # (category, language) pairs without content, shared across languages runs
+        self.empty_categories = NegativeCache(
+            path=(
+                pathlib.Path(self.configuration.negative_cache_path).expanduser()
+                if self.configuration.negative_cache_path
+                and self.configuration.negative_cache_ttl
+                else None
+            ),
+            ttl=self.configuration.negative_cache_ttl * 24 * 3600,
+        )
+        # fallback languages of a category are queried concurrently
+        self.fallback_executor = Executor(
+            queue_size=len(URLS), nb_workers=len(URLS), prefix="FALLBACK-T-"
+        )
+        self.fallback_executor.start()
+        # keys of selected categories, None if all are
+        self.selected_keys = (
+            {
+                self._get_category_key_from_title(category)
+                for category in self.configuration.categories
+            }
+            if self.configuration.categories
+            else None
+        )
+
+    def teardown(self):
+        self.empty_categories.save()
+        logger.info(
+            f"{self.empty_categories.hits} queries of empty categories avoided "
+            "thanks to cache"
+        )
 
     def get_items_name(self):
         return "category"
@@ -20,9 +60,7 @@ class ScraperCategory(ScraperGeneric):
     def _add_category_to_scrape(self, category_key, category_title, is_expected):
         self.add_item_to_scrape(
             category_key,
-            {
-                "category_title": category_title,
-            },
+            CategoryRecord(category_title=category_title),
             is_expected,
         )
 
@@ -50,23 +88,17 @@ class ScraperCategory(ScraperGeneric):
         if self.configuration.no_category:
             return f"home/not_scrapped?url={category_path}"
         category_key = self._get_category_key_from_title(category_title)
-        if self.configuration.categories:
-            is_not_included = True
-            for other_category in self.configuration.categories:
-                other_category_key = self._get_category_key_from_title(other_category)
-                if other_category_key == category_key:
-                    is_not_included = False
-            if is_not_included:
-                return f"home/not_scrapped?url={category_path}"
+        if self.selected_keys is not None and category_key not in self.selected_keys:
+            return f"home/not_scrapped?url={category_path}"
         self._add_category_to_scrape(category_key, category_title, False)
         return category_path
 
-    def _process_categories(self, categories):
-        for category in categories:
-            category_key = self._get_category_key_from_title(category)
-            self._add_category_to_scrape(category_key, category, True)
-            if categories[category]:
-                self._process_categories(categories[category])
+    def is_category_selected(self, category_title: str | None) -> bool:
+        """whether a category is part of the selection (if any)"""
+        return self.selected_keys is None or (
+            bool(category_title)
+            and self._get_category_key_from_title(category_title) in self.selected_keys
+        )
 
     def build_expected_items(self):
         if self.configuration.no_category:
@@ -78,37 +110,107 @@ class ScraperCategory(ScraperGeneric):
                 category_key = self._get_category_key_from_title(category)
                 self._add_category_to_scrape(category_key, category, True)
             return
+        if self.configuration.category_subtrees:
+            self._add_subtrees_categories()
+            return
         logger.info("Downloading list of categories")
-        categories = self.utils.get_api_content("/categories", includeStubs=True)
-        self._process_categories(categories)
-        logger.info(f"{len(self.expected_items_keys)} categories found")
-
-    def get_one_item_content(self, item_key, item_data):  # noqa ARG002
-        categoryid = item_key
+        started = time.monotonic()
+        # categories tree is a large nested object whose keys are category titles,
+        # we only need the titles so they are added while response is downloaded
+        for category in self.utils.iter_api_keys("/categories", includeStubs=True):
+            category_key = self._get_category_key_from_title(category)
+            self._add_category_to_scrape(category_key, category, True)
+        logger.info(
+            f"{len(self.expected_items_keys)} categories found in "
+            f"{time.monotonic() - started:.1f}s "
+            f"(peak memory so far: {get_peak_memory():.0f} MiB)"
+        )
 
-        category_content = self.utils.get_api_content(
-            f"/wikis/CATEGORY/{categoryid}", langid=self.configuration.lang_code
+    def _add_subtrees_categories(self):
+        """add selected categories and all their descendants, as only selected ones
+
+        Descendants are found in categories tree, while it downloads: those of a
+        selected category are the categories following it which are deeper"""
+        logger.info("Downloading categories tree to find selected subtrees")
+        roots = {
+            self._get_category_key_from_title(category): category
+            for category in self.configuration.category_subtrees
+        }
+        self.selected_keys = set()
+        subtree_depth = None
+        for category, depth in self.utils.iter_api_keys(
+            "/categories", with_depth=True, includeStubs=True
+        ):
+            if subtree_depth is not None and depth <= subtree_depth:
+                subtree_depth = None
+            category_key = self._get_category_key_from_title(category)
+            # a selected category might also be in another selected subtree
+            if roots.pop(category_key, None) and subtree_depth is None:
+                subtree_depth = depth
+            if subtree_depth is not None:
+                self.selected_keys.add(category_key)
+                self._add_category_to_scrape(category_key, category, True)
+        if roots:
+            raise ValueError(
+                f"Categories not found in categories tree: {', '.join(roots.values())}"
+            )
+        logger.info(
+            f"{len(self.expected_items_keys)} categories found in selected subtrees"
         )
 
-        if category_content and category_content["revisionid"] > 0:
-            return category_content
+    def get_languages_plan(self, categoryid) -> list[str]:
+        """languages to query category in, by preference, except known empty ones"""
+        return [
+            lang
+            for lang in dict.fromkeys([self.configuration.lang_code, "en", *URLS])
+            if (categoryid, lang) not in self.empty_categories
+        ]
 
-        logger.warning("Falling back to category in EN")
+    def get_category_content(self, categoryid, lang):
+        """content of category in a language, None (and cached as such) if empty"""
         category_content = self.utils.get_api_content(
-            f"/wikis/CATEGORY/{categoryid}", langid="en"
+            f"/wikis/CATEGORY/{categoryid}", langid=lang
         )
-
         if category_content and category_content["revisionid"] > 0:
             return category_content
+        self.empty_categories.add(categoryid, lang)
+        return None
 
-        for lang in URLS.keys():
-            logger.warning(f"Falling back to category in {lang}")
-            category_content = self.utils.get_api_content(
-                f"/wikis/CATEGORY/{categoryid}", langid=lang
-            )
+    def get_one_item_content(self, item_key, item_data):  # noqa ARG002
+        categoryid = item_key
+        languages = self.get_languages_plan(categoryid)
 
-            if category_content and category_content["revisionid"] > 0:
+        # most categories have content in preferred language, try it alone first
+        if languages:
+            category_content = self.get_category_content(categoryid, languages[0])
+            if category_content:
+                return category_content
+
+        # query all fallbacks at once, keeping the first hit by preference
+        if len(languages) > 1:
+            logger.warning(
+                f"Falling back to category {categoryid} in {', '.join(languages[1:])}"
+            )
+        futures = [
+            self.fallback_executor.submit(
+                self.get_category_content, categoryid=categoryid, lang=lang
+            )
+            for lang in languages[1:]
+        ]
+        error = None
+        for future in futures:
+            try:
+                category_content = future.result()
+            except Exception as exc:
+                error = error or exc
+                continue
+            if category_content:
+                for other_future in futures:
+                    other_future.cancel()
                 return category_content
+        # do not consider category empty if some languages could not be queried
+        if error:
+            raise error
 
         logger.warning(f"Impossible to get category content: {item_key}")
         self.processor.null_categories.add(item_key)
@@ -136,4 +238,6 @@ class ScraperCategory(ScraperGeneric):
             path=self._build_category_path(category_title=category_content["title"]),
             title=category_content["display_title"],
             content=category_rendered,
+            kind=self.get_items_name(),
+            summary=category_content.get("description"),
         )
@@ -1,10 +1,23 @@
+import heapq
+import itertools
+import threading
+import time
 from abc import ABC, abstractmethod
+from collections import deque
+from collections.abc import Callable
 from queue import Queue
 
-from schedule import run_pending
-
+from ifixit2zim.bookkeeping import intern_key
+from ifixit2zim.constants import (
+    ITEM_MAX_RETRIES,
+    ITEM_RETRY_BASE_DELAY,
+    MAX_OUTAGE_RETRIES,
+)
 from ifixit2zim.context import Context
-from ifixit2zim.exceptions import FinalScrapingFailureError
+from ifixit2zim.exceptions import FinalScrapingFailureError, OriginUnavailableError
+from ifixit2zim.executor import Executor
+from ifixit2zim.origins import is_congestion_error
+from ifixit2zim.report import ItemTimings
 from ifixit2zim.shared import logger
 
 FIRST_ITEMS_COUNT = 5
@@ -13,11 +26,36 @@ FIRST_ITEMS_COUNT = 5
 class ScraperGeneric(ABC):
     def __init__(self, context: Context):
         self.context = context
+        # interned item key => item data (an ItemRecord for most scrapers)
         self.expected_items_keys = {}
         self.unexpected_items_keys = {}
+        # (item key, item data) tuples
         self.items_queue = Queue()
         self.missing_items_keys = set()
         self.error_items_keys = set()
+        # items may be added by listing thread while scraping
+        self.items_lock = threading.Lock()
+        self.items_added = threading.Condition(self.items_lock)
+        # called once items are added or listing completes, see Scheduler
+        self.on_items_added: Callable[[], None] | None = None
+        # cleared while items are listed in background, see `start_listing()`
+        self.listing_done = threading.Event()
+        self.listing_done.set()
+        self.listing_error = None
+        # item key => number of times it failed while an origin was down
+        self.outage_retries = {}
+        # item key => number of times it failed with a transient error
+        self.transient_retries = {}
+        # (item, future of its content) fetched ahead, in queue order
+        self.prefetched = deque()
+        # item key => future of content of an item fetched as soon as discovered
+        self.speculative = {}
+        self.speculation_stats = {"fetched": 0, "used": 0}
+        # heap of (due time, sequence, item) of failed items to retry later
+        self.retry_lane = []
+        self._retry_sequence = itertools.count()
+        # durations of items, for run report
+        self.timings = ItemTimings(size=self.configuration.report_slowest_items)
 
     @property
     def configuration(self):
@@ -47,10 +85,18 @@ class ScraperGeneric(ABC):
     def processor(self):
         return self.context.processor
 
+    @property
+    def prefetch_executor(self):
+        return self.context.prefetch_executor
+
     @abstractmethod
     def setup(self):
         pass
 
+    def teardown(self):
+        """release resources once all items have been scraped"""
+        pass
+
     @abstractmethod
     def get_items_name(self):
         pass
@@ -74,7 +120,25 @@ class ScraperGeneric(ABC):
     def add_item_to_scrape(
         self, item_key, item_data, is_expected, *, warn_unexpected=True
     ):
-        item_key = str(item_key)  # just in case it's an int
+        # just in case it's an int, and shared with other references to the item
+        item_key = intern_key(item_key)
+        with self.items_lock:
+            self._add_item_to_scrape(
+                item_key, item_data, is_expected, warn_unexpected=warn_unexpected
+            )
+            self.items_added.notify_all()
+        if self.on_items_added:
+            self.on_items_added()
+
+    def _add_item_to_scrape(
+        self, item_key, item_data, is_expected, *, warn_unexpected=True
+    ):
+        if item_key in self.unexpected_items_keys and is_expected:
+            # found through a link before being listed, already in queue
+            self.expected_items_keys[item_key] = self.unexpected_items_keys.pop(
+                item_key
+            )
+            return
         if (
             item_key in self.expected_items_keys
             or item_key in self.unexpected_items_keys
@@ -93,12 +157,30 @@ class ScraperGeneric(ABC):
             else:
                 logger.debug(message)
             self.unexpected_items_keys[item_key] = item_data
-        self.items_queue.put(
-            {
-                "key": item_key,
-                "data": item_data,
-            }
+            self._speculate(item_key, item_data)
+        self.items_queue.put((item_key, item_data))
+
+    def _speculate(self, item_key, item_data):
+        """start fetching content of an item discovered through a link
+
+        So that it is most probably there once the item is reached in queue. At most
+        `speculative_items` contents are held at once, and discovery never waits
+        for the prefetch executor. Called under items_lock"""
+        if (
+            self.configuration.scrape_only_first_items
+            or len(self.speculative) >= self.configuration.speculative_items
+        ):
+            return
+        future = self.prefetch_executor.submit(
+            self.get_one_item_content,
+            priority=1,  # after items about to be scraped
+            block=False,
+            item_key=item_key,
+            item_data=item_data,
         )
+        if not future.cancelled():
+            self.speculative[item_key] = future
+            self.speculation_stats["fetched"] += 1
 
     def add_item_missing_redirect(self, item_key, item_data):
         self.add_item_redirect(item_key, item_data, "missing")
@@ -110,8 +192,14 @@ class ScraperGeneric(ABC):
             logger.warning("Failed to add redirect for item in error")
             pass  # ignore exceptions, we are already inside an exception handling
 
-    def scrape_one_item(self, item_key, item_data):
-        item_content = self.get_one_item_content(item_key, item_data)
+    def scrape_one_item(self, item_key, item_data, prefetched_content=None):
+        """get content of an item and process it
+
+        prefetched_content is the future of a call to get_one_item_content"""
+        if prefetched_content is None:
+            item_content = self.get_one_item_content(item_key, item_data)
+        else:
+            item_content = prefetched_content.result()
 
         if item_content is None:
             logger.warning(f"Missing {self.get_items_name()} {item_key}")
@@ -121,57 +209,259 @@ class ScraperGeneric(ABC):
 
         logger.debug(f"Processing {self.get_items_name()} {item_key}")
 
-        self.process_one_item(item_key, item_data, item_content)
+        with self.processor.rendering_kind(self.get_items_name()):
+            self.process_one_item(item_key, item_data, item_content)
+
+    def start_listing(
+        self, path: str, add_page_items: Callable[[list], None], **params
+    ):
+        """fetch pages of an API listing in background, as expected items source
+
+        Up to `listing_concurrency` pages of `listing_page_size` items are fetched
+        at once. Pages are passed to add_page_items in order as soon as they
+        arrive, so that scraping can start before whole listing is known. Listing
+        ends with first empty or incomplete page"""
+        self.listing_done.clear()
+        self.listing_error = None
+        threading.Thread(
+            target=self._run_listing,
+            name=f"LIST-{self.get_items_name()}",
+            kwargs={"path": path, "add_page_items": add_page_items, **params},
+            daemon=True,
+        ).start()
+
+    def _run_listing(self, path: str, add_page_items: Callable[[list], None], **params):
+        page_size = self.configuration.listing_page_size
+        # only first page is of interest when scraping only first items
+        concurrency = (
+            1
+            if self.configuration.scrape_only_first_items
+            else self.configuration.listing_concurrency
+        )
+        executor = Executor(
+            queue_size=concurrency,
+            nb_workers=concurrency,
+            prefix=f"LIST-{self.get_items_name()}-T-",
+        )
+        executor.start()
+        pages = deque()
+        offset = 0
+        nb_pages = 0
+        try:
+            while True:
+                while len(pages) < concurrency:
+                    pages.append(
+                        executor.submit(
+                            self.utils.get_api_content,
+                            path=path,
+                            limit=page_size,
+                            offset=offset,
+                            **params,
+                        )
+                    )
+                    offset += page_size
+                page = pages.popleft().result()
+                if not page:
+                    break
+                nb_pages += 1
+                add_page_items(page)
+                if len(page) < page_size:
+                    break
+                if self.configuration.scrape_only_first_items:
+                    logger.warning(
+                        f"Aborting the retrieval of all {self.get_items_name()}s since "
+                        "only first items will be scraped anyway"
+                    )
+                    break
+            logger.info(
+                f"{len(self.expected_items_keys)} {self.get_items_name()}s found "
+                f"in {nb_pages} pages"
+            )
+        except Exception as exc:
+            logger.error(f"Failed to list {self.get_items_name()}s", exc_info=exc)
+            self.listing_error = exc
+        finally:
+            for page in pages:
+                page.cancel()
+            executor.shutdown(wait=False)
+            with self.items_lock:
+                self.listing_done.set()
+                self.items_added.notify_all()
+            if self.on_items_added:
+                self.on_items_added()
+
+    def wait_for_items(self, timeout: float | None = None):
+        """block until an item is added, listing completes or timeout expires"""
+        with self.items_lock:
+            if not self.has_fresh_items and not self.listing_done.is_set():
+                self.items_added.wait(timeout)
+
+    @property
+    def has_fresh_items(self) -> bool:
+        """whether items (not awaiting a retry) can be scraped right now"""
+        return not self.items_queue.empty() or bool(self.prefetched)
+
+    @property
+    def has_pending_items(self) -> bool:
+        """whether items remain to be scraped, now, once listed or once retry is due"""
+        return (
+            self.has_fresh_items
+            or bool(self.retry_lane)
+            or not self.listing_done.is_set()
+        )
+
+    @property
+    def needs_scraping(self) -> bool:
+        """whether scrape_items has something to do right now
+
+        i.e. items to scrape now, or a listing error to raise"""
+        return self.has_fresh_items or self.has_due_retry or bool(self.listing_error)
+
+    @property
+    def has_due_retry(self) -> bool:
+        """whether first item of retry lane is due"""
+        return bool(self.retry_lane) and self.retry_lane[0][0] <= time.monotonic()
+
+    @property
+    def next_retry_due(self) -> float | None:
+        """monotonic time at which first item of retry lane is due, if any"""
+        return self.retry_lane[0][0] if self.retry_lane else None
+
+    def get_next_item(self):
+        """(next item to scrape, future of its content or None) or None
+
+        Retries once due have precedence over fresh items. Content of next fresh
+        items is fetched ahead (`prefetch_items` at most) so that API round-trips
+        overlap processing of items, unless it is already being fetched since item
+        discovery. None if there is nothing to scrape right now"""
+        if self.has_due_retry:
+            with self.items_lock:
+                return heapq.heappop(self.retry_lane)[2], None
+        while (
+            len(self.prefetched) < self.configuration.prefetch_items
+            and not self.items_queue.empty()
+        ):
+            item = self.items_queue.get(block=False)
+            item_key, item_data = item
+            with self.items_lock:
+                future = self.speculative.pop(item_key, None)
+                if future is not None:
+                    self.speculation_stats["used"] += 1
+            if future is None:
+                future = self.prefetch_executor.submit(
+                    self.get_one_item_content,
+                    item_key=item_key,
+                    item_data=item_data,
+                )
+            self.prefetched.append((item, future))
+        if self.prefetched:
+            return self.prefetched.popleft()
+        return None
+
+    def schedule_retry(self, item, exc, outages: int) -> float | None:
+        """put a failed item in retry lane if its failure looks transient
+
+        `outages` is the count of outages when item processing started. Items which
+        failed during an outage get MAX_OUTAGE_RETRIES attempts, those which failed
+        with a congestion error (429, 5xx, timeout...) get ITEM_MAX_RETRIES ones,
+        with an exponential delay. Returns the delay, None if not retried"""
+        if self.utils.origins.had_outage_since(outages):
+            retries = self.outage_retries
+            max_retries = MAX_OUTAGE_RETRIES
+        elif is_congestion_error(exc):
+            retries = self.transient_retries
+            max_retries = ITEM_MAX_RETRIES
+        else:
+            return None
+        item_key = item[0]
+        with self.items_lock:
+            attempt = retries.get(item_key, 0)
+            if attempt >= max_retries:
+                return None
+            retries[item_key] = attempt + 1
+
+            delay = ITEM_RETRY_BASE_DELAY * 2**attempt
+            heapq.heappush(
+                self.retry_lane,
+                (time.monotonic() + delay, next(self._retry_sequence), item),
+            )
+        return delay
 
     def scrape_items(self):
+        """scrape items available right now, one after the other"""
+        if self.listing_error:
+            raise self.listing_error
         logger.info(
             f"Scraping {self.get_items_name()} items ({self.items_queue.qsize()}"
             " items remaining)"
         )
 
         num_items = 1
-        while not self.items_queue.empty():
-            run_pending()
+        while True:
             if (
                 self.configuration.scrape_only_first_items
                 and num_items > FIRST_ITEMS_COUNT
             ):
                 break
-            item = self.items_queue.get(block=False)
-            item_key = item["key"]
-            item_data = item["data"]
-            logger.info(
-                f"  Scraping {self.get_items_name()} {item_key}"
-                f" ({self.items_queue.qsize()} items remaining)"
-            )
-            try:
-                self.scrape_one_item(item_key, item_data)
-            except Exception as exc:
-                self.error_items_keys.add(item_key)
+            next_item = self.get_next_item()
+            if next_item is None:
+                break
+            self.scrape_item(*next_item)
+            num_items += 1
+
+    def scrape_item(self, item, prefetched_content=None):
+        """scrape an item taken with get_next_item(), handling its failure
+
+        Failed item is scheduled for a retry or replaced by an error redirect.
+        Raises FinalScrapingFailureError when too many items are missing or failed.
+        Safe to call from several threads at once"""
+        item_key, item_data = item
+        logger.info(
+            f"  Scraping {self.get_items_name()} {item_key}"
+            f" ({self.items_queue.qsize()} items remaining)"
+        )
+        outages = self.utils.origins.outages
+        try:
+            with (
+                self.utils.watchdog.watch(f"{self.get_items_name()} {item_key}"),
+                self.timings.measure(item_key),
+            ):
+                self.scrape_one_item(item_key, item_data, prefetched_content)
+        except OriginUnavailableError as exc:
+            raise FinalScrapingFailureError(str(exc)) from exc
+        except Exception as exc:
+            delay = self.schedule_retry(item, exc, outages)
+            if delay is not None:
                 logger.warning(
-                    f"Error while processing {self.get_items_name()} {item_key}",
+                    f"Error while processing {self.get_items_name()} {item_key},"
+                    f" will retry in {delay:.0f}s",
                     exc_info=exc,
                 )
-                self.add_item_error_redirect(item_key, item_data)
-            finally:
-                if (
-                    len(self.missing_items_keys)
-                    * 100
-                    / (len(self.expected_items_keys) + len(self.unexpected_items_keys))
-                    > self.configuration.max_missing_items_percent
-                ):
-                    raise FinalScrapingFailureError(
-                        f"Too many {self.get_items_name()}s found missing: "
-                        f"{len(self.missing_items_keys)}"
-                    )
-                if (
-                    len(self.error_items_keys)
-                    * 100
-                    / (len(self.expected_items_keys) + len(self.unexpected_items_keys))
-                    > self.configuration.max_error_items_percent
-                ):
-                    raise FinalScrapingFailureError(
-                        f"Too many {self.get_items_name()}s failed to be processed: "
-                        f"{len(self.error_items_keys)}"
-                    )
-                num_items += 1
+                return
+            self.error_items_keys.add(item_key)
+            logger.warning(
+                f"Error while processing {self.get_items_name()} {item_key}",
+                exc_info=exc,
+            )
+            self.add_item_error_redirect(item_key, item_data)
+        finally:
+            if (
+                len(self.missing_items_keys)
+                * 100
+                / (len(self.expected_items_keys) + len(self.unexpected_items_keys))
+                > self.configuration.max_missing_items_percent
+            ):
+                raise FinalScrapingFailureError(
+                    f"Too many {self.get_items_name()}s found missing: "
+                    f"{len(self.missing_items_keys)}"
+                )
+            if (
+                len(self.error_items_keys)
+                * 100
+                / (len(self.expected_items_keys) + len(self.unexpected_items_keys))
+                > self.configuration.max_error_items_percent
+            ):
+                raise FinalScrapingFailureError(
+                    f"Too many {self.get_items_name()}s failed to be processed: "
+                    f"{len(self.error_items_keys)}"
+                )
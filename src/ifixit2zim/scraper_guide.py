@@ -1,5 +1,6 @@
 import urllib.parse
 
+from ifixit2zim.bookkeeping import ItemRecord, intern_key
 from ifixit2zim.constants import (
     DIFFICULTY_EASY,
     DIFFICULTY_HARD,
@@ -16,12 +17,24 @@ from ifixit2zim.scraper_generic import ScraperGeneric
 from ifixit2zim.shared import logger
 
 
+class GuideRecord(ItemRecord):
+    __slots__ = ("guideid", "guidetitle", "locale")
+
+
 class ScraperGuide(ScraperGeneric):
     def __init__(self, context: Context):
         super().__init__(context)
 
     def setup(self):
         self.guide_template = self.env.get_template("guide.html")
+        # ids of selected guides, None if all are
+        self.selected_ids = (
+            set(self.configuration.guides) if self.configuration.guides else None
+        )
+        # without explicit guides, those of selected categories subtrees only
+        self.in_subtrees_only = bool(
+            self.configuration.category_subtrees and not self.configuration.guides
+        )
 
     def get_items_name(self):
         return "guide"
@@ -29,12 +42,10 @@ class ScraperGuide(ScraperGeneric):
     def _add_guide_to_scrape(self, guideid, guidetitle, locale, is_expected):
         self.add_item_to_scrape(
             guideid,
-            {
-                "guideid": guideid,
-                "guidetitle": guidetitle,
-                "locale": locale,
-            },
+            GuideRecord(guideid=guideid, guidetitle=guidetitle, locale=locale),
             is_expected,
+            # all guides are found through links when scraping subtrees
+            warn_unexpected=not self.in_subtrees_only,
         )
 
     def _build_guide_path(self, guideid, guidetitle):  # noqa ARG002
@@ -58,31 +69,42 @@ class ScraperGuide(ScraperGeneric):
         guideid = guide["guideid"]
         locale = guide["locale"]
         title = guide["title"]
+        guide_key = intern_key(guideid)
         # override unknown locale if needed
         if (
-            guideid in self.expected_items_keys
-            and self.expected_items_keys[guideid]["locale"] == UNKNOWN_LOCALE
+            guide_key in self.expected_items_keys
+            and self.expected_items_keys[guide_key]["locale"] == UNKNOWN_LOCALE
         ):
-            self.expected_items_keys[guideid]["locale"] = locale
+            self.expected_items_keys[guide_key]["locale"] = locale
         # override unknown title if needed
         if (
-            guideid in self.expected_items_keys
-            and self.expected_items_keys[guideid]["guidetitle"] == UNKNOWN_TITLE
+            guide_key in self.expected_items_keys
+            and self.expected_items_keys[guide_key]["guidetitle"] == UNKNOWN_TITLE
         ):
-            self.expected_items_keys[guideid]["guidetitle"] = title
+            self.expected_items_keys[guide_key]["guidetitle"] = title
         return self.get_guide_link_from_props(
-            guideid=guideid, guidetitle=title, guidelocale=locale
+            guideid=guideid,
+            guidetitle=title,
+            guidelocale=locale,
+            guidecategory=guide.get("category"),
         )
 
     def get_guide_link_from_props(
-        self, guideid, guidetitle, guidelocale=UNKNOWN_LOCALE
+        self, guideid, guidetitle, guidelocale=UNKNOWN_LOCALE, guidecategory=None
     ):
         guide_path = urllib.parse.quote(
             self._build_guide_path(guideid=guideid, guidetitle=guidetitle)
         )
         if self.configuration.no_guide:
             return f"home/not_scrapped?url={guide_path}"
-        if self.configuration.guides and str(guideid) not in self.configuration.guides:
+        if self.selected_ids is not None and str(guideid) not in self.selected_ids:
+            return f"home/not_scrapped?url={guide_path}"
+        # category known from the link: no need to fetch guide to know it is out
+        if (
+            self.in_subtrees_only
+            and guidecategory is not None
+            and not self.processor.is_category_selected(guidecategory)
+        ):
             return f"home/not_scrapped?url={guide_path}"
         self._add_guide_to_scrape(guideid, guidetitle, guidelocale, False)
         return guide_path
@@ -96,31 +118,23 @@ class ScraperGuide(ScraperGeneric):
             for guide in self.configuration.guides:
                 self._add_guide_to_scrape(guide, UNKNOWN_TITLE, UNKNOWN_LOCALE, True)
             return
+        if self.in_subtrees_only:
+            logger.info("Guides will be found on pages of selected categories")
+            return
         logger.info("Downloading list of guides")
-        limit = 200
-        offset = 0
-        while True:
-            guides = self.utils.get_api_content("/guides", limit=limit, offset=offset)
-            if not guides or len(guides) == 0:
-                break
-            for guide in guides:
-                # we ignore archived guides since they are not accessible anywayß
-                if "GUIDE_ARCHIVED" in guide["flags"]:
-                    continue
-                if guide["revisionid"] == 0:
-                    logger.warning("Found one guide with revisionid=0")
-                guideid = guide["guideid"]
-                # Unfortunately for now iFixit API always returns "en" as language
-                # on this endpoint, so we consider it as unknown for now
-                self._add_guide_to_scrape(guideid, UNKNOWN_TITLE, UNKNOWN_LOCALE, True)
-            offset += limit
-            if self.configuration.scrape_only_first_items:
-                logger.warning(
-                    "Aborting the retrieval of all guides since only first items"
-                    " will be scraped anyway"
-                )
-                break
-        logger.info(f"{len(self.expected_items_keys)} guides found")
+        self.start_listing("/guides", self._add_listed_guides)
+
+    def _add_listed_guides(self, guides):
+        for guide in guides:
+            # we ignore archived guides since they are not accessible anywayß
+            if "GUIDE_ARCHIVED" in guide["flags"]:
+                continue
+            if guide["revisionid"] == 0:
+                logger.warning("Found one guide with revisionid=0")
+            guideid = guide["guideid"]
+            # Unfortunately for now iFixit API always returns "en" as language
+            # on this endpoint, so we consider it as unknown for now
+            self._add_guide_to_scrape(guideid, UNKNOWN_TITLE, UNKNOWN_LOCALE, True)
 
     def get_one_item_content(self, item_key, item_data):
         guideid = item_key
@@ -156,6 +170,19 @@ class ScraperGuide(ScraperGeneric):
     def process_one_item(self, item_key, item_data, item_content):  # noqa ARG002
         guide_content = item_content
 
+        # guide linked without its category (e.g. in text) but not part of subtrees
+        if self.in_subtrees_only and not self.processor.is_category_selected(
+            guide_content.get("category")
+        ):
+            path = self._build_guide_path(
+                guideid=guide_content["guideid"], guidetitle=guide_content["title"]
+            )
+            self.processor.add_redirect(
+                path=path,
+                target_path=f"home/not_scrapped?{urllib.parse.urlencode({'url':path})}",
+            )
+            return
+
         if guide_content["type"] != "teardown":
             if guide_content["difficulty"] in DIFFICULTY_VERY_EASY:
                 guide_content["difficulty_class"] = "difficulty-1"
@@ -267,4 +294,6 @@ class ScraperGuide(ScraperGeneric):
             ),
             title=guide_content["title"],
             content=guide_rendered,
+            kind=self.get_items_name(),
+            summary=guide_content.get("summary"),
         )
@@ -1,5 +1,6 @@
 import urllib.parse
 
+from ifixit2zim.bookkeeping import ItemRecord
 from ifixit2zim.constants import UNAVAILABLE_OFFLINE_INFOS
 from ifixit2zim.context import Context
 from ifixit2zim.exceptions import UnexpectedDataKindExceptionError
@@ -7,12 +8,25 @@ from ifixit2zim.scraper_generic import ScraperGeneric
 from ifixit2zim.shared import logger
 
 
+class InfoRecord(ItemRecord):
+    __slots__ = ("info_title",)
+
+
 class ScraperInfo(ScraperGeneric):
     def __init__(self, context: Context):
         super().__init__(context)
 
     def setup(self):
         self.info_template = self.env.get_template("info.html")
+        # keys of selected infos, None if all are
+        self.selected_keys = (
+            {
+                self._get_info_key_from_title(info_title)
+                for info_title in self.configuration.infos
+            }
+            if self.configuration.infos
+            else None
+        )
 
     def get_items_name(self):
         return "info"
@@ -20,9 +34,7 @@ class ScraperInfo(ScraperGeneric):
     def _add_info_to_scrape(self, info_key, info_title, is_expected):
         self.add_item_to_scrape(
             info_key,
-            {
-                "info_title": info_title,
-            },
+            InfoRecord(info_title=info_title),
             is_expected,
         )
 
@@ -52,14 +64,8 @@ class ScraperInfo(ScraperGeneric):
         if info_title in UNAVAILABLE_OFFLINE_INFOS:
             return f"home/unavailable_offline?url={info_path}"
         info_key = self._get_info_key_from_title(info_title)
-        if self.configuration.infos:
-            is_not_included = True
-            for other_info in self.configuration.infos:
-                other_info_key = self._get_info_key_from_title(other_info)
-                if other_info_key == info_key:
-                    is_not_included = False
-            if is_not_included:
-                return f"home/not_scrapped?url={info_path}"
+        if self.selected_keys is not None and info_key not in self.selected_keys:
+            return f"home/not_scrapped?url={info_path}"
         self._add_info_to_scrape(info_key, info_title, False)
         return info_path
 
@@ -74,26 +80,13 @@ class ScraperInfo(ScraperGeneric):
                 self._add_info_to_scrape(info_key, info_title, True)
             return
         logger.info("Downloading list of info")
-        limit = 200
-        offset = 0
-        while True:
-            info_wikis = self.utils.get_api_content(
-                "/wikis/INFO", limit=limit, offset=offset
-            )
-            if not info_wikis or len(info_wikis) == 0:
-                break
-            for info_wiki in info_wikis:
-                info_title = info_wiki["title"]
-                info_key = self._get_info_key_from_title(info_title)
-                self._add_info_to_scrape(info_key, info_title, True)
-            offset += limit
-            if self.configuration.scrape_only_first_items:
-                logger.warning(
-                    "Aborting the retrieval of all infos since only first items"
-                    " will be scraped anyway"
-                )
-                break
-        logger.info(f"{len(self.expected_items_keys)} info found")
+        self.start_listing("/wikis/INFO", self._add_listed_infos)
+
+    def _add_listed_infos(self, info_wikis):
+        for info_wiki in info_wikis:
+            info_title = info_wiki["title"]
+            info_key = self._get_info_key_from_title(info_title)
+            self._add_info_to_scrape(info_key, info_title, True)
 
     def get_one_item_content(self, item_key, item_data):  # noqa ARG002
         info_wiki_title = item_key
@@ -121,4 +114,6 @@ class ScraperInfo(ScraperGeneric):
             path=self._build_info_path(info_wiki_content["title"]),
             title=info_wiki_content["display_title"],
             content=info_wiki_rendered,
+            kind=self.get_items_name(),
+            summary=info_wiki_content.get("description"),
         )
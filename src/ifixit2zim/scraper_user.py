@@ -1,5 +1,6 @@
 import urllib.parse
 
+from ifixit2zim.bookkeeping import ItemRecord, intern_key
 from ifixit2zim.constants import UNKNOWN_TITLE, USER_LABELS
 from ifixit2zim.context import Context
 from ifixit2zim.exceptions import UnexpectedDataKindExceptionError
@@ -7,13 +8,24 @@ from ifixit2zim.scraper_generic import ScraperGeneric
 from ifixit2zim.shared import logger
 
 
+class UserRecord(ItemRecord):
+    __slots__ = ("userid", "usertitle")
+
+
 class ScraperUser(ScraperGeneric):
     def __init__(self, context: Context):
         super().__init__(context)
+        # interned user id => tuple of distinct titles the user is referenced with
         self.user_id_to_titles = {}
+        # interned user id => path of its page, once processed
+        self.user_id_to_path = {}
 
     def setup(self):
         self.user_template = self.env.get_template("user.html")
+        # ids of selected users, None if all are
+        self.selected_ids = (
+            set(self.configuration.users) if self.configuration.users else None
+        )
 
     def get_items_name(self):
         return "user"
@@ -21,17 +33,44 @@ class ScraperUser(ScraperGeneric):
     def _add_user_to_scrape(self, userid, usertitle, is_expected):
         self.add_item_to_scrape(
             userid,
-            {
-                "userid": userid,
-                "usertitle": usertitle,
-            },
+            UserRecord(userid=userid, usertitle=usertitle),
             is_expected,
             warn_unexpected=False,
         )
-        if userid in self.user_id_to_titles:
-            self.user_id_to_titles[userid].append(usertitle)
-        else:
-            self.user_id_to_titles[userid] = [usertitle]
+        user_key = intern_key(userid)
+        with self.items_lock:  # users are found by concurrent items
+            titles = self.user_id_to_titles.get(user_key, ())
+            if usertitle in titles:
+                return
+            self.user_id_to_titles[user_key] = (*titles, usertitle)
+            # user already processed (other kinds are scraped meanwhile)
+            normal_path = self.user_id_to_path.get(user_key)
+        if not normal_path:
+            return
+        try:
+            self._add_alternate_redirect(userid, usertitle, normal_path)
+        except Exception:
+            # title is redirected once found again, by the item being retried
+            with self.items_lock:
+                self.user_id_to_titles[user_key] = tuple(
+                    title
+                    for title in self.user_id_to_titles[user_key]
+                    if title != usertitle
+                )
+            raise
+
+    def _add_alternate_redirect(self, userid, usertitle, normal_path):
+        """redirect to user page from its path with another title"""
+        if usertitle == UNKNOWN_TITLE:
+            return
+        alternate_path = self._build_user_path(userid=userid, usertitle=usertitle)
+        if alternate_path == normal_path:
+            return
+        logger.debug(
+            "Adding user redirect for alternate user path from "
+            f"{alternate_path} to {normal_path}"
+        )
+        self.processor.add_redirect(path=alternate_path, target_path=normal_path)
 
     def _build_user_path(self, userid, usertitle):
         href = (
@@ -50,12 +89,13 @@ class ScraperUser(ScraperGeneric):
         usertitle = user["username"]
         if not usertitle:
             usertitle = "User"
+        user_key = intern_key(userid)
         # override unknown title if needed
         if (
-            userid in self.expected_items_keys
-            and self.expected_items_keys[userid]["usertitle"] == UNKNOWN_TITLE
+            user_key in self.expected_items_keys
+            and self.expected_items_keys[user_key]["usertitle"] == UNKNOWN_TITLE
         ):
-            self.expected_items_keys[userid]["usertitle"] = usertitle
+            self.expected_items_keys[user_key]["usertitle"] = usertitle
         return self.get_user_link_from_props(userid=userid, usertitle=usertitle)
 
     def get_user_link_from_props(self, userid, usertitle):
@@ -64,7 +104,7 @@ class ScraperUser(ScraperGeneric):
         )
         if self.configuration.no_user:
             return f"home/not_scrapped?url={user_path}"
-        if self.configuration.users and str(userid) not in self.configuration.users:
+        if self.selected_ids is not None and str(userid) not in self.selected_ids:
             return f"home/not_scrapped?url={user_path}"
         self._add_user_to_scrape(userid, usertitle, False)
         return user_path
@@ -114,7 +154,6 @@ class ScraperUser(ScraperGeneric):
 
     def process_one_item(self, _, item_data, item_content):
         userid = item_data["userid"]
-        usertitle = item_data["usertitle"]
         user_content = item_content
 
         user_rendered = self.user_template.render(
@@ -131,23 +170,15 @@ class ScraperUser(ScraperGeneric):
             path=normal_path,
             title=user_content["username"],
             content=user_rendered,
+            kind=self.get_items_name(),
             is_front=False,
+            summary=user_content.get("summary"),
         )
 
-        for other_user_title in self.user_id_to_titles[userid]:
-            if other_user_title == UNKNOWN_TITLE:
-                continue
-            if other_user_title == usertitle:
-                continue
-            alternate_path = self._build_user_path(
-                userid=userid,
-                usertitle=other_user_title,
-            )
-            logger.debug(
-                "Adding user redirect for alternate user path from "
-                f"{alternate_path} to {normal_path}"
-            )
-            self.processor.add_redirect(
-                path=alternate_path,
-                target_path=normal_path,
-            )
+        # titles found once processed are redirected by _add_user_to_scrape
+        user_key = intern_key(userid)
+        with self.items_lock:
+            self.user_id_to_path[user_key] = normal_path
+            titles = self.user_id_to_titles[user_key]
+        for other_user_title in titles:
+            self._add_alternate_redirect(userid, other_user_title, normal_path)
@@ -1,6 +1,9 @@
 import locale
 import logging
+import os
+import resource
 import threading
+import time
 from contextlib import contextmanager
 
 from zimscraperlib.logging import getLogger as lib_getLogger
@@ -32,3 +35,50 @@ def setlocale(name):
             yield locale.setlocale(locale.LC_ALL, name)
         finally:
             locale.setlocale(locale.LC_ALL, saved)
+
+
+def get_cpu_count() -> int:
+    """number of CPUs this process may run on"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def get_memory_usage() -> float:
+    """current resident memory of the process, in MiB (peak one if unknown)"""
+    try:
+        with open("/proc/self/statm") as fh:
+            resident_pages = int(fh.read().split()[1])
+    except OSError:
+        return get_peak_memory()
+    return resident_pages * resource.getpagesize() / 2**20
+
+
+def get_peak_memory() -> float:
+    """peak resident memory of the process so far, in MiB (Linux)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Stopwatch:
+    """Records wall-clock and CPU durations of successive steps
+
+    `lap(name)` closes a step started at previous lap (or at creation)"""
+
+    def __init__(self):
+        self.steps = []
+        self._last_wall = time.perf_counter()
+        self._last_cpu = time.process_time()
+
+    def lap(self, name: str):
+        wall, cpu = time.perf_counter(), time.process_time()
+        self.steps.append((name, wall - self._last_wall, cpu - self._last_cpu))
+        self._last_wall, self._last_cpu = wall, cpu
+
+    @property
+    def total(self) -> float:
+        return sum(wall for _, wall, _ in self.steps)
+
+    def log_breakdown(self, title: str):
+        logger.info(f"{title} took {self.total:.3f}s:")
+        for name, wall, cpu in self.steps:
+            logger.info(f"\t{name}: {wall:.3f}s (CPU {cpu:.3f}s)")
@@ -0,0 +1,68 @@
+import threading
+from collections.abc import Callable, MutableMapping
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for a same key into a single execution
+
+    First caller for a key (the leader) runs the function while concurrent callers
+    for the same key wait for and share its result (or exception). With `memoize`,
+    successful results are also kept and served to later callers.
+
+    `copy_result` is applied to results handed to other callers than the leader,
+    for values callers might mutate. `results` is the mapping memoized results are
+    kept in, a dict by default"""
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        memoize: bool = False,
+        copy_result: Callable | None = None,
+        results: MutableMapping | None = None,
+    ):
+        self.name = name
+        self.memoize = memoize
+        self.copy_result = copy_result
+        self.lock = threading.Lock()
+        # key => Future of the running execution
+        self.in_flight = {}
+        self.results = {} if results is None else results
+        self.stats = {"calls": 0, "executions": 0, "coalesced": 0, "memoized": 0}
+
+    def _shared(self, result):
+        return self.copy_result(result) if self.copy_result else result
+
+    def do(self, key, func: Callable, **kwargs):
+        """result of func(**kwargs), shared with concurrent callers for key"""
+        with self.lock:
+            self.stats["calls"] += 1
+            if self.memoize and key in self.results:
+                self.stats["memoized"] += 1
+                return self._shared(self.results[key])
+            future = self.in_flight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = self.in_flight[key] = Future()
+                self.stats["executions"] += 1
+            else:
+                self.stats["coalesced"] += 1
+
+        if not is_leader:
+            return self._shared(future.result())
+
+        try:
+            result = func(**kwargs)
+        except BaseException as exc:
+            future.set_exception(exc)
+            with self.lock:
+                del self.in_flight[key]
+            raise
+
+        future.set_result(result)
+        with self.lock:
+            if self.memoize:
+                self.results[key] = result
+            del self.in_flight[key]
+        return result
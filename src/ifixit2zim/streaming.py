@@ -0,0 +1,76 @@
+import codecs
+import json
+import re
+from collections.abc import Iterable, Iterator
+
+# a JSON token, possibly preceded by whitespace: a complete string, a punctuation
+# character or a scalar (number, true, false, null)
+_token_regex = re.compile(
+    r"\s*(?:\"(?P<string>(?:[^\"\\]|\\.)*)\"|(?P<punctuation>[{}\[\]:,])"
+    r"|(?P<scalar>[^\s{}\[\]:,\"]+))",
+    flags=re.DOTALL,
+)
+
+
+class JSONKeysParser:
+    """Incremental parser yielding keys of all objects of a JSON document
+
+    Document is fed by pieces, as it is downloaded, and keys are yielded as soon as
+    they are complete, in document order (i.e. parents before their children).
+    Nesting is tracked with an explicit stack so there is no limit on depth.
+    Values are skipped and document is not validated.
+
+    With `with_depth`, (key, depth) pairs are yielded instead, depth being the
+    number of containers the key is in (1 for keys of root object)"""
+
+    def __init__(self, *, with_depth: bool = False):
+        self.with_depth = with_depth
+        self.buffer = ""
+        # kind of containers currently open, `{` or `[`
+        self.stack = []
+        # whether next string is an object key
+        self.expects_key = False
+
+    def feed(self, text: str, *, final: bool = False) -> Iterator:
+        """keys completed by this piece of text"""
+        self.buffer += text
+        position = 0
+        while True:
+            match = _token_regex.match(self.buffer, position)
+            # incomplete token: wait for more text unless there is no more
+            if match is None or (
+                match.group("scalar") and match.end() == len(self.buffer) and not final
+            ):
+                break
+            position = match.end()
+
+            if match.group("string") is not None:
+                if self.expects_key:
+                    self.expects_key = False
+                    key = match.group("string")
+                    if "\\" in key:
+                        key = json.loads(f'"{key}"')
+                    yield (key, len(self.stack)) if self.with_depth else key
+                continue
+
+            punctuation = match.group("punctuation")
+            if punctuation in ("{", "["):
+                self.stack.append(punctuation)
+                self.expects_key = punctuation == "{"
+            elif punctuation in ("}", "]"):
+                self.stack.pop()
+                self.expects_key = False
+            elif punctuation == ",":
+                self.expects_key = bool(self.stack) and self.stack[-1] == "{"
+        self.buffer = self.buffer[position:]
+
+
+def iter_json_keys(chunks: Iterable[bytes], *, with_depth: bool = False) -> Iterator:
+    """keys of all objects of a JSON document received as chunks of UTF-8 bytes
+
+    See JSONKeysParser for `with_depth`"""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    parser = JSONKeysParser(with_depth=with_depth)
+    for chunk in chunks:
+        yield from parser.feed(decoder.decode(chunk))
+    yield from parser.feed(decoder.decode(b"", final=True), final=True)
@@ -0,0 +1,101 @@
+import pathlib
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+
+from ifixit2zim.shared import logger
+
+
+def get_bytecode_cache(cache_dir: str | None) -> FileSystemBytecodeCache | None:
+    """on-disk cache of compiled templates, None if disabled or not usable
+
+    Jinja invalidates cached templates when their source checksum changes"""
+    if not cache_dir:
+        return None
+    cache_path = pathlib.Path(cache_dir).expanduser()
+    try:
+        cache_path.mkdir(parents=True, exist_ok=True)
+    except OSError as exc:
+        # e.g. read-only or missing HOME in containers, cache is optional
+        logger.warning(
+            f"Unable to create {cache_path}, compiled templates "
+            f"will not be cached: {exc}"
+        )
+        return None
+    return FileSystemBytecodeCache(str(cache_path))
+
+
+class FragmentCache:
+    """LRU cache of rendered template fragments, keyed by tuples
+
+    First element of a key is the fragment name, used to report hit rates"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.fragments = OrderedDict()
+        self.stats = {}
+
+    def _record(self, name: str, *, hit: bool):
+        stats = self.stats.setdefault(name, {"hits": 0, "misses": 0})
+        stats["hits" if hit else "misses"] += 1
+
+    def get_or_render(self, key: tuple, render: Callable[[], str]) -> str:
+        """cached fragment for key, rendered and stored first if not present"""
+        with self.lock:
+            if key in self.fragments:
+                self.fragments.move_to_end(key)
+                self._record(key[0], hit=True)
+                return self.fragments[key]
+            self._record(key[0], hit=False)
+
+        fragment = render()
+
+        with self.lock:
+            self.fragments[key] = fragment
+            while len(self.fragments) > self.max_size:
+                self.fragments.popitem(last=False)
+        return fragment
+
+    def get_hit_rates(self) -> dict[str, float]:
+        """ratio of hits over lookups, per fragment name"""
+        with self.lock:
+            return {
+                name: stats["hits"] / (stats["hits"] + stats["misses"])
+                for name, stats in self.stats.items()
+            }
+
+
+class FragmentCacheExtension(Extension):
+    """Jinja `{% cache name, key... %}...{% endcache %}` tag
+
+    Body is rendered once per key and served from the environment's
+    `fragment_cache` afterwards. Keys must include everything the body depends on
+    (including `rel_prefix`). Filters with side effects (links registering items to
+    scrape, images deferred) are only run on first rendering, which is fine as long
+    as they are idempotent."""
+
+    tags = {"cache"}  # noqa: RUF012
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=None)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            args.append(parser.parse_expression())
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method("_cache_support", [nodes.List(args)]), [], [], body
+        ).set_lineno(lineno)
+
+    def _cache_support(self, key, caller):
+        fragment_cache = self.environment.fragment_cache  # pyright: ignore
+        if fragment_cache is None:
+            return caller()
+        return fragment_cache.get_or_render(tuple(key), caller)
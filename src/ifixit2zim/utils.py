@@ -1,7 +1,12 @@
+import copy
 import io
 import re
+import threading
+import time
 import urllib.parse
 import zlib
+from collections.abc import Iterator
+from contextlib import contextmanager
 from http import HTTPStatus
 
 import backoff
@@ -9,10 +14,20 @@ import bs4
 import requests
 from kiwixstorage import KiwixStorage
 from pif import get_public_ip
-from zimscraperlib.download import stream_file
 
-from ifixit2zim.constants import API_PREFIX, Configuration
+from ifixit2zim.constants import (
+    API_PREFIX,
+    REQUEST_BACKOFF_MAX_TIME,
+    REQUEST_BLOCK_SIZE,
+    Configuration,
+)
+from ifixit2zim.exceptions import RequestDeadlineExceededError
+from ifixit2zim.metrics import HttpMetrics, get_api_family
+from ifixit2zim.origins import Origins, is_congestion_status
 from ifixit2zim.shared import logger
+from ifixit2zim.singleflight import SingleFlight
+from ifixit2zim.streaming import iter_json_keys
+from ifixit2zim.watchdog import Watchdog
 
 
 def backoff_hdlr(details):
@@ -21,10 +36,16 @@ def backoff_hdlr(details):
         "calling function {target} with args {args} and kwargs "
         "{kwargs}".format(**details)
     )
+    # decorated functions are methods of Utils
+    details["args"][0].metrics.count_retry()
 
 
 def fatal_code(e):
-    """Give up on errors codes 400-499 except 429"""
+    """Give up on errors codes 400-499 except 429
+
+    Errors without a response (timeouts, connection errors) are retried"""
+    if e.response is None:
+        return False
     logger.warning(f"Fatal code {e.response.status_code}")
     return (
         HTTPStatus.BAD_REQUEST
@@ -37,6 +58,18 @@ def fatal_code(e):
 class Utils:
     def __init__(self, configuration: Configuration) -> None:
         self.configuration = configuration
+        # adaptive concurrency limits of requests, per origin
+        self.origins = Origins()
+        # latency, statuses, retries and bytes of requests, per endpoint family
+        self.metrics = HttpMetrics()
+        # concurrent queries of a same API URL share a single request
+        self.api_queries = SingleFlight("API", copy_result=copy.deepcopy)
+        # one session per thread, so that connections are kept alive and reused
+        self.sessions = threading.local()
+        self.watchdog = Watchdog(
+            stall_timeout=configuration.stall_timeout,
+            cancel_stalled=configuration.cancel_stalled_requests,
+        )
 
     def to_path(self, url: str) -> str:
         """Path-part of an URL, without leading slash"""
@@ -55,6 +88,15 @@ class Utils:
         """in-source website url for a path, untainted"""
         return f"{self.configuration.main_url.geturl()}{path}"
 
+    def get_family(self, url: str) -> str:
+        """endpoint family of an URL, see HttpMetrics"""
+        api_url = self.get_url_raw(API_PREFIX)
+        if url.startswith(api_url):
+            return get_api_family(url[len(api_url) :])
+        if url.startswith(self.configuration.main_url.geturl()):
+            return "website"
+        return self.origins.get_origin(url)
+
     def to_url(self, value: str) -> str:
         """resolved potentially relative url from in-source link"""
         return value if value.startswith("http") else self.get_url_raw(value)
@@ -78,10 +120,98 @@ class Utils:
         """normalized path part of an url"""
         return self.normalize_ident(urllib.parse.urlparse(url).path)
 
+    @property
+    def session(self) -> requests.Session:
+        """HTTP session of current thread"""
+        if not hasattr(self.sessions, "session"):
+            self.sessions.session = requests.Session()
+        return self.sessions.session
+
+    @contextmanager
+    def open_stream(
+        self, url: str, method: str = "GET", family: str | None = None, **kwargs
+    ) -> Iterator[tuple[requests.Response, Iterator[bytes]]]:
+        """(response, body chunks) of an HTTP request, enforcing deadlines
+
+        `request_timeout` applies to connection and to each read while the whole
+        body must be received within `request_deadline`. Request is registered to
+        the watchdog which can cancel it, and measured under `family` (see
+        `get_family()` if not set). Connection is closed on exit"""
+        deadline = time.monotonic() + self.configuration.request_deadline
+
+        def iter_chunks(resp: requests.Response) -> Iterator[bytes]:
+            for chunk in resp.iter_content(REQUEST_BLOCK_SIZE):
+                if time.monotonic() > deadline:
+                    raise RequestDeadlineExceededError(
+                        f"{url} not received within "
+                        f"{self.configuration.request_deadline}s"
+                    )
+                self.origins.count_bytes(url, len(chunk))
+                measure.bytes += len(chunk)
+                yield chunk
+
+        with (
+            self.metrics.measure(family or self.get_family(url)) as measure,
+            self.watchdog.watch(f"{method} {url}") as activity,
+        ):
+            resp = self.session.request(
+                method,
+                url,
+                stream=True,
+                timeout=self.configuration.request_timeout,
+                **kwargs,
+            )
+            measure.status = resp.status_code
+            activity.cancel = resp.close
+            try:
+                yield resp, iter_chunks(resp)
+            except requests.exceptions.RequestException as exc:
+                if activity.cancelled:
+                    raise RequestDeadlineExceededError(
+                        f"{url} cancelled as stalled"
+                    ) from exc
+                raise
+            finally:
+                # connection goes back to session's pool if body was fully read
+                resp.close()
+
+    def request(
+        self,
+        url: str,
+        method: str = "GET",
+        byte_stream: io.BytesIO | None = None,
+        *,
+        only_first_block: bool = False,
+        family: str | None = None,
+        **kwargs,
+    ) -> requests.Response:
+        """response of an HTTP request, enforcing deadlines (see `open_stream()`)
+
+        Body is written to byte_stream (rewinded) if set, after checking status, and
+        loaded in response otherwise"""
+        chunks = []
+        with self.open_stream(url, method, family, **kwargs) as (resp, body):
+            if byte_stream is not None:
+                resp.raise_for_status()
+            for chunk in body:
+                if byte_stream is None:
+                    chunks.append(chunk)
+                else:
+                    byte_stream.write(chunk)
+                if only_first_block:
+                    break
+
+        if byte_stream is None:
+            # same as what requests does when reading content
+            resp._content = b"".join(chunks)
+        else:
+            byte_stream.seek(0)
+        return resp
+
     @backoff.on_exception(
         backoff.expo,
         requests.exceptions.RequestException,
-        max_time=16,
+        max_time=REQUEST_BACKOFF_MAX_TIME,
         on_backoff=backoff_hdlr,
         giveup=fatal_code,
     )
@@ -91,12 +221,10 @@ class Utils:
         actual_paths is amn ordered list of paths that were traversed to get to content.
         Without redirection, it should be a single path, equal to request
         Final, target path is always last"""
-        resp = requests.get(
-            self.get_url(path, **params),
-            params=params,
-            timeout=self.configuration.request_timeout,
-        )
-        resp.raise_for_status()
+        url = self.get_url(path, **params)
+        with self.origins.slot(url):
+            resp = self.request(url, params=params)
+            resp.raise_for_status()
 
         # we have params meaning we requested a page (?pg=xxx)
         # assumption: this must be a category page (so on same domain)
@@ -132,17 +260,20 @@ class Utils:
     def get_version_ident_for(self, url: str) -> str | None:
         """~version~ of the URL data to use for comparisons. Built from headers"""
         try:
-            resp = requests.head(url, timeout=10)
+            with self.origins.slot(url) as slot:
+                resp = self.request(url, method="HEAD", family="image versions")
+                slot.record(resp.status_code)
             headers = resp.headers
         except Exception as exc:
             logger.warning(f"Unable to HEAD {url}", exc_info=exc)
             try:
-                _, headers = stream_file(
-                    url=url,
-                    byte_stream=io.BytesIO(),
-                    block_size=1,
-                    only_first_block=True,
-                )
+                with self.origins.slot(url):
+                    headers = self.request(
+                        url,
+                        byte_stream=io.BytesIO(),
+                        only_first_block=True,
+                        family="image versions",
+                    ).headers
             except Exception as exc:
                 logger.warning(f"Unable to query image at {url}", exc_info=exc)
                 return
@@ -170,17 +301,37 @@ class Utils:
     @backoff.on_exception(
         backoff.expo,
         requests.exceptions.RequestException,
-        max_time=16,
+        max_time=REQUEST_BACKOFF_MAX_TIME,
         on_backoff=backoff_hdlr,
         giveup=fatal_code,
     )
-    def get_api_content(self, path, **params):
-        full_path = self.get_url(API_PREFIX + path, **params)
+    def query_api(self, full_path):
         logger.debug(f"Retrieving {full_path}")
-        response = requests.get(full_path, timeout=self.configuration.request_timeout)
+        with self.origins.slot(full_path) as slot:
+            response = self.request(full_path)
+            slot.record(response.status_code)
+        # let transient errors be retried instead of treating item as missing
+        if is_congestion_status(response.status_code):
+            response.raise_for_status()
         json_data = (
             response.json()
             if response and response.status_code == HTTPStatus.OK
             else None
         )
         return json_data
+
+    def get_api_content(self, path, **params):
+        """decoded JSON response of an API path, None if not successful"""
+        full_path = self.get_url(API_PREFIX + path, **params)
+        return self.api_queries.do(full_path, self.query_api, full_path=full_path)
+
+    def iter_api_keys(self, path, *, with_depth: bool = False, **params) -> Iterator:
+        """keys of all objects of an API response, yielded while it downloads
+
+        See JSONKeysParser for `with_depth`"""
+        full_path = self.get_url(API_PREFIX + path, **params)
+        logger.debug(f"Streaming {full_path}")
+        with self.origins.slot(full_path):
+            with self.open_stream(full_path) as (resp, body):
+                resp.raise_for_status()
+                yield from iter_json_keys(body, with_depth=with_depth)
@@ -0,0 +1,119 @@
+import sys
+import threading
+import time
+import traceback
+from collections.abc import Callable
+from contextlib import contextmanager
+
+from ifixit2zim.shared import logger
+
+
+class Activity:
+    """Something a thread is busy with (an item, a request...), see Watchdog"""
+
+    def __init__(self, description: str, cancel: Callable | None = None):
+        self.description = description
+        # how to interrupt it from another thread, if possible
+        self.cancel = cancel
+        self.thread = threading.current_thread()
+        self.started = time.monotonic()
+        self.reported = False
+        self.cancelled = False
+
+
+class Watchdog:
+    """Background thread reporting activities running for too long
+
+    Threads declare what they are busy with using `watch()`. Activities running for
+    more than `stall_timeout` seconds are logged once, with the stack of their
+    thread. With `cancel_stalled`, their `cancel` callable (closing the connection
+    of a request for instance) is then called so that the thread can move on"""
+
+    def __init__(
+        self,
+        stall_timeout: float,
+        *,
+        cancel_stalled: bool = False,
+        interval: float | None = None,
+    ):
+        self.stall_timeout = stall_timeout
+        self.cancel_stalled = cancel_stalled
+        self.interval = interval or max(stall_timeout / 4, 0.01)
+        self.lock = threading.Lock()
+        # thread => stack of its current activities
+        self.activities = {}
+        self.stopped = threading.Event()
+        self.thread = None
+        self.stats = {"stalled": 0, "cancelled": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.stall_timeout > 0
+
+    @contextmanager
+    def watch(self, description: str, cancel: Callable | None = None):
+        """declare current thread busy with an activity for the duration of block"""
+        activity = Activity(description, cancel)
+        with self.lock:
+            self.activities.setdefault(activity.thread, []).append(activity)
+        try:
+            yield activity
+        finally:
+            with self.lock:
+                stack = self.activities[activity.thread]
+                stack.remove(activity)
+                if not stack:
+                    del self.activities[activity.thread]
+
+    def start(self):
+        if not self.enabled:
+            return
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, name="watchdog", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.check()
+
+    def check(self):
+        """report (and cancel if requested) activities stalled since last check"""
+        now = time.monotonic()
+        with self.lock:
+            stalled = [
+                activity
+                for stack in self.activities.values()
+                for activity in stack
+                if not activity.reported and now - activity.started > self.stall_timeout
+            ]
+            for activity in stalled:
+                activity.reported = True
+        if not stalled:
+            return
+
+        frames = sys._current_frames()
+        for activity in stalled:
+            self.stats["stalled"] += 1
+            frame = frames.get(activity.thread.ident or -1)
+            stack = "".join(traceback.format_stack(frame)) if frame else "unknown\n"
+            logger.warning(
+                f"{activity.thread.name} stalled for "
+                f"{now - activity.started:.0f}s on {activity.description}, "
+                f"stack:\n{stack}"
+            )
+            if self.cancel_stalled and activity.cancel:
+                logger.warning(f"Cancelling {activity.description}")
+                activity.cancelled = True
+                self.stats["cancelled"] += 1
+                try:
+                    activity.cancel()
+                except Exception as exc:
+                    logger.warning(
+                        f"Failed to cancel {activity.description}", exc_info=exc
+                    )
@@ -0,0 +1,76 @@
+import contextlib
+import threading
+import urllib.parse
+from types import SimpleNamespace
+
+import pytest
+
+import ifixit2zim.scraper  # noqa: F401 # must be imported first (circular imports)
+from ifixit2zim.executor import Executor
+from ifixit2zim.origins import Origins
+from ifixit2zim.scraper_generic import ScraperGeneric
+from ifixit2zim.watchdog import Watchdog
+
+
+class FakeScraper(ScraperGeneric):
+    def __init__(self, context, failures, kind="fake", on_process=None):
+        super().__init__(context)
+        # item key => list of exceptions to raise on successive attempts
+        self.failures = failures
+        self.kind = kind
+        # called with item key while it is processed
+        self.on_process = on_process
+        self.processed = []
+        self.redirects = []
+        self.fetched_by = []
+
+    def setup(self):
+        pass
+
+    def get_items_name(self):
+        return self.kind
+
+    def build_expected_items(self):
+        pass
+
+    def get_one_item_content(self, item_key, item_data):  # noqa: ARG002
+        self.fetched_by.append(threading.current_thread())
+        if self.failures.get(item_key):
+            raise self.failures[item_key].pop(0)
+        return item_key
+
+    def add_item_redirect(self, item_key, item_data, redirect_kind):  # noqa: ARG002
+        self.redirects.append((item_key, redirect_kind))
+
+    def process_one_item(self, item_key, item_data, item_content):  # noqa: ARG002
+        if self.on_process:
+            self.on_process(item_key)
+        self.processed.append(item_key)
+
+
+@pytest.fixture
+def context():
+    prefetch_executor = Executor(queue_size=2, nb_workers=2)
+    prefetch_executor.start()
+    yield SimpleNamespace(
+        configuration=SimpleNamespace(
+            scrape_only_first_items=False,
+            report_slowest_items=3,
+            max_missing_items_percent=100,
+            max_error_items_percent=100,
+            listing_page_size=2,
+            listing_concurrency=3,
+            prefetch_items=2,
+            speculative_items=2,
+            main_url=urllib.parse.urlparse("https://www.ifixit.com"),
+            no_guide=False,
+            no_user=False,
+        ),
+        utils=SimpleNamespace(origins=Origins(), watchdog=Watchdog(stall_timeout=0)),
+        processor=SimpleNamespace(
+            rendering_kind=lambda kind: contextlib.nullcontext(),  # noqa: ARG005
+            normalize_href=lambda href: urllib.parse.urlparse(href).path,
+        ),
+        prefetch_executor=prefetch_executor,
+    )
+    prefetch_executor.shutdown()
@@ -0,0 +1,55 @@
+import pytest
+
+from ifixit2zim.bookkeeping import CompactSet, ItemRecord, SpillableDict, intern_key
+
+
+class FakeRecord(ItemRecord):
+    __slots__ = ("title", "locale")
+
+
+def test_item_record():
+    record = FakeRecord(title="A", locale="en")
+    assert record["title"] == "A"
+    record["locale"] = "fr"
+    assert record.locale == "fr"
+    assert record == FakeRecord(title="A", locale="fr")
+    assert repr(record) == "FakeRecord(title='A', locale='fr')"
+    with pytest.raises(AttributeError):
+        record["other"] = 1
+
+
+def test_intern_key():
+    assert intern_key(12) is intern_key("".join(["1", "2"]))
+
+
+def test_compact_set():
+    handled = CompactSet()
+    handled.add("images/a.webp")
+    handled["images/b.webp"] = "images/b.webp"
+    assert "images/a.webp" in handled
+    assert handled["images/b.webp"] == "images/b.webp"
+    assert "images/c.webp" not in handled
+    assert len(handled) == 2
+    with pytest.raises(KeyError):
+        handled["images/c.webp"]
+    with pytest.raises(ValueError):
+        handled["images/c.webp"] = "images/d.webp"
+
+
+@pytest.mark.parametrize("spill_after", [0, 2])
+def test_spillable_dict(tmp_path, spill_after):
+    entries = SpillableDict(spill_after=spill_after, spill_dir=tmp_path)
+    for key in ("a", "b", "c"):
+        entries[key] = key.upper()
+    entries[b"\x00\x01"] = "bytes"
+    entries["a"] = "A2"
+    del entries["b"]
+
+    assert entries.spilled == bool(spill_after)
+    assert len(list(tmp_path.iterdir())) == (1 if spill_after else 0)
+    assert dict(entries) == {"a": "A2", "c": "C", b"\x00\x01": "bytes"}
+    assert "b" not in entries
+    with pytest.raises(KeyError):
+        entries["b"]
+    with pytest.raises(KeyError):
+        del entries["b"]
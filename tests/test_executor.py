@@ -0,0 +1,141 @@
+import threading
+import time
+
+from ifixit2zim.executor import Executor
+
+
+def test_submit_returns_future():
+    executor = Executor(queue_size=10, nb_workers=2)
+    executor.start()
+    futures = [executor.submit(lambda value: value * 2, value=n) for n in range(5)]
+    assert [future.result(timeout=5) for future in futures] == [0, 2, 4, 6, 8]
+    executor.shutdown()
+
+
+def test_join_is_not_polling():
+    executor = Executor(queue_size=10, nb_workers=4)
+    executor.start()
+    start = time.monotonic()
+    executor.join()
+    assert time.monotonic() - start < 1
+
+
+def test_cancel_queued_task():
+    executor = Executor(queue_size=10, nb_workers=1)
+    executor.start()
+    release = threading.Event()
+    executor.submit(release.wait)
+    called = []
+    future = executor.submit(lambda: called.append(True))
+    assert future.cancel()
+    release.set()
+    executor.shutdown()
+    assert future.cancelled()
+    assert not called
+
+
+def test_halt_on_exception():
+    executor = Executor(queue_size=10, nb_workers=1)
+    executor.start()
+    release = threading.Event()
+
+    def fail():
+        release.wait()
+        raise ValueError("failed")
+
+    failing = executor.submit(fail, raises=True)
+    pending = executor.submit(lambda: None)
+    release.set()
+    assert isinstance(failing.exception(timeout=5), ValueError)
+    executor.join()
+    assert not executor.alive
+    assert isinstance(executor.exception, ValueError)
+    assert pending.cancelled()
+
+
+def test_restart_after_join():
+    executor = Executor(queue_size=10, nb_workers=2)
+    executor.start()
+    assert executor.submit(lambda: 1).result(timeout=5) == 1
+    executor.join()
+    executor.start()
+    assert executor.submit(lambda: 2).result(timeout=5) == 2
+    executor.shutdown()
+
+
+def _run_with_single_busy_worker(executor, submissions):
+    """order in which tasks submitted while the only worker is busy are served"""
+    executor.start()
+    release = threading.Event()
+    executor.submit(release.wait)
+    served = []
+    for name, priority in submissions:
+        executor.submit(lambda name: served.append(name), priority=priority, name=name)
+    release.set()
+    executor.shutdown()
+    return served
+
+
+def test_priority_order():
+    executor = Executor(queue_size=10, nb_workers=1, priority_aging=60)
+    assert _run_with_single_busy_worker(
+        executor, [("low", 2), ("high", 0), ("medium", 1), ("high-2", 0)]
+    ) == ["high", "high-2", "medium", "low"]
+
+
+def test_priority_aging():
+    # with no aging, priorities are plain FIFO
+    executor = Executor(queue_size=10, nb_workers=1, priority_aging=0)
+    assert _run_with_single_busy_worker(executor, [("low", 2), ("high", 0)]) == [
+        "low",
+        "high",
+    ]
+
+
+def test_submit_without_blocking():
+    executor = Executor(queue_size=1, nb_workers=1)
+    # not started: first task stays queued
+    assert not executor.submit(lambda: None, block=False).cancelled()
+    assert executor.submit(lambda: None, block=False).cancelled()
+
+
+def test_halted_workers_consume_their_stop_signal():
+    executor = Executor(queue_size=10, nb_workers=2)
+    executor.start()
+
+    def fail():
+        raise ValueError("failed")
+
+    executor.submit(fail, raises=True)
+    executor.join()
+    assert not executor.alive
+    assert executor.qsize() == 0
+    assert executor.unfinished_tasks == 0
+
+
+def test_tasks_left_without_workers_are_cancelled():
+    executor = Executor(queue_size=10, nb_workers=1)
+    # not started: no worker will ever process the task
+    future = executor.submit(lambda: None)
+    executor.join()
+    assert future.cancelled()
+    assert executor.unfinished_tasks == 0
+
+
+def test_waiting_shutdown_processes_queued_tasks():
+    executor = Executor(queue_size=10, nb_workers=1)
+    executor.start()
+    release = threading.Event()
+    executor.submit(release.wait)
+    queued = executor.submit(lambda: 1)
+    join = executor.join
+
+    def release_then_join():
+        # first task completes after shutdown started, before join
+        release.set()
+        time.sleep(0.1)
+        join()
+
+    executor.join = release_then_join
+    executor.shutdown()
+    assert queued.result(timeout=5) == 1
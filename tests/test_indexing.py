@@ -0,0 +1,74 @@
+import pytest
+from libzim.reader import Archive  # pyright: ignore
+from libzim.search import Query, Searcher  # pyright: ignore
+from libzim.writer import Creator, Hint  # pyright: ignore
+from zimscraperlib.zim.items import StaticItem
+
+from ifixit2zim.indexing import (
+    FULL,
+    NONE,
+    SUMMARY,
+    IndexingPolicy,
+    NotIndexedItem,
+    SummaryIndexedItem,
+)
+
+
+@pytest.mark.parametrize(
+    "kind, size, expected",
+    [
+        ("guide", 100, FULL),
+        ("guide", 1024, FULL),
+        ("guide", 1025, SUMMARY),
+        ("placeholder", 100, NONE),
+    ],
+)
+def test_get_mode(kind, size, expected):
+    policy = IndexingPolicy(kinds={"guide", "user"}, summary_above=1024)
+    assert policy.get_mode(kind, size) == expected
+
+
+def test_record():
+    policy = IndexingPolicy(kinds={"guide"}, summary_above=1024)
+    policy.record("guide", 100, None)
+    policy.record("guide", 2000, "short summary")
+    policy.record("guide", 3000, None)
+    policy.record("user", 100, None)
+    assert policy.stats == {
+        "guide": {
+            FULL: {"items": 1, "bytes": 100},
+            SUMMARY: {"items": 2, "bytes": 13},
+        },
+        "user": {NONE: {"items": 1, "bytes": 0}},
+    }
+
+
+def test_items_indexing(tmp_path):
+    zim_path = tmp_path / "test.zim"
+    with Creator(zim_path).config_indexing(True, "eng") as creator:
+        creator.set_mainpath("full")
+        for item_class, path in (
+            (StaticItem, "full"),
+            (SummaryIndexedItem, "summary"),
+            (NotIndexedItem, "none"),
+        ):
+            creator.add_item(
+                item_class(
+                    path=path,
+                    title=f"{path} title",
+                    mimetype="text/html",
+                    content=f"<html><body>page {path}content</body></html>",
+                    hints={Hint.FRONT_ARTICLE: True},
+                    summary=f"{path}summary",
+                )
+            )
+
+    searcher = Searcher(Archive(zim_path))
+
+    def search(query):
+        return list(searcher.search(Query().set_query(query)).getResults(0, 10))
+
+    assert search("page") == ["full"]
+    assert search("summarycontent") == []
+    assert search("summarysummary") == ["summary"]
+    assert search("nonecontent") == search("nonesummary") == []
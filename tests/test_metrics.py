@@ -0,0 +1,55 @@
+import pytest
+import requests
+
+from ifixit2zim.metrics import EndpointStats, HttpMetrics, get_api_family
+
+
+@pytest.mark.parametrize(
+    "path, expected",
+    [
+        ("/guides", "API /guides"),
+        ("/guides?limit=200&offset=0", "API /guides"),
+        ("/guides/1234", "API /guides/{id}"),
+        ("/wikis/CATEGORY/Mac%20Laptop?langid=fr", "API /wikis/CATEGORY/{id}"),
+        ("/wikis/INFO", "API /wikis/INFO"),
+        ("/users/12", "API /users/{id}"),
+        ("", "API /"),
+    ],
+)
+def test_get_api_family(path, expected):
+    assert get_api_family(path) == expected
+
+
+def test_percentiles():
+    stats = EndpointStats()
+    for latency in [0.01] * 50 + [0.3] * 40 + [3.0] * 9 + [42.0]:
+        stats.record(latency, 200, 10)
+    assert stats.get_percentile(0.5) == 0.05
+    assert stats.get_percentile(0.9) == 0.5
+    assert stats.get_percentile(0.99) == 5.0
+    assert stats.get_percentile(1) == 42.0
+    summary = stats.get_summary()
+    assert summary["requests"] == 100
+    assert summary["bytes"] == 1000
+    assert summary["histogram"]["+inf"] == 1
+    assert summary["statuses"] == {"200": 100}
+
+
+def test_measure():
+    metrics = HttpMetrics()
+    with metrics.measure("images") as measure:
+        measure.status = 200
+        measure.bytes = 12
+    with pytest.raises(requests.exceptions.ConnectionError):
+        with metrics.measure("images"):
+            raise requests.exceptions.ConnectionError()
+    with pytest.raises(requests.exceptions.HTTPError):
+        with metrics.measure("images") as measure:
+            measure.status = 404
+            raise requests.exceptions.HTTPError()
+    metrics.count_retry()
+    summary = metrics.get_summary()["images"]
+    assert summary["requests"] == 3
+    assert summary["bytes"] == 12
+    assert summary["statuses"] == {"200": 1, "404": 1, "ConnectionError": 1}
+    assert summary["retries"] == 1
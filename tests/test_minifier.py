@@ -0,0 +1,68 @@
+import pytest
+
+from ifixit2zim.minifier import minify_css, minify_html, minify_js
+
+
+@pytest.mark.parametrize(
+    "content, expected",
+    [
+        pytest.param(
+            "<div>\n    <p>Hello   world</p>\n</div>",
+            "<div>\n<p>Hello world</p>\n</div>",
+            id="whitespace",
+        ),
+        pytest.param(
+            "<p>a<!-- comment\n on two lines -->b</p>",
+            "<p>ab</p>",
+            id="comment",
+        ),
+        pytest.param(
+            '<a   href="/x"\n    title="two  spaces">x</a>',
+            '<a href="/x" title="two  spaces">x</a>',
+            id="attributes",
+        ),
+        pytest.param(
+            "<pre>\n  keep   me\n</pre>  <p> x </p>",
+            "<pre>\n  keep   me\n</pre> <p> x </p>",
+            id="pre",
+        ),
+        pytest.param(
+            "<script>\n  var a = '<!-- x -->';\n</script>",
+            "<script>\n  var a = '<!-- x -->';\n</script>",
+            id="script",
+        ),
+        pytest.param(
+            "<!--[if IE 8 ]>   <html><![endif]-->\n<!--<![endif]-->",
+            "<!--[if IE 8 ]>   <html><![endif]-->\n<!--<![endif]-->",
+            id="conditional-comments",
+        ),
+    ],
+)
+def test_minify_html(content, expected):
+    assert minify_html(content) == expected
+
+
+@pytest.mark.parametrize(
+    "content, expected",
+    [
+        pytest.param(
+            "a , b > c {\n  color : red ;\n}\n",
+            "a,b>c{color :red}",
+            id="punctuation",
+        ),
+        pytest.param("/* comment */a{b:c}", "a{b:c}", id="comment"),
+        pytest.param(
+            'a :hover{content: "x ; /* y */"}',
+            'a :hover{content:"x ; /* y */"}',
+            id="strings-and-selectors",
+        ),
+    ],
+)
+def test_minify_css(content, expected):
+    assert minify_css(content) == expected
+
+
+def test_minify_js():
+    assert minify_js("function a() {\n    b()\n\n    c()\n}\n") == (
+        "function a() {\nb()\nc()\n}"
+    )
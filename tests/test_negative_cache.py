@@ -0,0 +1,63 @@
+import json
+import time
+
+from ifixit2zim.negative_cache import NegativeCache
+
+
+def test_persisted_and_merged(tmp_path):
+    path = tmp_path / "cache" / "empty.json"
+    first = NegativeCache(path=path, ttl=3600)
+    second = NegativeCache(path=path, ttl=3600)
+    first.add("Mac", "fr")
+    second.add("iPhone", "de")
+    first.save()
+    second.save()
+
+    cache = NegativeCache(path=path, ttl=3600)
+    assert ("Mac", "fr") in cache
+    assert ("iPhone", "de") in cache
+    assert ("Mac", "de") not in cache
+    assert cache.hits == 2
+
+
+def test_expired_entries(tmp_path):
+    path = tmp_path / "empty.json"
+    path.write_text(json.dumps({"fr": {"Mac": time.time() - 7200, "iPad": 0}}))
+    cache = NegativeCache(path=path, ttl=3600)
+    assert ("Mac", "fr") not in cache
+    cache.add("iPad", "fr")
+    assert ("iPad", "fr") in cache
+
+
+def test_not_persisted():
+    cache = NegativeCache(path=None, ttl=3600)
+    cache.add("Mac", "fr")
+    cache.save()
+    assert ("Mac", "fr") in cache
+
+
+def test_unwritable_path(tmp_path):
+    # parent folder can't be created, e.g. HOME is read-only
+    (tmp_path / "file").write_text("")
+    cache = NegativeCache(path=tmp_path / "file" / "empty.json", ttl=3600)
+    cache.add("Mac", "fr")
+    cache.save()
+    assert ("Mac", "fr") in cache
+
+
+def test_ttl(tmp_path):
+    path = tmp_path / "empty.json"
+    cache = NegativeCache(path=path, ttl=0.1)
+    cache.add("Mac", "fr")
+    assert ("Mac", "fr") in cache
+    cache.save()
+    assert ("Mac", "fr") in NegativeCache(path=path, ttl=0.1)
+    time.sleep(0.2)
+    assert ("Mac", "fr") not in cache
+    assert ("Mac", "fr") not in NegativeCache(path=path, ttl=0.1)
+
+
+def test_zero_ttl(tmp_path):
+    cache = NegativeCache(path=tmp_path / "empty.json", ttl=0)
+    cache.add("Mac", "fr")
+    assert ("Mac", "fr") not in cache
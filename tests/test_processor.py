@@ -0,0 +1,148 @@
+import contextlib
+import threading
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+import ifixit2zim.scraper  # noqa: F401 # must be imported first (circular imports)
+from ifixit2zim.constants import IMAGE_PLACEHOLDER_COLOR
+from ifixit2zim.exceptions import OriginUnavailableError
+from ifixit2zim.origins import Origins
+from ifixit2zim.processor import Processor
+
+MAIN_URL = "https://www.ifixit.com"
+
+
+def build_processor(tmp_path, utils=None, **configuration):
+    return Processor(
+        lock=threading.Lock(),
+        configuration=SimpleNamespace(
+            bookkeeping_spill_after=0,
+            build_path=tmp_path,
+            index_kinds=set(),
+            index_summary_above=0,
+            **configuration,
+        ),
+        creator=None,  # pyright: ignore[reportArgumentType]
+        imager=None,  # pyright: ignore[reportArgumentType]
+        utils=utils,  # pyright: ignore[reportArgumentType]
+    )
+
+
+def fake_utils(outcomes):
+    """utils whose requests successively return (status, url) or raise outcomes"""
+    requested = []
+
+    @contextlib.contextmanager
+    def open_stream(url, family):  # noqa: ARG001
+        requested.append(url)
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        status, final_url = outcome
+        response = requests.Response()
+        response.status_code = status
+        response.url = final_url
+        yield response, iter(())
+
+    return SimpleNamespace(origins=Origins(), open_stream=open_stream), requested
+
+
+def test_resolved_href_is_memoized(tmp_path):
+    utils, requested = fake_utils([(200, f"{MAIN_URL}/Guide/Battery/12")])
+    processor = build_processor(tmp_path, utils)
+    for _ in range(2):
+        assert processor.normalize_href(f"{MAIN_URL}/Guide/-/12") == (
+            "/Guide/Battery/12"
+        )
+    assert len(requested) == 1
+
+
+def test_missing_href_is_kept_as_is(tmp_path):
+    utils, requested = fake_utils([(404, f"{MAIN_URL}/Guide/-/12")])
+    processor = build_processor(tmp_path, utils)
+    for _ in range(2):
+        assert processor.normalize_href(f"{MAIN_URL}/Guide/-/12") == "/Guide/-/12"
+    assert len(requested) == 1
+
+
+@pytest.mark.parametrize(
+    "failure",
+    [
+        requests.exceptions.ConnectTimeout(),
+        requests.exceptions.ConnectionError(),
+        (503, f"{MAIN_URL}/Guide/-/12"),
+        (429, f"{MAIN_URL}/Guide/-/12"),
+        OriginUnavailableError(),
+    ],
+)
+def test_transient_failure_is_not_memoized(tmp_path, failure):
+    utils, requested = fake_utils([failure, (200, f"{MAIN_URL}/Guide/Battery/12")])
+    processor = build_processor(tmp_path, utils)
+    with pytest.raises((requests.exceptions.RequestException, OriginUnavailableError)):
+        processor.normalize_href(f"{MAIN_URL}/Guide/-/12")
+    assert processor.normalize_href(f"{MAIN_URL}/Guide/-/12") == "/Guide/Battery/12"
+    assert len(requested) == 2
+
+
+GUIDE_IMAGE = "https://guide-images.cdn.ifixit.com/igi/abcd.medium"
+
+
+def test_first_image_stays_eager(tmp_path):
+    processor = build_processor(tmp_path, image_placeholder=False)
+    assert processor.add_images_lazy_loading(
+        '<p><img src="a.webp"><img src="b.webp"/><IMG src="c.webp"></p>'
+    ) == (
+        '<p><img decoding="async" src="a.webp">'
+        '<img loading="lazy" decoding="async" src="b.webp"/>'
+        '<img loading="lazy" decoding="async" src="c.webp"></p>'
+    )
+
+
+def test_existing_attributes_are_kept(tmp_path):
+    processor = build_processor(tmp_path, image_placeholder=True)
+    tags = (
+        '<img src="a.webp">'
+        '<img loading="eager" decoding="sync" src="b.webp">'
+        f'<img src="{GUIDE_IMAGE}" width="10">'
+        f'<img src="{GUIDE_IMAGE}" height="10">'
+        f'<img src="{GUIDE_IMAGE}" style="float:left">'
+    )
+    assert processor.add_images_lazy_loading(tags) == (
+        '<img decoding="async" src="a.webp">'
+        '<img loading="eager" decoding="sync" src="b.webp">'
+        f'<img loading="lazy" decoding="async" src="{GUIDE_IMAGE}" width="10">'
+        f'<img loading="lazy" decoding="async" src="{GUIDE_IMAGE}" height="10">'
+        f'<img loading="lazy" decoding="async" src="{GUIDE_IMAGE}" style="float:left">'
+    )
+
+
+@pytest.mark.parametrize(
+    "image_placeholder, style",
+    [
+        (False, "height:auto"),
+        (True, f"height:auto;background-color:{IMAGE_PLACEHOLDER_COLOR}"),
+    ],
+)
+def test_guide_images_are_sized(tmp_path, image_placeholder, style):
+    processor = build_processor(tmp_path, image_placeholder=image_placeholder)
+    assert processor.add_images_lazy_loading(f'<img src="{GUIDE_IMAGE}">') == (
+        f'<img decoding="async" width="592" height="444" style="{style}" '
+        f'src="{GUIDE_IMAGE}">'
+    )
+
+
+@pytest.mark.parametrize(
+    "src",
+    [
+        "https://www.ifixit.com/images/logo.png",
+        "https://guide-images.cdn.ifixit.com/igi/abcd.unknown",
+        "https://guide-images.cdn.ifixit.com/igi/abcd.medium/other",
+    ],
+)
+def test_other_images_are_not_sized(tmp_path, src):
+    processor = build_processor(tmp_path, image_placeholder=True)
+    assert processor.add_images_lazy_loading(f'<img src="{src}">') == (
+        f'<img decoding="async" src="{src}">'
+    )
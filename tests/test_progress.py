@@ -0,0 +1,65 @@
+import json
+import os
+import threading
+import time
+
+from ifixit2zim.progress import ProgressReporter, Throughput
+
+
+def test_throughput():
+    throughput = Throughput()
+    assert throughput.rate("items", 10) is None
+    time.sleep(0.05)
+    rate = throughput.rate("items", 20)
+    assert rate is not None
+    assert 0 < rate <= 10 / 0.05
+
+
+def test_reports_in_background(tmp_path):
+    path = tmp_path / "stats.json"
+    reported = threading.Event()
+    count = 0
+
+    def collect():
+        nonlocal count
+        count += 1
+        if count > 2:
+            reported.set()
+        return {"done": count, "total": 10}
+
+    reporter = ProgressReporter(path, collect, interval=0.01)
+    reporter.start()
+    assert reported.wait(5)
+    reporter.stop()
+    # last report is written on stop
+    assert json.loads(path.read_text()) == {"done": count, "total": 10}
+    assert os.listdir(tmp_path) == ["stats.json"]
+
+
+def test_failed_report_keeps_previous_file(tmp_path):
+    path = tmp_path / "stats.json"
+    progress = {"done": 1, "total": 2}
+    reporter = ProgressReporter(path, lambda: progress, interval=1)
+    reporter.report()
+    # not serializable, must not leave a partial file behind
+    progress = {"done": object()}
+    reporter.report()
+    assert json.loads(path.read_text()) == {"done": 1, "total": 2}
+    assert os.listdir(tmp_path) == ["stats.json"]
+
+
+def test_no_path():
+    reporter = ProgressReporter(None, lambda: {}, interval=0.01)
+    reporter.start()
+    reporter.stop()
+    assert reporter.thread is None
+
+
+def test_file_mode_follows_umask(tmp_path):
+    path = tmp_path / "stats.json"
+    umask = os.umask(0o022)
+    try:
+        ProgressReporter(path, lambda: {"done": 1}, interval=1).report()
+    finally:
+        os.umask(umask)
+    assert path.stat().st_mode & 0o777 == 0o644
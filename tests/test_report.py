@@ -0,0 +1,60 @@
+import json
+import time
+
+from conftest import FakeScraper
+
+from ifixit2zim.report import ItemTimings, RunReport
+
+
+def test_slowest_items():
+    timings = ItemTimings(size=2)
+    for key, wall in (("a", 0.2), ("b", 0.5), ("c", 0.1), ("d", 0.3)):
+        timings.record(key, wall, cpu=wall / 2)
+    summary = timings.get_summary()
+    assert summary["items"] == 4
+    assert round(summary["wall"], 6) == 1.1
+    assert round(summary["cpu"], 6) == 0.55
+    assert [item["key"] for item in summary["slowest"]] == ["b", "d"]
+
+
+def test_no_slowest_items():
+    timings = ItemTimings(size=0)
+    timings.record("a", 0.2, cpu=0.1)
+    assert timings.get_summary()["slowest"] == []
+
+
+def test_items_are_timed(context):
+    guides = FakeScraper(
+        context, failures={}, kind="guide", on_process=lambda _: time.sleep(0.01)
+    )
+    for key in ("a", "b"):
+        guides.add_item_to_scrape(key, {}, is_expected=True)
+    guides.scrape_items()
+    summary = guides.timings.get_summary()
+    assert summary["items"] == 2
+    assert summary["wall"] >= 0.02
+    assert {item["key"] for item in summary["slowest"]} == {"a", "b"}
+
+
+def test_run_report(tmp_path):
+    path = tmp_path / "report.json"
+    report = RunReport(path)
+    report.lap("metadata")
+    time.sleep(0.01)
+    report.lap("scraping")
+    timings = ItemTimings(size=1)
+    timings.record("a", 0.2, cpu=0.1)
+    built = report.build("done", {"guide": timings}, peak_memory=12.0)
+    report.log(built)
+    report.write(built)
+
+    written = json.loads(path.read_text())
+    assert written == built
+    assert written["status"] == "done"
+    assert [phase["name"] for phase in written["phases"]] == ["metadata", "scraping"]
+    assert written["phases"][1]["wall"] >= 0.01
+    assert written["wall"] == sum(phase["wall"] for phase in written["phases"])
+    assert written["items"]["guide"]["slowest"] == [
+        {"key": "a", "wall": 0.2, "cpu": 0.1}
+    ]
+    assert written["peak_memory"] == 12.0
@@ -0,0 +1,102 @@
+import threading
+import time
+
+import pytest
+import requests
+from conftest import FakeScraper
+
+from ifixit2zim import scraper_generic
+from ifixit2zim.exceptions import FinalScrapingFailureError
+from ifixit2zim.scheduler import Scheduler
+
+
+@pytest.fixture(autouse=True)
+def short_retry_delay(monkeypatch):
+    monkeypatch.setattr(scraper_generic, "ITEM_RETRY_BASE_DELAY", 0.05)
+
+
+def add_items(scraper, keys):
+    for key in keys:
+        scraper.add_item_to_scrape(key, {}, is_expected=True)
+
+
+def test_scrape_items_of_all_kinds(context):
+    guides = FakeScraper(context, failures={}, kind="guide")
+    users = FakeScraper(context, failures={}, kind="user")
+    # users are found while guides are processed
+    guides.on_process = lambda key: users.add_item_to_scrape(
+        f"author-{key}", {}, is_expected=False
+    )
+    add_items(guides, ["a", "b", "c"])
+
+    Scheduler([guides, users], nb_workers=2).run()
+
+    assert sorted(guides.processed) == ["a", "b", "c"]
+    assert sorted(users.processed) == ["author-a", "author-b", "author-c"]
+
+
+def test_weights(context):
+    guides = FakeScraper(context, failures={}, kind="guide")
+    users = FakeScraper(context, failures={}, kind="user")
+    add_items(guides, [f"g{n}" for n in range(6)])
+    add_items(users, [f"u{n}" for n in range(6)])
+    order = []
+    guides.on_process = users.on_process = order.append
+
+    Scheduler([guides, users], nb_workers=1, weights={"guide": 3}).run()
+
+    assert order[:8] == ["g0", "g1", "u0", "g2", "g3", "g4", "u1", "g5"]
+
+
+def test_kind_concurrency(context):
+    guides = FakeScraper(context, failures={}, kind="guide")
+    add_items(guides, [f"g{n}" for n in range(8)])
+    lock = threading.Lock()
+    running = []
+    max_running = 0
+
+    def process(key):
+        nonlocal max_running
+        with lock:
+            running.append(key)
+            max_running = max(max_running, len(running))
+        time.sleep(0.01)
+        with lock:
+            running.remove(key)
+
+    guides.on_process = process
+    Scheduler([guides], nb_workers=4, concurrency={"guide": 2}).run()
+
+    assert len(guides.processed) == 8
+    assert max_running == 2
+
+
+def test_waits_for_listing_and_retries(context):
+    guides = FakeScraper(
+        context, failures={"a": [requests.exceptions.Timeout()]}, kind="guide"
+    )
+    context.utils.get_api_content = lambda path, limit, offset: (  # noqa: ARG005
+        ["a", "b", "c"][offset : offset + limit]
+    )
+    guides.start_listing("/guides", lambda page: add_items(guides, page))
+
+    Scheduler([guides], nb_workers=2).run()
+
+    assert sorted(guides.processed) == ["a", "b", "c"]
+    assert guides.transient_retries == {"a": 1}
+
+
+def test_max_items(context):
+    guides = FakeScraper(context, failures={}, kind="guide")
+    add_items(guides, [f"g{n}" for n in range(8)])
+    Scheduler([guides], nb_workers=2, max_items=5).run()
+    assert len(guides.processed) == 5
+
+
+def test_failure_stops_scheduling(context):
+    context.configuration.max_error_items_percent = 0
+    guides = FakeScraper(context, failures={"g0": [ValueError()]}, kind="guide")
+    add_items(guides, [f"g{n}" for n in range(8)])
+    with pytest.raises(FinalScrapingFailureError):
+        Scheduler([guides], nb_workers=1).run()
+    assert len(guides.processed) < 7
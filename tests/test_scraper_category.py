@@ -0,0 +1,108 @@
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+import ifixit2zim.scraper  # noqa: F401 # must be imported first (circular imports)
+from ifixit2zim.constants import URLS
+from ifixit2zim.executor import Executor
+from ifixit2zim.negative_cache import NegativeCache
+from ifixit2zim.scraper_category import ScraperCategory
+from ifixit2zim.streaming import iter_json_keys
+
+
+@pytest.fixture
+def scraper():
+    scraper = ScraperCategory(
+        SimpleNamespace(
+            configuration=SimpleNamespace(lang_code="fr", report_slowest_items=0),
+            processor=SimpleNamespace(null_categories=set()),
+        )
+    )
+    scraper.empty_categories = NegativeCache(path=None, ttl=3600)
+    scraper.fallback_executor = Executor(queue_size=len(URLS), nb_workers=len(URLS))
+    scraper.fallback_executor.start()
+    yield scraper
+    scraper.fallback_executor.shutdown()
+
+
+def fake_api(scraper, contents):
+    """API returning contents[lang] for categories, recording queried languages"""
+    queried = []
+    lock = threading.Lock()
+
+    def get_api_content(path, langid):  # noqa: ARG001
+        with lock:
+            queried.append(langid)
+        return contents.get(langid, {"revisionid": 0})
+
+    scraper.context.utils = SimpleNamespace(get_api_content=get_api_content)
+    return queried
+
+
+def test_preferred_language_alone(scraper):
+    queried = fake_api(scraper, {"fr": {"revisionid": 1, "lang": "fr"}})
+    assert scraper.get_one_item_content("Mac", {})["lang"] == "fr"
+    assert queried == ["fr"]
+
+
+def test_first_fallback_by_preference(scraper):
+    queried = fake_api(
+        scraper,
+        {"en": {"revisionid": 1, "lang": "en"}, "de": {"revisionid": 1, "lang": "de"}},
+    )
+    assert scraper.get_one_item_content("Mac", {})["lang"] == "en"
+    assert queried[0] == "fr"
+    assert ("Mac", "fr") in scraper.empty_categories
+
+
+def test_empty_languages_are_skipped(scraper):
+    queried = fake_api(scraper, {})
+    assert scraper.get_one_item_content("Mac", {}) is None
+    assert sorted(queried) == sorted(URLS)
+    assert scraper.processor.null_categories == {"Mac"}
+
+    queried.clear()
+    assert scraper.get_one_item_content("Mac", {}) is None
+    assert queried == []
+
+
+def test_subtrees(scraper):
+    tree = {
+        "Mac": {"MacBook": {"MacBook Pro": {}}, "iMac": {}},
+        "Phone": {"iPhone": {"iPhone 6": {}}, "Android Phone": {}},
+        "Tablet": {},
+    }
+    scraper.context.configuration = SimpleNamespace(
+        no_category=False, categories=None, category_subtrees=["macbook", "Phone"]
+    )
+    scraper.context.processor.convert_title_to_filename = lambda title: title.replace(
+        " ", "_"
+    )
+    scraper.context.utils = SimpleNamespace(
+        iter_api_keys=lambda path, with_depth, **params: iter_json_keys(  # noqa: ARG005
+            [json.dumps(tree).encode("utf-8")], with_depth=with_depth
+        )
+    )
+    scraper.build_expected_items()
+
+    assert [
+        item_data["category_title"]
+        for item_data in scraper.expected_items_keys.values()
+    ] == ["MacBook", "MacBook Pro", "Phone", "iPhone", "iPhone 6", "Android Phone"]
+    assert scraper.is_category_selected("iphone 6")
+    assert not scraper.is_category_selected("iMac")
+    assert not scraper.is_category_selected(None)
+
+
+def test_subtree_not_found(scraper):
+    scraper.context.configuration = SimpleNamespace(
+        no_category=False, categories=None, category_subtrees=["Watch"]
+    )
+    scraper.context.processor.convert_title_to_filename = lambda title: title
+    scraper.context.utils = SimpleNamespace(
+        iter_api_keys=lambda path, with_depth, **params: iter([])  # noqa: ARG005
+    )
+    with pytest.raises(ValueError, match="Watch"):
+        scraper.build_expected_items()
@@ -0,0 +1,125 @@
+import threading
+import time
+
+import pytest
+import requests
+from conftest import FakeScraper
+
+import ifixit2zim.scraper  # noqa: F401 # must be imported first (circular imports)
+from ifixit2zim import scraper_generic
+
+
+@pytest.fixture(autouse=True)
+def short_retry_delay(monkeypatch):
+    monkeypatch.setattr(scraper_generic, "ITEM_RETRY_BASE_DELAY", 0.05)
+
+
+def scrape_all(scraper):
+    while scraper.has_pending_items:
+        scraper.scrape_items()
+        if scraper.next_retry_due is not None:
+            time.sleep(max(scraper.next_retry_due - time.monotonic(), 0))
+        scraper.wait_for_items(timeout=1)
+
+
+def test_transient_failure_is_retried_later(context):
+    scraper = FakeScraper(context, failures={"a": [requests.exceptions.Timeout()]})
+    for key in ("a", "b", "c"):
+        scraper.add_item_to_scrape(key, {}, is_expected=True)
+
+    scraper.scrape_items()
+    # fresh items are not delayed by the failing one
+    assert scraper.processed == ["b", "c"]
+    assert scraper.has_pending_items
+
+    scrape_all(scraper)
+    assert scraper.processed == ["b", "c", "a"]
+    assert scraper.redirects == []
+    assert scraper.error_items_keys == set()
+
+
+def test_final_failure_adds_error_redirect(context):
+    scraper = FakeScraper(
+        context,
+        failures={"a": [requests.exceptions.ConnectionError() for _ in range(10)]},
+    )
+    scraper.add_item_to_scrape("a", {}, is_expected=True)
+    scrape_all(scraper)
+    assert scraper.transient_retries == {"a": scraper_generic.ITEM_MAX_RETRIES}
+    assert scraper.redirects == [("a", "error")]
+    assert scraper.error_items_keys == {"a"}
+
+
+def test_other_failure_is_not_retried(context):
+    scraper = FakeScraper(context, failures={"a": [ValueError()]})
+    scraper.add_item_to_scrape("a", {}, is_expected=True)
+    scraper.scrape_items()
+    assert not scraper.has_pending_items
+    assert scraper.redirects == [("a", "error")]
+
+
+def test_listing_in_background(context):
+    listed = [f"item-{n}" for n in range(7)]
+    requested_offsets = []
+
+    def get_api_content(path, limit, offset):  # noqa: ARG001
+        requested_offsets.append(offset)
+        return listed[offset : offset + limit]
+
+    context.utils.get_api_content = get_api_content
+    scraper = FakeScraper(context, failures={})
+    scraper.start_listing(
+        "/fake",
+        lambda page: [scraper.add_item_to_scrape(key, {}, True) for key in page],
+    )
+    assert scraper.has_pending_items
+    scrape_all(scraper)
+
+    assert scraper.listing_done.is_set()
+    assert sorted(scraper.processed) == listed
+    assert list(scraper.expected_items_keys.keys()) == listed
+    # last page is incomplete, no need to go further than pages in flight
+    assert max(requested_offsets) <= len(listed) + 2 * 2
+
+
+def test_listing_error(context):
+    def get_api_content(path, limit, offset):  # noqa: ARG001
+        raise ValueError()
+
+    context.utils.get_api_content = get_api_content
+    scraper = FakeScraper(context, failures={})
+    scraper.start_listing("/fake", lambda page: None)  # noqa: ARG005
+    scraper.listing_done.wait(5)
+    with pytest.raises(ValueError):
+        scraper.scrape_items()
+
+
+def test_listed_item_found_before(context):
+    scraper = FakeScraper(context, failures={})
+    scraper.add_item_to_scrape("a", {"title": "A"}, is_expected=False)
+    scraper.add_item_to_scrape("a", {}, is_expected=True)
+    assert scraper.expected_items_keys == {"a": {"title": "A"}}
+    assert scraper.unexpected_items_keys == {}
+    assert scraper.items_queue.qsize() == 1
+
+
+def test_content_is_prefetched(context):
+    scraper = FakeScraper(context, failures={})
+    for key in ("a", "b", "c"):
+        scraper.add_item_to_scrape(key, {}, is_expected=True)
+    scraper.scrape_items()
+    assert scraper.processed == ["a", "b", "c"]
+    assert threading.current_thread() not in scraper.fetched_by
+
+
+def test_discovered_items_are_fetched_speculatively(context):
+    scraper = FakeScraper(context, failures={})
+    scraper.add_item_to_scrape("a", {}, is_expected=True)
+    for key in ("b", "c", "d"):
+        scraper.add_item_to_scrape(key, {}, is_expected=False)
+    # at most speculative_items contents are held at once
+    assert list(scraper.speculative) == ["b", "c"]
+    scraper.scrape_items()
+    assert scraper.processed == ["a", "b", "c", "d"]
+    assert scraper.speculative == {}
+    assert scraper.speculation_stats == {"fetched": 2, "used": 2}
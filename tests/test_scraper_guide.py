@@ -0,0 +1,45 @@
+import ifixit2zim.scraper  # noqa: F401 # must be imported first (circular imports)
+from ifixit2zim.constants import UNKNOWN_LOCALE, UNKNOWN_TITLE
+from ifixit2zim.scraper_guide import ScraperGuide
+
+
+def test_listed_guide_link_updates_title_and_locale(context):
+    scraper = ScraperGuide(context)
+    scraper.selected_ids = None
+    scraper.in_subtrees_only = False
+    scraper._add_listed_guides([{"guideid": 12, "flags": [], "revisionid": 1}])
+    assert scraper.expected_items_keys["12"]["guidetitle"] == UNKNOWN_TITLE
+    assert scraper.expected_items_keys["12"]["locale"] == UNKNOWN_LOCALE
+
+    assert (
+        scraper.get_guide_link_from_obj(
+            {"guideid": 12, "locale": "fr", "title": "Remplacement batterie"}
+        )
+        == "Guide/-/12"
+    )
+    assert scraper.expected_items_keys["12"]["guidetitle"] == "Remplacement batterie"
+    assert scraper.expected_items_keys["12"]["locale"] == "fr"
+    assert scraper.unexpected_items_keys == {}
+
+
+def test_guides_out_of_subtrees_are_not_fetched(context):
+    context.processor.is_category_selected = lambda category: category == "iPhone"
+    scraper = ScraperGuide(context)
+    scraper.selected_ids = None
+    scraper.in_subtrees_only = True
+
+    assert (
+        scraper.get_guide_link_from_obj(
+            {"guideid": 1, "locale": "en", "title": "Mac", "category": "Mac"}
+        )
+        == "home/not_scrapped?url=Guide/-/1"
+    )
+    assert (
+        scraper.get_guide_link_from_obj(
+            {"guideid": 2, "locale": "en", "title": "iPhone", "category": "iPhone"}
+        )
+        == "Guide/-/2"
+    )
+    # category unknown, guide is fetched to know it
+    assert scraper.get_guide_link_from_props(guideid=3, guidetitle="?") == "Guide/-/3"
+    assert list(scraper.unexpected_items_keys) == ["2", "3"]
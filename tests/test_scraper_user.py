@@ -0,0 +1,48 @@
+from types import SimpleNamespace
+
+import ifixit2zim.scraper  # noqa: F401 # must be imported first (circular imports)
+from ifixit2zim.constants import UNKNOWN_TITLE
+from ifixit2zim.scraper_user import ScraperUser
+
+
+def test_required_user_link_updates_title(context):
+    scraper = ScraperUser(context)
+    scraper.selected_ids = {"34"}
+    scraper._add_user_to_scrape("34", UNKNOWN_TITLE, True)
+
+    assert (
+        scraper.get_user_link_from_obj({"userid": 34, "username": "Jane"})
+        == "User/34/Jane"
+    )
+    assert scraper.expected_items_keys["34"]["usertitle"] == "Jane"
+    assert scraper.user_id_to_titles["34"] == (UNKNOWN_TITLE, "Jane")
+
+
+def test_title_found_after_processing_is_redirected(context):
+    redirects = []
+    context.configuration.lang_code = "en"
+    context.metadata = {}
+    context.processor.add_html_item = lambda **kwargs: None  # noqa: ARG005
+    context.processor.add_redirect = lambda path, target_path: redirects.append(
+        (path, target_path)
+    )
+    scraper = ScraperUser(context)
+    scraper.user_template = SimpleNamespace(render=lambda **kwargs: "")  # noqa: ARG005
+    scraper.selected_ids = None
+    scraper._add_user_to_scrape("34", "Jane", False)
+    scraper._add_user_to_scrape("34", "Jane D", False)
+
+    scraper.process_one_item(
+        "34", scraper.unexpected_items_keys["34"], {"userid": 34, "username": "Jane"}
+    )
+    assert redirects == [("User/34/Jane D", "User/34/Jane")]
+
+    # found by an item scraped meanwhile
+    assert scraper.get_user_link_from_obj({"userid": 34, "username": "jd"}) == (
+        "User/34/jd"
+    )
+    scraper._add_user_to_scrape("34", "Jane", False)
+    assert redirects == [
+        ("User/34/Jane D", "User/34/Jane"),
+        ("User/34/jd", "User/34/Jane"),
+    ]
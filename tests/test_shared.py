@@ -0,0 +1,31 @@
+import itertools
+
+from ifixit2zim import shared
+from ifixit2zim.shared import Stopwatch
+
+
+def test_stopwatch_laps(monkeypatch):
+    # each lap reads clocks once, after the reading at creation
+    walls = iter([10.0, 10.5, 12.0, 12.25])
+    cpus = iter([1.0, 1.25, 1.5, 2.0])
+    monkeypatch.setattr(shared.time, "perf_counter", lambda: next(walls))
+    monkeypatch.setattr(shared.time, "process_time", lambda: next(cpus))
+
+    stopwatch = Stopwatch()
+    stopwatch.lap("first")
+    stopwatch.lap("second")
+    stopwatch.lap("third")
+
+    assert stopwatch.steps == [
+        ("first", 0.5, 0.25),
+        ("second", 1.5, 0.25),
+        ("third", 0.25, 0.5),
+    ]
+    assert stopwatch.total == 2.25
+
+
+def test_stopwatch_without_laps(monkeypatch):
+    monkeypatch.setattr(shared.time, "perf_counter", itertools.count().__next__)
+    stopwatch = Stopwatch()
+    assert stopwatch.steps == []
+    assert stopwatch.total == 0
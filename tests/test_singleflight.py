@@ -0,0 +1,57 @@
+import threading
+
+import pytest
+
+from ifixit2zim.singleflight import SingleFlight
+
+
+def test_concurrent_calls_are_coalesced():
+    flight = SingleFlight("test")
+    release = threading.Event()
+    calls = []
+
+    def fetch(value):
+        calls.append(value)
+        release.wait(5)
+        return [value]
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(flight.do("a", fetch, value=1)))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    while flight.stats["calls"] < len(threads):
+        threading.Event().wait(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [1]
+    assert results == [[1]] * 5
+    assert flight.stats == {"calls": 5, "executions": 1, "coalesced": 4, "memoized": 0}
+
+    # not memoized: next call runs again
+    assert flight.do("a", fetch, value=2) == [2]
+    assert calls == [1, 2]
+
+
+def test_memoize_and_copy():
+    flight = SingleFlight("test", memoize=True, copy_result=list)
+    first = flight.do("a", lambda: [1])
+    second = flight.do("a", lambda: [2])
+    assert second == [1]
+    assert second is not first
+    assert flight.stats["memoized"] == 1
+
+
+def test_exceptions_are_not_memoized():
+    flight = SingleFlight("test", memoize=True)
+
+    def fail():
+        raise ValueError()
+
+    with pytest.raises(ValueError):
+        flight.do("a", fail)
+    assert flight.do("a", lambda: 1) == 1
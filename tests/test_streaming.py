@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+from ifixit2zim.streaming import iter_json_keys
+
+CATEGORIES = {
+    "Mac": {"MacBook": {'MacBook Pro 13" \\ Retina': None}, "iMac": None},
+    "Électronique": {"Caméra": {}},
+    "Phone": None,
+}
+EXPECTED_KEYS = [
+    "Mac",
+    "MacBook",
+    'MacBook Pro 13" \\ Retina',
+    "iMac",
+    "Électronique",
+    "Caméra",
+    "Phone",
+]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 1024])
+def test_keys_in_order_whatever_the_chunks(chunk_size):
+    document = json.dumps(CATEGORIES, indent=1).encode("utf-8")
+    chunks = [
+        document[start : start + chunk_size]
+        for start in range(0, len(document), chunk_size)
+    ]
+    assert list(iter_json_keys(chunks)) == EXPECTED_KEYS
+
+
+def test_values_are_skipped():
+    document = b'{"a": [1, "b", {"c": true}], "d": -1.5e3, "e": "f,g:h"}'
+    assert list(iter_json_keys([document])) == ["a", "c", "d", "e"]
+
+
+def test_no_recursion_limit():
+    depth = 100_000
+    document = ('{"a":' * depth + "null" + "}" * depth).encode("utf-8")
+    assert sum(1 for _ in iter_json_keys([document])) == depth
+
+
+def test_keys_with_depth():
+    document = json.dumps(CATEGORIES).encode("utf-8")
+    assert [depth for _, depth in iter_json_keys([document], with_depth=True)] == [
+        1,
+        2,
+        3,
+        2,
+        1,
+        2,
+        1,
+    ]
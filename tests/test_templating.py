@@ -0,0 +1,77 @@
+from jinja2 import DictLoader, Environment, FileSystemLoader
+
+from ifixit2zim.templating import (
+    FragmentCache,
+    FragmentCacheExtension,
+    get_bytecode_cache,
+)
+
+
+def test_fragment_cache_lru():
+    cache = FragmentCache(max_size=2)
+    assert cache.get_or_render(("card", 1), lambda: "one") == "one"
+    assert cache.get_or_render(("card", 2), lambda: "two") == "two"
+    assert cache.get_or_render(("card", 1), lambda: "other") == "one"
+    # key 2 is the least recently used one, evicted when adding key 3
+    cache.get_or_render(("card", 3), lambda: "three")
+    assert cache.get_or_render(("card", 2), lambda: "new") == "new"
+    assert cache.get_hit_rates() == {"card": 0.2}
+
+
+def test_fragment_cache_extension():
+    env = Environment(
+        loader=DictLoader(
+            {
+                "page.html": "{% for user in users %}"
+                '{% cache "card", user %}{{ user | card }}{% endcache %}'
+                "{% endfor %}"
+            }
+        ),
+        autoescape=True,
+        extensions=[FragmentCacheExtension],
+    )
+    rendered = []
+    env.filters["card"] = lambda user: rendered.append(user) or f"[{user}]"
+    env.fragment_cache = FragmentCache(max_size=10)  # pyright: ignore
+
+    assert env.get_template("page.html").render(users=["a", "b", "a"]) == "[a][b][a]"
+    assert rendered == ["a", "b"]
+
+
+def render_with_cache(templates_dir, cache_dir):
+    """rendering of page.html in a new environment, as in a new run"""
+    env = Environment(
+        loader=FileSystemLoader(templates_dir),
+        autoescape=True,
+        bytecode_cache=get_bytecode_cache(str(cache_dir)),
+    )
+    return env.get_template("page.html").render(name="world")
+
+
+def test_cached_template_recompiled_when_changed(tmp_path):
+    templates_dir = tmp_path / "templates"
+    templates_dir.mkdir()
+    template = templates_dir / "page.html"
+    cache_dir = tmp_path / "cache" / "templates"
+
+    template.write_text("Hello {{ name }}")
+    assert render_with_cache(templates_dir, cache_dir) == "Hello world"
+    cached = list(cache_dir.iterdir())
+    assert len(cached) == 1
+
+    # cache dir is reused, compiled code is replaced as source checksum changed
+    template.write_text("Bye {{ name }}")
+    assert render_with_cache(templates_dir, cache_dir) == "Bye world"
+    assert list(cache_dir.iterdir()) == cached
+    assert render_with_cache(templates_dir, cache_dir) == "Bye world"
+
+
+def test_no_bytecode_cache():
+    assert get_bytecode_cache(None) is None
+    assert get_bytecode_cache("") is None
+
+
+def test_bytecode_cache_dir_not_creatable(tmp_path):
+    # parent of cache dir is a file, setup goes on without cache
+    (tmp_path / "file").write_text("")
+    assert get_bytecode_cache(str(tmp_path / "file" / "templates")) is None
@@ -0,0 +1,155 @@
+import http.server
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+import requests
+from conftest import FakeScraper
+
+import ifixit2zim.scraper  # noqa: F401 # must be imported first (circular imports)
+from ifixit2zim.constants import REQUEST_BACKOFF_MAX_TIME
+from ifixit2zim.utils import Utils
+
+
+class FakeAPIHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1  # pyright: ignore
+
+    def do_GET(self):  # noqa: N802
+        self.server.requests.append(self.path)  # pyright: ignore
+        body = json.dumps({"path": self.path}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class SlowAPIHandler(FakeAPIHandler):
+    def do_GET(self):  # noqa: N802
+        # never answers before client timed out
+        self.server.released.wait(10)  # pyright: ignore
+
+
+def start_server(handler_class):
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler_class)
+    server.connections = 0  # pyright: ignore
+    server.requests = []  # pyright: ignore
+    server.released = threading.Event()  # pyright: ignore
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def stop_server(server):
+    server.released.set()
+    server.shutdown()
+    server.server_close()
+
+
+def build_utils(server, request_timeout=5):
+    return Utils(
+        SimpleNamespace(
+            main_url=SimpleNamespace(
+                geturl=lambda: f"http://127.0.0.1:{server.server_port}"
+            ),
+            request_timeout=request_timeout,
+            request_deadline=10,
+            stall_timeout=0,
+            cancel_stalled_requests=False,
+        )
+    )
+
+
+@pytest.fixture
+def fake_api():
+    server = start_server(FakeAPIHandler)
+    yield server
+    stop_server(server)
+
+
+@pytest.fixture
+def utils(fake_api):
+    return build_utils(fake_api)
+
+
+@pytest.fixture
+def slow_utils():
+    server = start_server(SlowAPIHandler)
+    # a single second of timeout keeps retries below circuit breaker threshold
+    yield build_utils(server, request_timeout=1)
+    stop_server(server)
+
+
+class APIScraper(FakeScraper):
+    def get_one_item_content(self, item_key, item_data):  # noqa: ARG002
+        return self.utils.get_api_content(f"/guides/{item_key}")
+
+
+def test_connections_are_kept_alive(fake_api, utils):
+    for guideid in range(10):
+        assert utils.get_api_content(f"/guides/{guideid}") == {
+            "path": f"/api/2.0/guides/{guideid}"
+        }
+    assert len(fake_api.requests) == 10
+    assert fake_api.connections == 1
+
+
+def test_one_connection_per_thread(fake_api, utils):
+    def fetch_some(offset):
+        for guideid in range(offset, offset + 5):
+            utils.get_api_content(f"/guides/{guideid}")
+
+    threads = [threading.Thread(target=fetch_some, args=(n * 5,)) for n in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(fake_api.requests) == 15
+    assert fake_api.connections == 3
+
+
+def test_requests_are_measured(utils):
+    for guideid in range(3):
+        utils.get_api_content(f"/guides/{guideid}")
+    utils.get_api_content("/wikis/CATEGORY/Mac", langid="fr")
+    utils.fetch("/Guide/1")
+    summary = utils.metrics.get_summary()
+    assert {family: stats["requests"] for family, stats in summary.items()} == {
+        "API /guides/{id}": 3,
+        "API /wikis/CATEGORY/{id}": 1,
+        "website": 1,
+    }
+    assert summary["API /guides/{id}"]["statuses"] == {"200": 3}
+    assert summary["API /guides/{id}"]["bytes"] > 0
+
+
+def test_timeout_is_retried(slow_utils):
+    started = time.monotonic()
+    with pytest.raises(requests.exceptions.Timeout):
+        slow_utils.get_api_content("/guides/1")
+    # retried by backoff until its max time, not given up at first failure
+    assert time.monotonic() - started > REQUEST_BACKOFF_MAX_TIME
+    summary = slow_utils.metrics.get_summary()["API /guides/{id}"]
+    assert summary["retries"] >= 1
+    assert summary["requests"] == summary["retries"] + 1
+    assert summary["statuses"] == {"ReadTimeout": summary["requests"]}
+
+
+def test_timing_out_item_is_retried_later(context, slow_utils):
+    context.utils = slow_utils
+    scraper = APIScraper(context, failures={})
+    scraper.add_item_to_scrape("1", {}, is_expected=True)
+    scraper.scrape_items()
+    assert scraper.transient_retries == {"1": 1}
+    assert len(scraper.retry_lane) == 1
+    assert scraper.redirects == []
+    assert scraper.error_items_keys == set()
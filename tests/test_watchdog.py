@@ -0,0 +1,43 @@
+import threading
+from unittest.mock import patch
+
+from ifixit2zim.watchdog import Watchdog
+
+
+def test_stalled_activity_is_reported_once():
+    watchdog = Watchdog(stall_timeout=0.01)
+    with patch("ifixit2zim.watchdog.logger") as logger:
+        with watchdog.watch("GET https://example.com/stuck"):
+            threading.Event().wait(0.05)
+            watchdog.check()
+            watchdog.check()
+    assert watchdog.stats == {"stalled": 1, "cancelled": 0}
+    assert logger.warning.call_count == 1
+    message = logger.warning.call_args.args[0]
+    assert "https://example.com/stuck" in message
+    assert "test_stalled_activity_is_reported_once" in message
+    assert watchdog.activities == {}
+
+
+def test_stalled_activity_is_cancelled():
+    watchdog = Watchdog(stall_timeout=0.01, cancel_stalled=True)
+    cancelled = threading.Event()
+
+    def work():
+        with watchdog.watch("stuck", cancel=cancelled.set):
+            cancelled.wait(5)
+
+    thread = threading.Thread(target=work)
+    thread.start()
+    watchdog.start()
+    assert cancelled.wait(5)
+    thread.join()
+    watchdog.stop()
+    assert watchdog.stats == {"stalled": 1, "cancelled": 1}
+
+
+def test_fresh_activity_is_not_reported():
+    watchdog = Watchdog(stall_timeout=60)
+    with watchdog.watch("quick"):
+        watchdog.check()
+    assert watchdog.stats["stalled"] == 0